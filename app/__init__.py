@@ -1,11 +1,13 @@
 import os
-from flask import Flask, send_from_directory, request, Response, make_response
-from prometheus_client import Counter, Gauge, Histogram, Summary, make_wsgi_app, REGISTRY
+from flask import Flask, g, request, Response, make_response
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, Summary, make_wsgi_app, multiprocess, REGISTRY
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 import time
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 
+from app.replicas import RoutingSession
+
 # --- Prometheus Metrics ---
 # Example: Counting the number of request by METHOD and ENDPOINT
 REQUEST_COUNT = Counter(
@@ -27,28 +29,347 @@ REQUEST_LATENCY = Histogram(
     ['method', 'endpoint']
 )
 
+# Identity cache của token_required: hit = không cần query user từ database
+IDENTITY_CACHE_REQUESTS = Counter(
+    'kilogram_identity_cache_requests_total',
+    'Authenticated user lookups served by the identity cache',
+    ['result']
+)
+
+# Cache của signed URL (generate_signed_url): hit = không cần ký lại
+SIGNED_URL_CACHE_REQUESTS = Counter(
+    'kilogram_signed_url_cache_requests_total',
+    'Signed URL requests served by the signed URL cache',
+    ['result']
+)
+
+NOT_MODIFIED_RESPONSES = Counter(
+    'kilogram_http_not_modified_total',
+    'JSON responses answered with 304 Not Modified (If-None-Match)',
+    ['endpoint']
+)
+
+# --- Background jobs (app/jobs.py) ---
+JOBS_ENQUEUED = Counter(
+    'kilogram_jobs_enqueued_total',
+    'Background jobs added to the queue',
+    ['task']
+)
+
+# result: done, retry (sẽ chạy lại sau backoff) hoặc failed (hết số lần thử)
+JOBS_PROCESSED = Counter(
+    'kilogram_jobs_processed_total',
+    'Background job runs by outcome',
+    ['task', 'result']
+)
+
+# Số job theo trạng thái, được worker cập nhật khi poll
+JOB_QUEUE_DEPTH = Gauge(
+    'kilogram_job_queue_depth',
+    'Background jobs in the queue by status',
+    ['status'],
+    multiprocess_mode='mostrecent'
+)
+
+# Thời gian từ lúc job đến hạn (run_at) tới lúc worker bắt đầu chạy
+JOB_QUEUE_LATENCY = Histogram(
+    'kilogram_job_queue_latency_seconds',
+    'Delay between a job becoming due and a worker starting it',
+    ['task']
+)
+
+JOB_DURATION = Histogram(
+    'kilogram_job_duration_seconds',
+    'Background job run time',
+    ['task']
+)
+
+# --- Password hashing (app/passwords.py) ---
+# Thời gian hash/verify, tính cả thời gian chờ process pool
+PASSWORD_HASH_DURATION = Histogram(
+    'kilogram_password_hash_duration_seconds',
+    'Password hash/verify latency including the process pool queue',
+    ['operation']
+)
+
+# Số thao tác đang chờ hoặc đang chạy trong process pool
+PASSWORD_HASH_PENDING = Gauge(
+    'kilogram_password_hash_pending',
+    'Password hash/verify operations queued or running',
+    multiprocess_mode='livesum'
+)
+
+# Bị từ chối (503) vì không có slot trong PASSWORD_HASH_QUEUE_TIMEOUT giây
+PASSWORD_HASH_REJECTED = Counter(
+    'kilogram_password_hash_rejected_total',
+    'Password operations rejected because the hashing pool was saturated',
+    ['operation']
+)
+
+# Kiểm tra JWT đã bị thu hồi: bloom_miss = trả lời chỉ bằng Bloom filter
+TOKEN_REVOCATION_CHECKS = Counter(
+    'kilogram_token_revocation_checks_total',
+    'JWT revocation checks by outcome (bloom_miss, false_positive, revoked)',
+    ['result']
+)
+
+# --- SQL metrics (app/sql_metrics.py), label endpoint = Flask endpoint hoặc "background" ---
+SQL_QUERY_DURATION = Histogram(
+    'kilogram_sql_query_duration_seconds',
+    'SQL statement execution time',
+    ['endpoint', 'statement']
+)
+
+SQL_QUERIES = Counter(
+    'kilogram_sql_queries_total',
+    'SQL statements executed',
+    ['endpoint']
+)
+
+# Số câu lệnh SQL của một request: N+1 query làm phân phối này tăng theo số item
+SQL_QUERIES_PER_REQUEST = Histogram(
+    'kilogram_sql_queries_per_request',
+    'SQL statements executed per HTTP request',
+    ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+)
+
+# Thời gian chờ lấy connection từ pool (pool đầy khi cao)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'kilogram_db_pool_checkout_wait_seconds',
+    'Time spent waiting for a database connection from the pool',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
 # Example: Monitoring the number of active users
 # ACTIVE_USERS = Gauge(
 #     'sydegram_active_users',
 #     'Number of active users'
 # ) # Gauge phức tạp hơn, cần cơ chế cập nhật
 
+def metrics_registry():
+    """Registry served on /metrics.
+    With PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py) the metric files of every
+    worker process are aggregated, otherwise only this process is reported.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
 # Initialize extensions
 jwt = JWTManager()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 UPLOAD_FOLDER = 'uploads'
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(APP_ROOT)
 ABSOLUTE_UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, UPLOAD_FOLDER)
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config["SECRET_KEY"] = "your-very-secure-secret-key"
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
+
+    # --- Database pools và read replicas (app/replicas.py) ---
+    # Các replica, cách nhau bởi dấu phẩy: request GET/HEAD/OPTIONS đọc từ một replica
+    app.config["SQLALCHEMY_REPLICA_URIS"] = [uri.strip() for uri in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if uri.strip()]
+    # Số connection và số giây chờ một connection của pool primary / mỗi replica
+    app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 5))
+    app.config["DB_POOL_TIMEOUT"] = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    app.config["DB_REPLICA_POOL_SIZE"] = int(os.environ.get("DB_REPLICA_POOL_SIZE", 5))
+    app.config["DB_REPLICA_POOL_TIMEOUT"] = float(os.environ.get("DB_REPLICA_POOL_TIMEOUT", 30))
+    # Sau khi ghi, client đọc từ primary trong số giây này (lớn hơn độ trễ replication)
+    app.config["REPLICA_STICKY_SECONDS"] = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+
+    # --- ASGI (uvicorn asgi:app, app/aio.py) ---
+    # Số thread chạy các endpoint đồng bộ (ghi, upload...), các endpoint đọc chính chạy trên event loop
+    app.config["ASGI_THREADS"] = int(os.environ.get("ASGI_THREADS", 20))
+
+    # --- News feed timelines (fan-out-on-write) ---
+    # Số bài tối đa giữ trong timeline của mỗi user
+    app.config["TIMELINE_MAX_LENGTH"] = int(os.environ.get("TIMELINE_MAX_LENGTH", 800))
+    # Số bài cũ được copy vào timeline khi follow một user mới
+    app.config["TIMELINE_BACKFILL_SIZE"] = int(os.environ.get("TIMELINE_BACKFILL_SIZE", 50))
+    # Tài khoản có nhiều follower hơn ngưỡng này sẽ được đọc khi xem feed (fan-out-on-read)
+    app.config["FANOUT_FOLLOWER_LIMIT"] = int(os.environ.get("FANOUT_FOLLOWER_LIMIT", 10000))
+
+    # --- Cursor pagination ---
+    # Thời gian (giây) một total đã cache được dùng trước khi tính lại ở background
+    app.config["PAGINATION_TOTAL_TTL"] = int(os.environ.get("PAGINATION_TOTAL_TTL", 60))
+    # Số item tối đa của một trang, ?per_page= nằm ngoài [1, MAX_PER_PAGE] bị giới hạn lại
+    app.config["MAX_PER_PAGE"] = int(os.environ.get("MAX_PER_PAGE", 500))
+
+    # --- Identity cache (token_required) ---
+    app.config["IDENTITY_CACHE_TTL"] = int(os.environ.get("IDENTITY_CACHE_TTL", 30))
+    app.config["IDENTITY_CACHE_SIZE"] = int(os.environ.get("IDENTITY_CACHE_SIZE", 10000))
+
+    # --- User search ---
+    # Số kết quả tối đa của một lần tìm kiếm user
+    app.config["SEARCH_MAX_RESULTS"] = int(os.environ.get("SEARCH_MAX_RESULTS", 1000))
+
+    # --- Password hashing ---
+    # Tham số KDF của Werkzeug, hash cũ được hash lại khi user đăng nhập nếu tham số thay đổi
+    app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # Số process hash password của mỗi web process (0 = hash ngay trong request thread),
+    # gunicorn.conf.py chọn giá trị theo worker class
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    # Số thao tác hash tối đa đang chờ hoặc đang chạy trong mỗi web process
+    app.config["PASSWORD_HASH_MAX_PENDING"] = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 32))
+    # Số giây chờ một slot trước khi trả về 503
+    app.config["PASSWORD_HASH_QUEUE_TIMEOUT"] = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", 2))
+
+    # --- Token revocation (logout, refresh token rotation) ---
+    # Bloom filter được tạo cho số token này với tỉ lệ false positive REVOCATION_BLOOM_ERROR_RATE
+    app.config["REVOCATION_BLOOM_CAPACITY"] = int(os.environ.get("REVOCATION_BLOOM_CAPACITY", 100000))
+    app.config["REVOCATION_BLOOM_ERROR_RATE"] = float(os.environ.get("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+    # Token bị thu hồi ở process khác bị từ chối sau tối đa số giây này
+    app.config["REVOCATION_SYNC_INTERVAL"] = float(os.environ.get("REVOCATION_SYNC_INTERVAL", 5))
+    # Chu kỳ (giây) tạo lại Bloom filter từ các token chưa hết hạn
+    app.config["REVOCATION_REBUILD_INTERVAL"] = float(os.environ.get("REVOCATION_REBUILD_INTERVAL", 3600))
+
+    # --- Request profiling (app/profiling.py) ---
+    # Request có header "X-Profile: <PROFILING_TOKEN>" được profile (None = tắt)
+    app.config["PROFILING_TOKEN"] = os.environ.get("PROFILING_TOKEN") or None
+    # Tỉ lệ request được profile ngẫu nhiên (0 = tắt, 0.01 = 1%)
+    app.config["PROFILING_SAMPLE_RATE"] = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+    # Thư mục chứa file .prof (xem bằng snakeviz), chỉ giữ PROFILING_MAX_FILES file mới nhất
+    app.config["PROFILING_DIR"] = os.environ.get("PROFILING_DIR", os.path.join(PROJECT_ROOT, "profiles"))
+    app.config["PROFILING_MAX_FILES"] = int(os.environ.get("PROFILING_MAX_FILES", 200))
+    # Số dòng của bảng thống kê khi "X-Profile-Output: inline"
+    app.config["PROFILING_SUMMARY_LINES"] = int(os.environ.get("PROFILING_SUMMARY_LINES", 40))
+
+    # --- Bulk lookup (GET /api/posts?ids=, GET /api/users?ids=) ---
+    # Số ID tối đa của một request
+    app.config["BULK_LOOKUP_MAX_IDS"] = int(os.environ.get("BULK_LOOKUP_MAX_IDS", 100))
+
+    # --- JSON, nén response và streaming danh sách (app/responses.py) ---
+    # "orjson" (nếu đã cài, nhanh hơn nhiều lần) hoặc "default" (module json của Python)
+    app.config["JSON_PROVIDER"] = os.environ.get("JSON_PROVIDER", "orjson")
+    # Thuật toán nén theo thứ tự ưu tiên ("br" cần thư viện Brotli), rỗng = tắt
+    app.config["COMPRESS_ALGORITHMS"] = [name.strip() for name in os.environ.get("COMPRESS_ALGORITHMS", "br,gzip").split(",") if name.strip()]
+    # Response nhỏ hơn số byte này không được nén
+    app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    app.config["COMPRESS_GZIP_LEVEL"] = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+    app.config["COMPRESS_BROTLI_QUALITY"] = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 4))
+    # Trang có từ số item này trở lên được stream, mỗi lần serialize STREAM_BATCH_SIZE item
+    app.config["STREAM_MIN_ITEMS"] = int(os.environ.get("STREAM_MIN_ITEMS", 100))
+    app.config["STREAM_BATCH_SIZE"] = int(os.environ.get("STREAM_BATCH_SIZE", 50))
+
+    # --- Media storage ---
+    # "gcs" (Google Cloud Storage) hoặc "local" (thư mục uploads, không cần credentials)
+    app.config["STORAGE_BACKEND"] = os.environ.get("STORAGE_BACKEND", "gcs")
+    app.config["GCS_BUCKET_NAME"] = os.environ.get("GCS_BUCKET_NAME", "kilogram-media")
+    app.config["GCS_UPLOAD_FOLDER"] = os.environ.get("GCS_UPLOAD_FOLDER", "test")
+    app.config["LOCAL_UPLOAD_FOLDER"] = ABSOLUTE_UPLOAD_FOLDER
+    # Kích thước tối đa của một chunk (resumable upload), phải là bội số của 256 KiB
+    app.config["UPLOAD_CHUNK_SIZE"] = int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+    # Kích thước tối đa của một file upload
+    app.config["UPLOAD_MAX_BYTES"] = int(os.environ.get("UPLOAD_MAX_BYTES", 100 * 1024 * 1024))
+    # Resumable upload phải hoàn tất trong số giây này, sau đó session bị xóa bởi purge-upload-sessions
+    app.config["UPLOAD_SESSION_TTL"] = int(os.environ.get("UPLOAD_SESSION_TTL", 24 * 60 * 60))
+
+    # --- Signed URL cache (ảnh riêng tư) ---
+    # Bucket không công khai: image_url của post là tên object và được ký khi trả về (None = tắt)
+    app.config["SIGNED_MEDIA_BUCKET"] = os.environ.get("SIGNED_MEDIA_BUCKET") or None
+    app.config["SIGNED_URL_CACHE_SIZE"] = int(os.environ.get("SIGNED_URL_CACHE_SIZE", 50000))
+    # URL đã ký không được dùng lại khi chỉ còn ít hơn số giây này trước khi hết hạn
+    app.config["SIGNED_URL_SAFETY_MARGIN"] = int(os.environ.get("SIGNED_URL_SAFETY_MARGIN", 120))
+
+    # --- Serving /uploads/<filename> ---
+    # Cache-Control max-age cho file có prefix timestamp (không bao giờ thay đổi) và các file khác
+    app.config["UPLOADS_IMMUTABLE_MAX_AGE"] = int(os.environ.get("UPLOADS_IMMUTABLE_MAX_AGE", 365 * 24 * 60 * 60))
+    app.config["UPLOADS_MAX_AGE"] = int(os.environ.get("UPLOADS_MAX_AGE", 60 * 60))
+    # "" (Python gửi file), "x-accel" (nginx X-Accel-Redirect) hoặc "x-sendfile" (Apache/lighttpd X-Sendfile)
+    app.config["UPLOADS_OFFLOAD"] = os.environ.get("UPLOADS_OFFLOAD", "")
+    # Internal location của nginx trỏ tới thư mục uploads
+    app.config["UPLOADS_ACCEL_PREFIX"] = os.environ.get("UPLOADS_ACCEL_PREFIX", "/protected-uploads")
+
+    # --- Image variants (thumbnail, feed, full), generated by the job workers ---
+    app.config["MEDIA_VARIANTS_ENABLED"] = os.environ.get("MEDIA_VARIANTS_ENABLED", "1") == "1"
+    app.config["MEDIA_JPEG_QUALITY"] = int(os.environ.get("MEDIA_JPEG_QUALITY", 80))
+
+    # --- Background jobs (flask run-jobs) ---
+    # Số thread của một process worker
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 4))
+    # Số giây chờ giữa hai lần poll khi queue rỗng
+    app.config["JOB_POLL_INTERVAL"] = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+    # Số lần chạy tối đa của một job (mặc định, task có thể override)
+    app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+    # Backoff khi retry: JOB_RETRY_BACKOFF * 2^(lần thử - 1) giây, tối đa JOB_RETRY_BACKOFF_MAX
+    app.config["JOB_RETRY_BACKOFF"] = float(os.environ.get("JOB_RETRY_BACKOFF", 10))
+    app.config["JOB_RETRY_BACKOFF_MAX"] = float(os.environ.get("JOB_RETRY_BACKOFF_MAX", 3600))
+    # Job "running" lâu hơn số giây này được coi là worker đã chết và được chạy lại
+    app.config["JOB_LOCK_TIMEOUT"] = int(os.environ.get("JOB_LOCK_TIMEOUT", 300))
+
+    # Override config (ví dụ: khi chạy test)
+    if config:
+        app.config.update(config)
+
+    if app.config["UPLOADS_OFFLOAD"] == "x-sendfile":
+        app.config["USE_X_SENDFILE"] = True
+
+    # Werkzeug trả về 413 cho request lớn hơn giới hạn này
+    if app.config["MAX_CONTENT_LENGTH"] is None:
+        app.config["MAX_CONTENT_LENGTH"] = app.config["UPLOAD_MAX_BYTES"]
+
+    # Connection pool đo thời gian chờ checkout (SQLite in-memory vẫn dùng StaticPool), một bind cho mỗi replica
+    from app.sql_metrics import TimedQueuePool, observe_request_queries
+    from app.replicas import configure_binds, register_replica_routing
+    configure_binds(app, TimedQueuePool)
+
+    # JSON provider của app (jsonify, request.get_json)
+    from app.responses import create_json_provider, register_compression
+    app.json = create_json_provider(app)
+
     jwt.init_app(app)
     db.init_app(app)
 
+    # Storage backend cho media (xem app/storage.py)
+    from app.storage import create_storage
+    app.extensions['storage'] = create_storage(app.config)
+
+    # Hash/verify password trong process pool (xem app/passwords.py)
+    from app.passwords import PasswordHasher
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        queue_timeout=app.config["PASSWORD_HASH_QUEUE_TIMEOUT"]
+    )
+
+    # JWT đã thu hồi (jti), kiểm tra trong bộ nhớ bởi verify_jwt_in_request (xem app/revocation.py)
+    from app.revocation import RevocationList
+    app.extensions['revocation_list'] = RevocationList(
+        capacity=app.config["REVOCATION_BLOOM_CAPACITY"],
+        error_rate=app.config["REVOCATION_BLOOM_ERROR_RATE"],
+        sync_interval=app.config["REVOCATION_SYNC_INTERVAL"],
+        rebuild_interval=app.config["REVOCATION_REBUILD_INTERVAL"]
+    )
+
+    # Cache user đã xác thực theo JWT identity, mỗi process một cache
+    from app.cache import TTLCache
+    app.extensions['identity_cache'] = TTLCache(
+        max_size=app.config["IDENTITY_CACHE_SIZE"],
+        ttl=app.config["IDENTITY_CACHE_TTL"]
+    )
+
+    # Client vừa ghi dữ liệu (theo JWT identity) đọc từ primary, mỗi process một cache
+    app.extensions['primary_sticky'] = TTLCache(
+        max_size=app.config["IDENTITY_CACHE_SIZE"],
+        ttl=app.config["REPLICA_STICKY_SECONDS"]
+    )
+
+    # Cache signed URL theo (bucket, object, method), TTL của từng entry theo thời hạn của URL
+    app.extensions['signed_url_cache'] = TTLCache(
+        max_size=app.config["SIGNED_URL_CACHE_SIZE"],
+        ttl=0
+    )
+
+    # --- Nén gzip/brotli, đăng ký trước các after_request khác để chạy sau cùng ---
+    register_compression(app)
+
     # --- Middleware để thu thập metrics request cơ bản ---
     @app.before_request
     def before_request():
@@ -58,14 +379,35 @@ def create_app():
     @app.after_request
     def after_request(response):
         if hasattr(request, 'endpoint') and request.endpoint != 'static' and request.endpoint != 'prometheus':
-             # Tính latency
-            latency = time.time() - request.start_time
-            # Ghi nhận latency vào Histogram
-            REQUEST_LATENCY.labels(method=request.method, endpoint=request.endpoint).observe(latency)
-            # Đếm request
-            REQUEST_COUNT.labels(method=request.method, endpoint=request.endpoint).inc()
+            method, endpoint, start_time = request.method, request.endpoint, request.start_time
+            request_g = g._get_current_object()
+
+            def observe():
+                # Tính latency
+                latency = time.time() - start_time
+                # Ghi nhận latency vào Histogram
+                REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(latency)
+                # Đếm request
+                REQUEST_COUNT.labels(method=method, endpoint=endpoint).inc()
+                # Số câu lệnh SQL của request
+                observe_request_queries(endpoint, request_g)
+
+            if response.is_streamed:
+                # Body stream còn chạy query sau hook này: ghi nhận khi response đã gửi xong
+                response.call_on_close(observe)
+            else:
+                observe()
         return response
 
+    # --- Profiling theo yêu cầu (header X-Profile hoặc lấy mẫu) ---
+    from app.profiling import register_profiling
+    register_profiling(app)
+
+    # --- Read-your-writes khi đọc từ replica ---
+    register_replica_routing(app)
+
+    from app.uploads import send_upload
+
     # --- Import và register blueprints ---
     from app.controllers.auth import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -79,11 +421,15 @@ def create_app():
     from app.controllers.upload import upload_bp
     app.register_blueprint(upload_bp, url_prefix='/api/upload')
 
+    # --- Flask CLI commands ---
+    from app.commands import register_commands
+    register_commands(app)
+
     # --- Tạo endpoint /metrics ---
     # Sử dụng DispatcherMiddleware để phục vụ endpoint /metrics riêng biệt
     # mà không ảnh hưởng bởi các middleware hoặc blueprint khác của Flask app chính
     app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {
-        '/metrics': make_wsgi_app(REGISTRY)
+        '/metrics': make_wsgi_app(metrics_registry())
     })
 
     # Ví dụ cách increment counter POSTS_CREATED trong controller
@@ -101,9 +447,10 @@ def create_app():
 
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        return send_from_directory(ABSOLUTE_UPLOAD_FOLDER, filename)
+        # ETag, 304, Range và Cache-Control (xem app/uploads.py)
+        return send_upload(filename)
 
-    if not os.path.exists(ABSOLUTE_UPLOAD_FOLDER):
-        os.makedirs(ABSOLUTE_UPLOAD_FOLDER)
+    if not os.path.exists(app.config["LOCAL_UPLOAD_FOLDER"]):
+        os.makedirs(app.config["LOCAL_UPLOAD_FOLDER"])
 
     return app
\ No newline at end of file
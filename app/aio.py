@@ -0,0 +1,164 @@
+import io
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.util import await_
+from werkzeug.exceptions import HTTPException
+
+from app import db
+from app.replicas import RoutingSession, _pool_options, replica_keys
+from app.sql_metrics import TimedAsyncAdaptedQueuePool
+
+# Driver asyncio của từng loại database
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'mysql': 'aiomysql', 'postgresql': 'asyncpg'}
+# Endpoint đọc chính, được xử lý trên event loop (các endpoint khác chạy trong thread pool)
+ASYNC_ENDPOINTS = {
+    'post.view_news_feed',
+    'post.get_post',
+    'user.get_profile',
+    'user.view_other_profile',
+    'user.get_user_posts',
+}
+
+def async_url(uri):
+    """URL of the same database through its asyncio driver, e.g. mysql+pymysql:// -> mysql+aiomysql://"""
+    url = make_url(uri)
+    if url.get_dialect().is_async:
+        return url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver for {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+class AsyncDatabase:
+    """Async engines of an app, with the same bind keys as db.engines (None = primary, replica_i).
+    Sessions are RoutingSessions on the sync facade of these engines: the models, queries and
+    serializers of the Flask app run unchanged, and every statement awaits the asyncio driver.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        uri = async_url(config['SQLALCHEMY_DATABASE_URI'])
+        self.async_engines = {
+            None: self._create_engine(uri, config['DB_POOL_SIZE'], config['DB_POOL_TIMEOUT']),
+        }
+        for key in replica_keys(app):
+            uri = async_url(config['SQLALCHEMY_BINDS'][key]['url'])
+            self.async_engines[key] = self._create_engine(
+                uri, config['DB_REPLICA_POOL_SIZE'], config['DB_REPLICA_POOL_TIMEOUT']
+            )
+        # RoutingSession picks its engine in db.engines: this object stands in for db
+        self.engines = {key: engine.sync_engine for key, engine in self.async_engines.items()}
+        self.session = async_sessionmaker(sync_session_class=RoutingSession, db=self, expire_on_commit=False)
+
+    @staticmethod
+    def _create_engine(uri, size, timeout):
+        options = _pool_options(uri, size, timeout)
+        if options:
+            # Same checkout wait metric as the sync pools (SQLite in-memory keeps its StaticPool)
+            options['poolclass'] = TimedAsyncAdaptedQueuePool
+        return create_async_engine(uri, **options)
+
+    async def dispose(self):
+        for engine in self.async_engines.values():
+            await engine.dispose()
+
+class AsyncApp:
+    """ASGI application serving a Flask app.
+
+    Requests to ASYNC_ENDPOINTS are handled on the event loop: the Flask request (hooks,
+    token_required, view, streamed body) runs in a greenlet of AsyncSession.run_sync, and
+    waits for the database and the storage client (run_blocking) without holding a thread.
+    A process serves many concurrent slow clients with DB_POOL_SIZE connections.
+    Every other request goes to the WSGI app in a pool of ASGI_THREADS threads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.database = AsyncDatabase(app)
+        self.wsgi = WSGIMiddleware(app, workers=app.config['ASGI_THREADS'])
+        self.urls = app.url_map.bind('localhost')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and self._runs_on_loop(scope):
+            return await self._handle(scope, send)
+        return await self.wsgi(scope, receive, send)
+
+    def _runs_on_loop(self, scope):
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        try:
+            endpoint, _ = self.urls.match(path, scope['method'])
+        except HTTPException:
+            # 404, 405 and redirects are answered by Flask
+            return False
+        return endpoint in ASYNC_ENDPOINTS
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.database.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle(self, scope, send):
+        # The read endpoints have no request body
+        environ = build_environ(scope, io.BytesIO())
+        async with self.database.session() as session:
+            await session.run_sync(self._respond, environ, send)
+
+    def _respond(self, session, environ, send):
+        """Flask.wsgi_app, in the greenlet of the request"""
+        # A new app context even if one is active: db.session is scoped by app context
+        app_ctx = self.app.app_context()
+        ctx = self.app.request_context(environ)
+        error = None
+        streamed = False
+        try:
+            try:
+                app_ctx.push()
+                ctx.push()
+                # db.session of this request is the async session (removed by the teardown)
+                db.session.registry.set(session)
+                response = self.app.full_dispatch_request()
+            except Exception as e:
+                error = e
+                response = self.app.handle_exception(e)
+            # A streamed body still runs in the request (api_list_response closes the session
+            # once its last rows are loaded)
+            streamed = response.is_streamed
+            if streamed:
+                self._send(response, environ, send)
+        finally:
+            ctx.pop(error)
+            app_ctx.pop(error)
+        # The body is in memory: the teardown gave the connection back before a slow client reads it
+        if not streamed:
+            self._send(response, environ, send)
+
+    @staticmethod
+    def _send(response, environ, send):
+        # Streamed bodies are sent chunk by chunk, each send waits for the client
+        app_iter, status, headers = response.get_wsgi_response(environ)
+        try:
+            await_(send({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+            }))
+            for chunk in app_iter:
+                if chunk:
+                    await_(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+            await_(send({'type': 'http.response.body', 'body': b''}))
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
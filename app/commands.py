@@ -0,0 +1,138 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.counters import reconcile_counters
+from app.jobs import purge_jobs, run_pending, run_workers
+from app.migrations import applied_versions, migrate, migrations
+from app.query_plans import check_query_plans
+from app.revocation import purge_revoked_tokens
+from app.search import rebuild_index
+from app.synthetic import generate_dataset
+from app.timeline import rebuild_timelines
+from app.uploads import purge_upload_sessions
+
+@click.command('reconcile-counters')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows checked per batch.')
+@click.option('--dry-run', is_flag=True, help='Only report drift, do not repair it.')
+@with_appcontext
+def reconcile_counters_command(batch_size, dry_run):
+    """Repair like/follower/following counters that drifted from the likes and follows tables."""
+    drift = reconcile_counters(batch_size=batch_size, dry_run=dry_run)
+    for counter, drifted in drift.items():
+        action = 'found' if dry_run else 'repaired'
+        click.echo(f'{counter}: {drifted} drifted rows {action}')
+
+@click.command('rebuild-search-index')
+@click.option('--batch-size', default=1000, show_default=True, help='Users indexed per transaction.')
+@with_appcontext
+def rebuild_search_index_command(batch_size):
+    """Rebuild the username/fullname trigram postings of every user."""
+    indexed = rebuild_index(batch_size=batch_size)
+    click.echo(f'{indexed} users indexed')
+
+@click.command('rebuild-timelines')
+@click.option('--batch-size', default=100, show_default=True, help='Users rebuilt per transaction.')
+@with_appcontext
+def rebuild_timelines_command(batch_size):
+    """Rebuild the news feed timeline of every user from the follows and posts tables."""
+    written = rebuild_timelines(batch_size=batch_size, progress=click.echo)
+    click.echo(f'{written} timeline entries written')
+
+@click.command('run-jobs')
+@click.option('--threads', type=int, default=None, help='Worker threads, defaults to JOB_WORKERS.')
+@click.option('--burst', is_flag=True, help='Run the due jobs then exit instead of polling forever.')
+@with_appcontext
+def run_jobs_command(threads, burst):
+    """Run the background job workers. Start it in several processes to scale out."""
+    if burst:
+        click.echo(f'{run_pending()} jobs run')
+        return
+    app = current_app._get_current_object()
+    run_workers(app, threads or app.config['JOB_WORKERS'])
+
+@click.command('purge-jobs')
+@click.option('--days', default=7, show_default=True, help='Delete done jobs finished before this many days ago.')
+@with_appcontext
+def purge_jobs_command(days):
+    """Delete old finished jobs from the jobs table (failed jobs are kept)."""
+    deleted = purge_jobs(older_than=days * 24 * 60 * 60)
+    click.echo(f'{deleted} jobs deleted')
+
+@click.command('purge-revoked-tokens')
+@with_appcontext
+def purge_revoked_tokens_command():
+    """Delete revoked tokens that have expired (they are rejected by their exp claim anyway)."""
+    click.echo(f'{purge_revoked_tokens()} revoked tokens deleted')
+
+@click.command('purge-upload-sessions')
+@with_appcontext
+def purge_upload_sessions_command():
+    """Delete expired resumable upload sessions and the partial files of unfinished uploads."""
+    click.echo(f'{purge_upload_sessions()} upload sessions deleted')
+
+@click.command('generate-dataset')
+@click.option('--users', default=10000, show_default=True, help='Number of users to create.')
+@click.option('--posts-per-user', default=10.0, show_default=True, help='Average posts per user (log-normal).')
+@click.option('--follows-per-user', default=50.0, show_default=True, help='Average followees per user (log-normal).')
+@click.option('--likes-per-post', default=5.0, show_default=True, help='Average likes of a post by an average author.')
+@click.option('--days', default=90, show_default=True, help='Posts are spread over this many past days.')
+@click.option('--zipf', 'zipf_alpha', default=1.1, show_default=True, help='Skew of the follower distribution.')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows per bulk insert and transaction.')
+@click.option('--seed', default=42, show_default=True, help='Random seed, the same seed gives the same dataset.')
+@click.option('--password', default='password123', show_default=True, help='Password of every generated user.')
+@click.option('--no-timelines', is_flag=True, help='Do not build the precomputed news feed timelines.')
+@click.option('--drop-indexes', is_flag=True, help='Drop secondary indexes during the load and rebuild them after.')
+@with_appcontext
+def generate_dataset_command(users, posts_per_user, follows_per_user, likes_per_post, days, zipf_alpha,
+                             batch_size, seed, password, no_timelines, drop_indexes):
+    """Generate a synthetic social graph (power-law followers, skewed likes) for load testing."""
+    counts = generate_dataset(
+        users, posts_per_user=posts_per_user, follows_per_user=follows_per_user, likes_per_post=likes_per_post,
+        days=days, zipf_alpha=zipf_alpha, batch_size=batch_size, seed=seed, password=password,
+        timelines=not no_timelines, drop_indexes=drop_indexes, progress=click.echo
+    )
+    for table, count in counts.items():
+        click.echo(f'{table}: {count} rows')
+
+@click.command('migrate')
+@click.option('--to', 'target', type=int, default=None, help='Stop after this version, defaults to the latest.')
+@with_appcontext
+def migrate_command(target):
+    """Apply the pending schema migrations."""
+    applied = migrate(target=target, progress=click.echo)
+    click.echo(f'{len(applied)} migrations applied')
+
+@click.command('migration-status')
+@with_appcontext
+def migration_status_command():
+    """List the schema migrations and whether they are applied."""
+    applied = applied_versions()
+    for m in migrations():
+        click.echo(f"{m.version:>4} {'applied' if m.version in applied else 'pending':<8} {m.description}")
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """EXPLAIN the hot queries, exit with code 1 if a plan falls back to a full scan."""
+    failures = check_query_plans()
+    for name, scans in failures.items():
+        for scan in scans:
+            click.echo(f'FULL SCAN {name}: {scan}')
+    if failures:
+        click.get_current_context().exit(1)
+    click.echo('No full scans')
+
+def register_commands(app):
+    """Register the flask CLI commands of the app"""
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_timelines_command)
+    app.cli.add_command(run_jobs_command)
+    app.cli.add_command(purge_jobs_command)
+    app.cli.add_command(purge_revoked_tokens_command)
+    app.cli.add_command(purge_upload_sessions_command)
+    app.cli.add_command(generate_dataset_command)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(migration_status_command)
+    app.cli.add_command(check_query_plans_command)
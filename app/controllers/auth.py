@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, get_jwt, get_jwt_identity, verify_jwt_in_request
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
-from app.utils import api_response, token_required
+from app.utils import api_response, invalidate_user, token_required
 from app.models.user import User
+from app.passwords import PasswordHasherBusy
+from app.revocation import get_revocation_list
+from app.search import index_user
 from app import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -44,6 +47,10 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
+        db.session.flush()
+
+        # Username/fullname search postings
+        index_user(user)
         db.session.commit()
         
         return api_response(
@@ -51,6 +58,9 @@ def register():
             data={"user_id": user.id, "username": user.username},
             status=201
         )
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return api_response(message=str(e), status=503)
     except Exception as e:
         db.session.rollback()
         return api_response(message=f"Error registering user: {str(e)}", status=500)
@@ -63,9 +73,19 @@ def login():
     password = data.get('password')
 
     user = User.query.filter_by(username=data['username']).first()
-    if not user or not user.check_password(data['password']):
-        return api_response(message="Username or password is incorrect", status=401)
-        
+    try:
+        if not user or not user.check_password(data['password']):
+            return api_response(message="Username or password is incorrect", status=401)
+
+        # Hash lại password với tham số PASSWORD_HASH_METHOD hiện tại
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+            invalidate_user(user.id)
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return api_response(message=str(e), status=503)
+
     access_token = create_access_token(identity=str(user.id))
     refresh_token = create_refresh_token(identity=str(user.id))
 
@@ -77,9 +97,57 @@ def login():
             "user": user.to_dict()
         })
 
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    """Exchange a refresh token for a new access/refresh token pair.
+    The refresh token is rotated: the one sent is revoked and cannot be used again.
+    """
+    try:
+        verify_jwt_in_request(refresh=True)
+    except Exception as e:
+        return api_response(message=f"Token is invalid: {str(e)}", status=401)
+
+    user_id = get_jwt_identity()
+    try:
+        get_revocation_list().revoke(get_jwt())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return api_response(message=f"Error refreshing token: {str(e)}", status=500)
+
+    return api_response(
+        message='Token refreshed',
+        data={
+            'access_token': create_access_token(identity=user_id),
+            'refresh_token': create_refresh_token(identity=user_id)
+        })
+
 @auth_bp.route('/logout', methods=['POST'])
-def logout():
-    """UC03: Log out of the current user account."""
+@token_required
+def logout(current_user):
+    """UC03: Log out of the current user account.
+    Revokes the access token, and the refresh token if it is sent as {"refresh_token": ...}.
+    """
+    data = request.get_json(silent=True) or {}
+    tokens = [get_jwt()]
+
+    if data.get('refresh_token'):
+        try:
+            payload = decode_token(data['refresh_token'], allow_expired=True)
+        except Exception as e:
+            return api_response(message=f"Refresh token is invalid: {str(e)}", status=400)
+        if payload.get('type') != 'refresh' or payload.get('sub') != str(current_user.id):
+            return api_response(message="Refresh token is invalid", status=400)
+        tokens.append(payload)
+
+    try:
+        for payload in tokens:
+            get_revocation_list().revoke(payload)
+        db.session.commit()
+        return api_response(message="Logout successful")
+    except Exception as e:
+        db.session.rollback()
+        return api_response(message=f"Error logging out: {str(e)}", status=500)
 
 @auth_bp.route('/me', methods=['GET'])
 @token_required
@@ -1,8 +1,15 @@
-from flask import Blueprint, request
+from math import ceil
+from flask import Blueprint, current_app, request
 from app import db
-from app.utils import api_response, token_required
+from app.jobs import enqueue
+from app.utils import api_list_response, api_response, parse_ids, token_required
+from app.media import find_upload, gcs_objects
 from app.models.post import Post
 from app.models.like import Like
+from app.counters import adjust_like_count
+from app.etags import make_etag, not_modified, posts_validator
+from app.pagination import TOTAL_MODES, InvalidCursor, clamp_per_page, cursor_pagination, resolve_total
+from app.timeline import fan_out_post, remove_post_from_timelines, read_timeline, read_timeline_after, count_timeline
 
 post_bp = Blueprint('post', __name__)
 
@@ -26,6 +33,10 @@ def create_post(current_user):
         )
         
         db.session.add(post)
+        db.session.flush()
+
+        # Push the new post into the timelines of the followers
+        fan_out_post(post)
         db.session.commit()
         
         return api_response(
@@ -37,6 +48,32 @@ def create_post(current_user):
         db.session.rollback()
         return api_response(message=f"Error creating post: {str(e)}", status=500)
 
+@post_bp.route('', methods=['GET'])
+@token_required
+def get_posts(current_user):
+    """UC08 (bulk): Get many posts by id, e.g. GET /api/posts?ids=1,2,3
+    Missing or deleted posts are listed in not_found instead of failing the request.
+    """
+    try:
+        ids = parse_ids(current_app.config['BULK_LOOKUP_MAX_IDS'])
+    except ValueError as e:
+        return api_response(message=f"Invalid ids: {str(e)}", status=400)
+
+    if not ids:
+        return api_response(message="ids is required", status=400)
+
+    found = {post.id: post for post in Post.query.filter(Post.id.in_(ids), Post.deleted.isnot(True))}
+    posts = [found[post_id] for post_id in ids if post_id in found]
+
+    response_data = {
+        'items': Post.to_dict_many(
+            posts, include_author=True, include_likes=True, current_user=current_user,
+            include_variants=True, sign_images=True
+        ),
+        'not_found': [post_id for post_id in ids if post_id not in found]
+    }
+    return api_response(data=response_data)
+
 @post_bp.route('/<int:post_id>', methods=['GET'])
 @token_required
 def get_post(current_user, post_id):
@@ -45,14 +82,22 @@ def get_post(current_user, post_id):
     
     if not post or post.deleted:
         return api_response(message="Post not found", status=404)
-    
+
+    # Nothing changed since the client's copy: skip the serialization
+    etag = make_etag('post', current_user.id, posts_validator([post], current_user))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
     post_data = post.to_dict(
         include_author=True,
         include_likes=True,
-        current_user=current_user
+        current_user=current_user,
+        include_variants=True,
+        sign_images=True
     )
     
-    return api_response(data=post_data)
+    return api_response(data=post_data, etag=etag)
 
 @post_bp.route('/<int:post_id>', methods=['DELETE'])
 @token_required
@@ -68,6 +113,19 @@ def delete_post(current_user, post_id):
     
     try:
         post.deleted = True
+        remove_post_from_timelines(post.id)
+
+        # Xóa ảnh (và các variant) khỏi bucket ở background, job được commit cùng với post.
+        # Chỉ file do tác giả upload và không còn được post khác của tác giả sử dụng
+        upload = find_upload(post.image_url)
+        in_use = Post.query.filter(
+            Post.user_id == post.user_id, Post.deleted.isnot(True), Post.image_url == post.image_url, Post.id != post.id
+        ).first()
+        if upload and upload.user_id == post.user_id and not in_use:
+            for bucket_name, filename in gcs_objects(upload):
+                enqueue('delete_file_from_gcs', filename, bucket_name,
+                        idempotency_key=f'delete_file_from_gcs:{bucket_name}/{filename}')
+
         db.session.commit()
         return api_response(message="Post deleted successfully")
     except Exception as e:
@@ -94,6 +152,7 @@ def like_post(current_user, post_id):
 
     try:
         db.session.add(new_like)
+        adjust_like_count(post_id, 1)
         db.session.commit()
         return api_response(message="Liked post successfully")
     except Exception as e:
@@ -116,6 +175,7 @@ def unlike_post(current_user, post_id):
 
     try:
         db.session.delete(liked)
+        adjust_like_count(post_id, -1)
         db.session.commit()
         return api_response(message="Unliked post successfully")
     except Exception as e:
@@ -128,25 +188,64 @@ def view_news_feed(current_user):
     """UC13: View News Feed"""
     # Get pagination parameters from query string
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-
-    # Get posts from database with pagination
-    posts = Post.query.filter_by(deleted=False)\
-        .order_by(Post.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+
+    # Cursor mode: ?cursor= (empty for the first page) seeks by (created_at, id)
+    if 'cursor' in request.args:
+        total_mode = request.args.get('total', 'cached', type=str)
+        if total_mode not in TOTAL_MODES:
+            return api_response(message="Invalid total mode", status=400)
+
+        try:
+            posts, next_cursor = read_timeline_after(current_user.id, request.args['cursor'], per_page)
+        except InvalidCursor:
+            return api_response(message="Invalid cursor", status=400)
+
+        user_id = current_user.id
+        total = resolve_total(total_mode, ('newsfeed', user_id), lambda: count_timeline(user_id))
+
+        etag = make_etag('newsfeed', user_id, per_page, next_cursor, total, posts_validator(posts, current_user))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        return api_list_response(
+            posts,
+            lambda batch: Post.to_dict_many(
+                batch, include_author=True, include_likes=True, current_user=current_user,
+                include_variants=True, sign_images=True
+            ),
+            {'pagination': cursor_pagination(per_page, next_cursor, total)},
+            etag=etag,
+            prepare=Post.sign_images
+        )
 
-    # Prepare response data
-    response_data = {
-        'items': [post.to_dict(include_author=True, include_likes=True, current_user=current_user) for post in posts.items],
-        'pagination': {
-            'page': posts.page,
-            'per_page': posts.per_page,
-            'total': posts.total,
-            'pages': posts.pages
-        }
+    # Read the precomputed timeline of the current user
+    page = max(page, 1)
+    posts, total = read_timeline(current_user.id, page, per_page)
+
+    etag = make_etag('newsfeed', current_user.id, page, per_page, total, posts_validator(posts, current_user))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    # Prepare response data, large pages are streamed
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': ceil(total / per_page) if per_page > 0 else 0
     }
-
-    return api_response(data=response_data)
+    return api_list_response(
+        posts,
+        lambda batch: Post.to_dict_many(
+            batch, include_author=True, include_likes=True, current_user=current_user,
+            include_variants=True, sign_images=True
+        ),
+        {'pagination': pagination},
+        etag=etag,
+        prepare=Post.sign_images
+    )
 
 # TODO: Advance newfeed
 # https://apps.learning.sydexa.com/learning/course/course-v1:Sydexa+IG001+2025Q2/block-v1:Sydexa+IG001+2025Q2+type@sequential+block@8badf015cc9f45c8ac3a9d61bdcb1e97/block-v1:Sydexa+IG001+2025Q2+type@vertical+block@9d24a2da63e846ed8059462c75ffee0c
\ No newline at end of file
@@ -1,17 +1,29 @@
-import os
+import re
 import time
-from flask import Blueprint, request, jsonify
+import uuid
+from flask import Blueprint, request, current_app
 from werkzeug.utils import secure_filename
-from app import ABSOLUTE_UPLOAD_FOLDER
-from app.utils import allowed_file, api_response, upload_file_to_gcs
+from app import db
+from app.media import queue_variants, record_upload
+from app.models.upload import UploadSession
+from app.storage import StorageError, get_storage
+from app.utils import allowed_file, api_response, token_required
 
 upload_bp = Blueprint('upload', __name__)
 
+# Content-Range của một chunk: "bytes <start>-<end>/<total>", total = "*" nếu chưa biết
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+def unique_filename(filename):
+    """Create a unique, timestamp-prefixed filename from the sanitized original filename"""
+    return str(int(time.time())) + "_" + uuid.uuid4().hex[:8] + "_" + secure_filename(filename)
+
 @upload_bp.route('', methods=['POST'])
-def upload_file():
+@token_required
+def upload_file(current_user):
     if 'file' not in request.files:
         return api_response(message="No file part", status=400)
-    
+
     file = request.files['file']
     if file.filename == '':
         return api_response(message="No selected file", status=400)
@@ -19,22 +31,146 @@ def upload_file():
     if not file or not allowed_file(file.filename):
         return api_response(message="Invalid file type", status=400)
 
-    # Sanitize the original filename first
-    sanitized_filename = secure_filename(file.filename)
+    try:
+        # Stream the file to the configured storage backend in fixed-size buffers
+        stored = get_storage().save(file.stream, unique_filename(file.filename), file.content_type)
+        # Posts may only use files recorded against their author
+        record_upload(stored, current_user.id)
+        # Thumbnail/feed/full variants are generated by a background job, committed with the upload
+        queue_variants(stored)
+        db.session.commit()
+
+        # Return the URL of the stored file
+        return api_response(message="Upload successful", data={'filepath': stored.url}, status=201)
+    except Exception as e:
+        db.session.rollback()
+        # Log the error ideally
+        print(f"Error saving file: {e}")
+        return api_response(message="Error saving file", status=500)
+
+def find_upload_session(upload_id, current_user):
+    """Load an upload session of current_user.
+    Returns:
+        tuple: (UploadSession, None), or (None, error response) if it is missing, not owned by the user or expired.
+    """
+    upload = UploadSession.query.get(upload_id)
+    if not upload or upload.user_id != current_user.id:
+        return None, api_response(message="Upload not found", status=404)
 
-    # Create a unique filename using timestamp prefix
-    unique_filename = str(int(time.time())) + "_" + sanitized_filename
+    if upload.expires_at <= time.time():
+        return None, api_response(message="Upload expired", status=410)
 
-    # Construct the full path using the absolute upload folder path
-    filepath = os.path.join(ABSOLUTE_UPLOAD_FOLDER, unique_filename)
+    return upload, None
+
+@upload_bp.route('/sessions', methods=['POST'])
+@token_required
+def start_upload_session(current_user):
+    """Start a resumable upload, the file is then sent with PUT /sessions/<upload_id>"""
+    data = request.get_json() or {}
+    filename = data.get('filename') or ''
+    content_type = data.get('content_type')
+    total_size = data.get('total_size')
+
+    if not allowed_file(filename):
+        return api_response(message="Invalid file type", status=400)
+
+    if total_size is not None and (not isinstance(total_size, int) or total_size <= 0):
+        return api_response(message="Invalid total_size", status=400)
+
+    if total_size and total_size > current_app.config['UPLOAD_MAX_BYTES']:
+        return api_response(message="File too large", status=413)
 
     try:
-        # file.save(filepath)
-        url = upload_file_to_gcs(file, "test")
+        key, reference = get_storage().start_upload(unique_filename(filename), content_type, total_size)
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=current_user.id,
+            key=key,
+            content_type=content_type,
+            total_size=total_size,
+            backend=current_app.config['STORAGE_BACKEND'],
+            backend_ref=reference,
+            expires_at=int(time.time()) + current_app.config['UPLOAD_SESSION_TTL']
+        )
+        db.session.add(upload)
+        db.session.commit()
 
-        # Return the generated unique filename
-        return api_response(message="Upload successful", data={'filepath': url}, status=201)
+        data = upload.to_dict()
+        data['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+        return api_response(message="Upload started", data=data, status=201)
     except Exception as e:
-        # Log the error ideally
-        print(f"Error saving file: {e}")
-        return api_response(message="Error saving file", status=500)
\ No newline at end of file
+        db.session.rollback()
+        return api_response(message=f"Error starting upload: {str(e)}", status=500)
+
+@upload_bp.route('/sessions/<upload_id>', methods=['GET'])
+@token_required
+def get_upload_session(current_user, upload_id):
+    """Get the offset to resume an interrupted upload from"""
+    upload, error = find_upload_session(upload_id, current_user)
+    if error:
+        return error
+
+    return api_response(data=upload.to_dict())
+
+@upload_bp.route('/sessions/<upload_id>', methods=['PUT'])
+@token_required
+def upload_chunk(current_user, upload_id):
+    """Append one chunk (raw request body, Content-Range header) to a resumable upload"""
+    upload, error = find_upload_session(upload_id, current_user)
+    if error:
+        return error
+
+    if upload.completed:
+        return api_response(message="Upload already completed", status=400)
+
+    match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return api_response(message="Invalid Content-Range", status=400)
+
+    start, end = int(match.group(1)), int(match.group(2))
+    total_size = None if match.group(3) == '*' else int(match.group(3))
+    length = end - start + 1
+
+    if end < start or request.content_length != length:
+        return api_response(message="Chunk length does not match Content-Range", status=400)
+
+    if length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        return api_response(message="Chunk too large", status=413)
+
+    if total_size is not None and (end >= total_size or upload.total_size not in (None, total_size)):
+        return api_response(message="Invalid total size", status=400)
+
+    if end >= current_app.config['UPLOAD_MAX_BYTES']:
+        return api_response(message="File too large", status=413)
+
+    # The client must resume from the last stored byte
+    if start != upload.received_bytes:
+        return api_response(message="Unexpected chunk offset", data=upload.to_dict(), status=409)
+
+    total_size = total_size if total_size is not None else upload.total_size
+    storage = get_storage()
+
+    try:
+        storage.write_chunk(upload.backend_ref, start, request.stream, length, total_size)
+        upload.received_bytes = end + 1
+        upload.total_size = total_size
+
+        if total_size is not None and upload.received_bytes == total_size:
+            stored = storage.finish_upload(upload.key, upload.backend_ref)
+            upload.completed = True
+            record_upload(stored, upload.user_id)
+            queue_variants(stored)
+            db.session.commit()
+
+            data = upload.to_dict()
+            data['filepath'] = stored.url
+            return api_response(message="Upload successful", data=data, status=201)
+
+        db.session.commit()
+        return api_response(message="Chunk received", data=upload.to_dict())
+    except StorageError as e:
+        db.session.rollback()
+        return api_response(message=str(e), status=400)
+    except Exception as e:
+        db.session.rollback()
+        return api_response(message=f"Error saving chunk: {str(e)}", status=500)
@@ -1,18 +1,16 @@
-# import cProfile
-# import pstats
-# import io # Working with stream in memory
+from math import ceil
+from flask import Blueprint, current_app, request
 
-from flask import Blueprint, request
-
-from app.utils import api_response, token_required
+from app.utils import api_list_response, api_response, token_required, invalidate_user, parse_ids
 from app import db
 from app.models.user import User
 from app.models.post import Post
 from app.models.follow import Follow
-
-import cProfile
-import pstats
-import io
+from app.counters import adjust_follow_counts
+from app.etags import make_etag, not_modified, user_validator
+from app.pagination import TOTAL_MODES, InvalidCursor, clamp_per_page, cursor_pagination, decode_cursor, encode_cursor, paginate_keyset, resolve_total
+from app.search import count_users, find_users, find_users_after, index_user
+from app.timeline import backfill_timeline, trim_author_from_timeline
 
 user_bp = Blueprint('user', __name__)
 
@@ -24,55 +22,6 @@ def get_profile(current_user):
     # Get the username from the JWT token
     return api_response(data=current_user.to_dict())
 
-    # # --- Start Profiling ---
-    # profiler = cProfile.Profile()
-    # profiler.enable()
-
-    # response_data = current_user.to_dict(viewer=current_user)
-
-    # # --- End Profiling ---
-    # profiler.disable()
-
-    # # --- Save and display the profiling's result ---
-    # # Creating a stream in memory for saving the output of pstats
-    # s = io.StringIO()
-    
-    # # Organizing by cumulative time
-    # ps = pstats.Stats(profiler, stream=s).sort_stats('cumulative')
-    # ps.print_stats() # Print the stream
-
-    # # Print profiling's result to the console of server Flask for observing
-    # # Or we can save as a file:
-    # # with open('profile_results.prof', 'w') as f:
-    # #     f.write(s.getvalue())
-    # print("---------------- PROFILING RESULTS FOR /api/user/profile ----------------")
-    # print(s.getvalue())
-    # print("-------------------------------------------------------------------------")
-    
-    # return api_response(data=response_data)
-
-    # # Initializing the profiler
-    # pr = cProfile.Profile()
-    # pr.enable()  # Start collecting data
-
-    # # --- Main Logic Of API ---
-    # response = api_response(data=current_user.to_dict(viewer=current_user))
-    # # --- End of main logic ---
-
-    # pr.disable()  # Stop collecting data
-
-    # # Saving profiling's result as a file .prof
-    # s = io.StringIO()
-    # sortby = 'cumulative' # Ordering by cumulative time (thời gian tích lũy)
-    # ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
-    # ps.dump_stats(filename='profile_get_profile.prof') # Save file
-
-    # # You can print the console for briefly checking, but SnakeViz will be more visualized
-    # # print(s.getvalue()) 
-    
-    # return response
-
-
 @user_bp.route('/profile', methods=['PUT'])
 @token_required
 def edit_profile(current_user):
@@ -99,12 +48,38 @@ def edit_profile(current_user):
         setattr(current_user, key, value)
 
     try:
+        if 'username' in fields_to_update or 'fullname' in fields_to_update:
+            index_user(current_user)
         db.session.commit()
+        invalidate_user(current_user.id)
         return api_response(message="Update profile successfully", data=current_user.to_dict())
     except Exception as e:
         db.session.rollback()
         return api_response(message=f"Error updating profile: {str(e)}", status=500)
 
+@user_bp.route('', methods=['GET'])
+@token_required
+def get_users(current_user):
+    """UC06 (bulk): View many profiles by id, e.g. GET /api/users?ids=1,2,3
+    Unknown ids are listed in not_found instead of failing the request.
+    """
+    try:
+        ids = parse_ids(current_app.config['BULK_LOOKUP_MAX_IDS'])
+    except ValueError as e:
+        return api_response(message=f"Invalid ids: {str(e)}", status=400)
+
+    if not ids:
+        return api_response(message="ids is required", status=400)
+
+    found = {user.id: user for user in User.query.filter(User.id.in_(ids))}
+    users = [found[user_id] for user_id in ids if user_id in found]
+
+    response_data = {
+        'items': User.to_dict_many(users, viewer=current_user),
+        'not_found': [user_id for user_id in ids if user_id not in found]
+    }
+    return api_response(data=response_data)
+
 @user_bp.route('/<int:user_id>/profile', methods=['GET'])
 @token_required
 def view_other_profile(current_user, user_id):
@@ -115,7 +90,12 @@ def view_other_profile(current_user, user_id):
     if not user:
         return api_response(message="User not found", status=404)
 
-    return api_response(data=user.to_dict(viewer=current_user))
+    etag = make_etag('profile', current_user.id, user_validator(user, current_user))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    return api_response(data=user.to_dict(viewer=current_user), etag=etag)
 
 @user_bp.route('/<int:user_id>/posts', methods=['GET'])
 @token_required
@@ -124,25 +104,56 @@ def get_user_posts(current_user, user_id):
     
     # Get pagination parameters from query string
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
+    per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+
+    # Cursor mode: ?cursor= (empty for the first page) seeks by (created_at, id)
+    if 'cursor' in request.args:
+        total_mode = request.args.get('total', 'cached', type=str)
+        if total_mode not in TOTAL_MODES:
+            return api_response(message="Invalid total mode", status=400)
+
+        try:
+            posts, next_cursor = paginate_keyset(
+                Post.query.filter_by(user_id=user_id, deleted=False),
+                Post.created_at, Post.id, request.args['cursor'], per_page
+            )
+        except InvalidCursor:
+            return api_response(message="Invalid cursor", status=400)
+
+        total = resolve_total(total_mode, ('user_posts', user_id),
+                              lambda: Post.query.filter_by(user_id=user_id, deleted=False).count())
+
+        return api_list_response(
+            posts,
+            lambda batch: Post.to_dict_many(
+                batch, include_author=True, include_likes=True, current_user=current_user,
+                include_variants=True, sign_images=True
+            ),
+            {'pagination': cursor_pagination(per_page, next_cursor, total)},
+            prepare=Post.sign_images
+        )
+
     # Get posts from database with pagination
     posts = Post.query.filter_by(user_id=user_id, deleted=False)\
         .order_by(Post.created_at.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
     
-    # Prepare response data
-    response_data = {
-        'items': [post.to_dict(include_author=True, include_likes=True, current_user=current_user) for post in posts.items],
-        'pagination': {
-            'page': posts.page,
-            'per_page': posts.per_page,
-            'total': posts.total,
-            'pages': posts.pages
-        }
+    # Prepare response data, large pages are streamed
+    pagination = {
+        'page': posts.page,
+        'per_page': posts.per_page,
+        'total': posts.total,
+        'pages': posts.pages
     }
-    
-    return api_response(data=response_data)
+    return api_list_response(
+        posts.items,
+        lambda batch: Post.to_dict_many(
+            batch, include_author=True, include_likes=True, current_user=current_user,
+            include_variants=True, sign_images=True
+        ),
+        {'pagination': pagination},
+        prepare=Post.sign_images
+    )
 
 @user_bp.route('/<int:user_id>/follow', methods=['POST'])
 @token_required
@@ -166,6 +177,8 @@ def follow_user(current_user, user_id):
     try:
         follow = Follow(follower_id=current_user.id, following_id=user_id)
         db.session.add(follow)
+        adjust_follow_counts(current_user.id, user_id, 1)
+        backfill_timeline(current_user.id, user_id)
         db.session.commit()
         return api_response(message="User followed successfully")
     except Exception as e:
@@ -193,6 +206,8 @@ def unfollow_user(current_user, user_id):
     # Remove follow relationship
     try:
         db.session.delete(existing)
+        adjust_follow_counts(current_user.id, user_id, -1)
+        trim_author_from_timeline(current_user.id, user_id)
         db.session.commit()
         return api_response(message="User unfollowed successfully")
     except Exception as e:
@@ -205,7 +220,7 @@ def search_users(current_user):
     """UC16: Search Users by Username"""
     username = request.args.get('username', '', type=str)
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
 
     if not username:
         return api_response(message="Username is required", status=400)
@@ -214,20 +229,53 @@ def search_users(current_user):
     #     .order_by(User.created_at.desc())\
     #     .paginate(page=page, per_page=per_page, error_out=False)
 
-    users = User.query.filter(User.username.ilike(f'%{username}%'))\
-        .order_by(User.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor mode: ?cursor= (empty for the first page) seeks after the (rank, created_at, id)
+    # of the last returned user
+    if 'cursor' in request.args:
+        total_mode = request.args.get('total', 'cached', type=str)
+        if total_mode not in TOTAL_MODES:
+            return api_response(message="Invalid total mode", status=400)
+
+        try:
+            position = decode_cursor(request.args['cursor'], size=3)
+        except InvalidCursor:
+            return api_response(message="Invalid cursor", status=400)
+
+        matches = find_users_after(username, position, per_page + 1)
+        page_matches = matches[:per_page]
+        if not page_matches:
+            return api_response(message="No users found", status=404)
+
+        next_cursor = None
+        if len(matches) > per_page:
+            rank, last = page_matches[-1]
+            next_cursor = encode_cursor(rank, last.created_at or 0, last.id)
+
+        term = username.lower()
+        total = resolve_total(total_mode, ('search', term), lambda: count_users(term))
+
+        response_data = {
+            'items': [user.to_dict() for _, user in page_matches],
+            'pagination': cursor_pagination(per_page, next_cursor, total)
+        }
+        return api_response(data=response_data, status=200)
+
+    # Ranked and bounded list of matches from the trigram/prefix search index
+    users = find_users(username)
+
+    page = max(page, 1)
+    page_users = users[(page - 1) * per_page:page * per_page]
 
-    if not users.items:
+    if not page_users:
         return api_response(message="No users found", status=404)
 
     response_data = {
-        'items': [user.to_dict() for user in users.items],
+        'items': [user.to_dict() for user in page_users],
         'pagination': {
-            'page': users.page,
-            'per_page': users.per_page,
-            'total': users.total,
-            'pages': users.pages
+            'page': page,
+            'per_page': per_page,
+            'total': len(users),
+            'pages': ceil(len(users) / per_page)
         }
     }
 
@@ -0,0 +1,69 @@
+from sqlalchemy import func
+
+from app import db
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+
+def _increment(model, row_id, deltas):
+    """Atomically add deltas to counter columns of one row.
+    updated_at is kept as is: a new like or follower does not edit the row.
+    """
+    values = {column: getattr(model, column) + delta for column, delta in deltas.items()}
+    values['updated_at'] = model.updated_at
+    db.session.execute(db.update(model).where(model.id == row_id).values(values))
+
+def adjust_like_count(post_id, delta):
+    """Update posts.like_count in the current transaction"""
+    _increment(Post, post_id, {'like_count': delta})
+
+def adjust_follow_counts(follower_id, following_id, delta):
+    """Update users.following_count/follower_count in the current transaction"""
+    _increment(User, follower_id, {'following_count': delta})
+    _increment(User, following_id, {'follower_count': delta})
+
+def _reconcile_column(session, model, column, source_column, batch_size, dry_run):
+    """Compare one counter column with COUNT(*) of its source table, batch by batch.
+    The repair computes the count in the UPDATE itself (correlated subquery), so a like
+    or follow committed meanwhile is counted instead of being overwritten.
+    Returns:
+        int: Number of rows whose counter had drifted.
+    """
+    actual = db.select(func.count()).where(source_column == model.id).scalar_subquery()
+    drifted = 0
+    last_id = 0
+    while True:
+        ids = [row_id for row_id, in session.query(model.id)
+               .filter(model.id > last_id)
+               .order_by(model.id)
+               .limit(batch_size)
+               .all()]
+        if not ids:
+            break
+
+        drift = (model.id.between(ids[0], ids[-1]), column != actual)
+        if dry_run:
+            drifted += session.query(func.count(model.id)).filter(*drift).scalar()
+        else:
+            result = session.execute(db.update(model).where(*drift)
+                                     .values({column.key: actual, 'updated_at': model.updated_at}))
+            drifted += result.rowcount
+            session.commit()
+        last_id = ids[-1]
+
+    return drifted
+
+def reconcile_counters(batch_size=1000, dry_run=False, session=None):
+    """Detect (and repair unless dry_run) drift between the counters and the likes/follows tables.
+    session defaults to db.session; a migration passes a session bound to its connection,
+    whose transaction then commits the backfill with the schema change.
+    Returns:
+        dict: Number of drifted rows per counter.
+    """
+    session = session or db.session
+    return {
+        'posts.like_count': _reconcile_column(session, Post, Post.like_count, Like.post_id, batch_size, dry_run),
+        'users.follower_count': _reconcile_column(session, User, User.follower_count, Follow.following_id, batch_size, dry_run),
+        'users.following_count': _reconcile_column(session, User, User.following_count, Follow.follower_id, batch_size, dry_run),
+    }
@@ -0,0 +1,83 @@
+import hashlib
+import time
+
+from flask import current_app, make_response, request
+from sqlalchemy import func
+
+from app import db, NOT_MODIFIED_RESPONSES
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.media import MediaVariant
+from app.models.post import Post
+from app.models.user import User
+
+# Cột của user xuất hiện trong response (updated_at chỉ chính xác đến giây nên không đủ)
+USER_FIELDS = ('username', 'email', 'fullname', 'bio', 'profile_picture', 'updated_at')
+
+def make_etag(*parts):
+    """Validator of a JSON response, hashed from the values the body is built from
+    (ids, updated_at, counters, viewer flags) instead of the serialized body.
+    """
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+def not_modified(etag):
+    """Answer If-None-Match before serializing anything.
+    Returns:
+        Response: 304 Not Modified if the client already has this version, else None.
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    NOT_MODIFIED_RESPONSES.labels(endpoint=request.endpoint).inc()
+    response = make_response('', 304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def signing_epoch():
+    """Changes every SIGNED_URL_SAFETY_MARGIN seconds when private images are signed.
+    A client revalidating a cached body with signed URLs gets fresh URLs before the old ones expire.
+    """
+    if not current_app.config['SIGNED_MEDIA_BUCKET']:
+        return None
+    return int(time.time() // current_app.config['SIGNED_URL_SAFETY_MARGIN'])
+
+def posts_validator(posts, viewer):
+    """Everything Post.to_dict_many(include_author, include_likes, include_variants, sign_images)
+    depends on, read with one query: the posts' own columns are already loaded, the authors'
+    fields, the viewer's likes and the number of image variants come from the database.
+    Returns:
+        tuple: Hashable parts for make_etag.
+    """
+    if not posts:
+        return ()
+    liked = db.select(Like.post_id)\
+        .where(Like.post_id == Post.id, Like.user_id == viewer.id)\
+        .exists()
+    variants = db.select(func.count())\
+        .select_from(MediaVariant)\
+        .where(MediaVariant.source_url == Post.image_url)\
+        .scalar_subquery()
+    related = {
+        row.id: tuple(row[1:])
+        for row in db.session.execute(
+            db.select(Post.id, liked, variants, *(getattr(User, field) for field in USER_FIELDS))
+            .join(User, User.id == Post.user_id)
+            .where(Post.id.in_([post.id for post in posts]))
+        )
+    }
+    return tuple(
+        (post.id, post.caption, post.image_url, post.deleted, post.like_count, post.created_at, post.updated_at,
+         related.get(post.id))
+        for post in posts
+    ) + (signing_epoch(),)
+
+def user_validator(user, viewer):
+    """Everything User.to_dict(viewer) depends on.
+    Returns:
+        tuple: Hashable parts for make_etag.
+    """
+    is_following = db.session.query(
+        db.select(Follow.follower_id).where(Follow.follower_id == viewer.id, Follow.following_id == user.id).exists()
+    ).scalar()
+    return (user.id, user.created_at, user.follower_count, user.following_count, is_following) + \
+        tuple(getattr(user, field) for field in USER_FIELDS)
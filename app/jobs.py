@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db, JOBS_ENQUEUED, JOBS_PROCESSED, JOB_QUEUE_DEPTH, JOB_QUEUE_LATENCY, JOB_DURATION
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+# Số job ứng viên đọc mỗi lần claim, các worker khác có thể lấy trước một số job
+CLAIM_BATCH_SIZE = 10
+
+# Queue depth được cập nhật tối đa một lần trong khoảng này (giây)
+DEPTH_REFRESH_INTERVAL = 15
+
+Task = namedtuple('Task', ['fn', 'max_attempts'])
+
+_tasks = {}
+
+def task(name=None, max_attempts=None):
+    """Register a function as a background task, it can still be called directly.
+    The task runs in an app context; its database changes are committed with the job.
+    """
+    def decorator(fn):
+        _tasks[name or fn.__name__] = Task(fn, max_attempts)
+        return fn
+    return decorator
+
+def enqueue(task_name, *args, idempotency_key=None, delay=0, **kwargs):
+    """Add a job to the current transaction, workers see it once the caller commits.
+    Arguments must be JSON serializable. A job whose idempotency_key was already
+    enqueued is not added again.
+    Returns:
+        Job: The new (or already enqueued) job.
+    """
+    registered = _tasks.get(task_name)
+    if registered is None:
+        raise ValueError(f'Unknown task: {task_name}')
+
+    job = Job(
+        task=task_name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs}),
+        idempotency_key=idempotency_key,
+        status='queued',
+        attempts=0,
+        max_attempts=registered.max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=time.time() + delay
+    )
+
+    if idempotency_key:
+        # The unique key decides, not a check-then-insert: concurrent requests
+        # enqueueing the same key get the job of the first one
+        try:
+            with db.session.begin_nested():
+                db.session.add(job)
+        except IntegrityError:
+            # Locking read: sees the row of a transaction committed after ours started
+            return Job.query.filter_by(idempotency_key=idempotency_key).with_for_update().one()
+    else:
+        db.session.add(job)
+
+    JOBS_ENQUEUED.labels(task=task_name).inc()
+    return job
+
+def _claimable(now):
+    """Due queued jobs, and jobs locked for longer than JOB_LOCK_TIMEOUT (the worker died)"""
+    stale = now - current_app.config['JOB_LOCK_TIMEOUT']
+    return or_(
+        and_(Job.status == 'queued', Job.run_at <= now),
+        and_(Job.status == 'running', Job.locked_at < stale)
+    )
+
+def claim_job(worker_id):
+    """Lock the oldest due job for worker_id.
+    The lock is a conditional UPDATE, so concurrent workers (threads or
+    processes) never run the same job twice.
+    Returns:
+        Job: The claimed job, or None when nothing is due.
+    """
+    now = time.time()
+    candidates = db.session.query(Job.id)\
+        .filter(_claimable(now))\
+        .order_by(Job.run_at, Job.id)\
+        .limit(CLAIM_BATCH_SIZE)\
+        .all()
+
+    for (job_id,) in candidates:
+        result = db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, _claimable(now))
+            .values(status='running', locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(Job, job_id)
+    return None
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter before the next attempt"""
+    delay = min(current_app.config['JOB_RETRY_BACKOFF'] * 2 ** (attempts - 1),
+                current_app.config['JOB_RETRY_BACKOFF_MAX'])
+    return delay * random.uniform(0.5, 1)
+
+def run_job(job):
+    """Run a claimed job and record its outcome: done, queued again for a retry, or failed.
+    Returns:
+        str: 'done', 'retry' or 'failed'.
+    """
+    job_id, task_name = job.id, job.task
+    started = time.time()
+    JOB_QUEUE_LATENCY.labels(task=task_name).observe(max(0.0, started - job.run_at))
+
+    try:
+        registered = _tasks.get(task_name)
+        if registered is None:
+            raise LookupError(f'Unknown task: {task_name}')
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Lock expired on the last attempt')
+
+        payload = json.loads(job.payload)
+        registered.fn(*payload['args'], **payload['kwargs'])
+
+        job.status = 'done'
+        job.finished_at = time.time()
+        job.locked_by = job.locked_at = None
+        db.session.commit()
+        result = 'done'
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Job %s (%s) failed', job_id, task_name)
+
+        job = db.session.get(Job, job_id)
+        job.last_error = f'{type(e).__name__}: {e}'
+        job.locked_by = job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = time.time()
+            result = 'failed'
+        else:
+            job.status = 'queued'
+            job.run_at = time.time() + retry_delay(job.attempts)
+            result = 'retry'
+        db.session.commit()
+
+    JOB_DURATION.labels(task=task_name).observe(time.time() - started)
+    JOBS_PROCESSED.labels(task=task_name, result=result).inc()
+    return result
+
+def update_queue_depth():
+    """Refresh the queue depth gauge from the jobs table"""
+    counts = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+    for status in JOB_STATUSES:
+        JOB_QUEUE_DEPTH.labels(status=status).set(counts.get(status, 0))
+
+def run_pending(worker_id=None, limit=None):
+    """Run due jobs in the current thread until the queue is drained (or limit jobs ran).
+    Returns:
+        int: Number of jobs run.
+    """
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:inline'
+    count = 0
+    while limit is None or count < limit:
+        job = claim_job(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+def _work(app, worker_id, stop):
+    """Loop of one worker thread, a fresh app context (and session) per job"""
+    last_depth = -DEPTH_REFRESH_INTERVAL
+    while not stop.is_set():
+        try:
+            with app.app_context():
+                job = claim_job(worker_id)
+                if job is not None:
+                    run_job(job)
+                    continue
+                if time.monotonic() - last_depth >= DEPTH_REFRESH_INTERVAL:
+                    update_queue_depth()
+                    last_depth = time.monotonic()
+        except Exception:
+            logger.exception('Job worker %s error', worker_id)
+        stop.wait(app.config['JOB_POLL_INTERVAL'])
+
+def run_workers(app, threads, stop=None):
+    """Run a pool of worker threads until stop is set (or KeyboardInterrupt).
+    Several processes may run their own pool against the same database.
+    """
+    stop = stop or threading.Event()
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    workers = [
+        threading.Thread(target=_work, args=(app, f'{prefix}:{i}', stop), name=f'jobs-{i}', daemon=True)
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+def purge_jobs(older_than):
+    """Delete done jobs finished more than older_than seconds ago.
+    Failed jobs are kept for inspection.
+    Returns:
+        int: Number of jobs deleted.
+    """
+    result = db.session.execute(
+        db.delete(Job).where(Job.status == 'done', Job.finished_at < time.time() - older_than)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,113 @@
+import io
+import os
+
+from flask import current_app
+
+from app import db
+from app.jobs import enqueue, task
+from app.models.media import MediaUpload, MediaVariant
+from app.storage import get_storage
+from app.utils import is_object_key
+
+# Các variant được tạo cho mỗi ảnh: (chiều rộng tối đa, chiều cao) - có chiều cao thì crop vuông
+VARIANTS = {
+    'thumbnail': (150, 150),
+    'feed': (640, None),
+    'full': (1080, None),
+}
+
+def variant_key(key, name):
+    """Storage key of a variant, next to the original"""
+    root, _ = os.path.splitext(key)
+    return f'{root}_{name}.jpg'
+
+def _render(image, width, height):
+    """Resize (or crop for fixed height) and recompress one variant as progressive JPEG"""
+    from PIL import Image, ImageOps
+
+    if height:
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    elif image.width > width:
+        resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    else:
+        resized = image.copy()
+
+    output = io.BytesIO()
+    resized.convert('RGB').save(output, 'JPEG', quality=current_app.config['MEDIA_JPEG_QUALITY'],
+                                optimize=True, progressive=True)
+    output.seek(0)
+    return resized.size, output
+
+@task()
+def generate_variants(key, source_url):
+    """Build every variant of an uploaded image and record them against the upload.
+    Runs as a background job (see queue_variants); a retry overwrites the variants of the previous attempt.
+    Returns:
+        list: The MediaVariant rows.
+    """
+    from PIL import Image, ImageOps
+
+    storage = get_storage()
+    with storage.open(key) as f:
+        image = Image.open(f)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    variants = []
+    for name, (width, height) in VARIANTS.items():
+        (variant_width, variant_height), output = _render(image, width, height)
+        size_bytes = output.getbuffer().nbytes
+        stored = storage.put(variant_key(key, name), output, 'image/jpeg')
+        variants.append(MediaVariant(
+            source_url=source_url,
+            name=name,
+            key=stored.key,
+            url=stored.url,
+            width=variant_width,
+            height=variant_height,
+            size_bytes=size_bytes
+        ))
+
+    MediaVariant.query.filter_by(source_url=source_url).delete(synchronize_session=False)
+    db.session.add_all(variants)
+    return variants
+
+def queue_variants(stored):
+    """Add the variant generation job of a stored upload to the current transaction"""
+    if not current_app.config['MEDIA_VARIANTS_ENABLED']:
+        return
+    enqueue('generate_variants', stored.key, stored.url, idempotency_key=f'generate_variants:{stored.url}')
+
+def record_upload(stored, user_id):
+    """Record a stored upload against its uploader, in the current transaction"""
+    config = current_app.config
+    backend = config['STORAGE_BACKEND']
+    db.session.add(MediaUpload(
+        url=stored.url,
+        key=stored.key,
+        backend=backend,
+        bucket=config['GCS_BUCKET_NAME'] if backend == 'gcs' else None,
+        user_id=user_id
+    ))
+
+def find_upload(image_url):
+    """The recorded upload behind a posts.image_url: its URL, or its object key in SIGNED_MEDIA_BUCKET.
+    Returns:
+        MediaUpload: The upload, or None for a file this app did not store.
+    """
+    upload = db.session.get(MediaUpload, image_url)
+    bucket = current_app.config['SIGNED_MEDIA_BUCKET']
+    if upload is None and bucket and is_object_key(image_url):
+        upload = MediaUpload.query.filter_by(key=image_url, bucket=bucket).first()
+    return upload
+
+def gcs_objects(upload):
+    """GCS objects of an upload and of its variants.
+    Returns:
+        list: (bucket_name, key) pairs, empty unless the upload is in a configured media bucket.
+    """
+    config = current_app.config
+    if upload.backend != 'gcs' or upload.bucket not in (config['GCS_BUCKET_NAME'], config['SIGNED_MEDIA_BUCKET']):
+        return []
+    variants = MediaVariant.query.filter_by(source_url=upload.url)
+    return [(upload.bucket, key) for key in [upload.key] + [variant.key for variant in variants]]
@@ -0,0 +1,254 @@
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import (BigInteger, Boolean, Column, Float, ForeignKey, Index, Integer, MetaData, String, Table,
+                        Text, inspect)
+from sqlalchemy.orm import Session
+
+from app import db
+from app.counters import reconcile_counters
+from app.models.schema_migration import SchemaMigration
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', ['version', 'description', 'fn'])
+
+_migrations = {}
+
+def migration(version, description):
+    """Register fn(connection) as the schema migration of a version.
+    Migrations run once, in version order, each in its own transaction with its
+    schema_migrations row. DDL is not transactional on MySQL: a migration must be
+    safe to run again after a failure (use checkfirst).
+
+    A migration describes the schema of its version with literal definitions, never
+    with the current models: it must build the same tables on every database.
+    """
+    def decorator(fn):
+        if version in _migrations:
+            raise ValueError(f'Duplicate migration version {version}')
+        _migrations[version] = Migration(version, description, fn)
+        return fn
+    return decorator
+
+def _create_tables(connection, *tables):
+    """Create tables (with their indexes) unless they already exist"""
+    for table in tables:
+        table.create(connection, checkfirst=True)
+
+def _create_index(connection, table, name, *columns):
+    """CREATE INDEX with a literal definition, unless the index already exists"""
+    if name in {index['name'] for index in inspect(connection).get_indexes(table)}:
+        return
+    connection.exec_driver_sql(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+
+def _add_column(connection, table, column, definition):
+    """ALTER TABLE ADD COLUMN with a literal definition, unless the column already exists"""
+    if column in {c['name'] for c in inspect(connection).get_columns(table)}:
+        return
+    connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+@migration(1, 'Initial schema')
+def initial_schema(connection):
+    # Tables of the first release; databases created before versioned migrations already have them
+    metadata = MetaData()
+    _create_tables(
+        connection,
+        Table(
+            'users', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('username', String(50), unique=True, nullable=False),
+            Column('email', String(100), unique=True, nullable=False),
+            Column('password_hash', String(255), nullable=False),
+            Column('fullname', String(100)),
+            Column('bio', Text),
+            Column('profile_picture', String(255)),
+            Column('created_at', Integer),
+            Column('updated_at', Integer),
+        ),
+        Table(
+            'posts', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+            Column('image_url', String(255), nullable=False),
+            Column('caption', Text),
+            Column('deleted', Boolean),
+            Column('created_at', Integer),
+            Column('updated_at', Integer),
+        ),
+        Table(
+            'follows', metadata,
+            Column('follower_id', Integer, primary_key=True),
+            Column('following_id', Integer, primary_key=True),
+            Column('created_at', Integer),
+        ),
+        Table(
+            'likes', metadata,
+            Column('user_id', Integer, primary_key=True, nullable=False),
+            Column('post_id', Integer, primary_key=True, nullable=False),
+            Column('created_at', Integer, nullable=False),
+        ),
+    )
+
+@migration(2, 'Indexes of the news feed, user posts, likes and followers queries')
+def hot_query_indexes(connection):
+    _create_index(connection, 'posts', 'ix_posts_deleted_created', 'deleted', 'created_at')
+    _create_index(connection, 'posts', 'ix_posts_user_deleted_created', 'user_id', 'deleted', 'created_at')
+    _create_index(connection, 'likes', 'ix_likes_post_id', 'post_id')
+    _create_index(connection, 'follows', 'ix_follows_following_id', 'following_id')
+
+@migration(3, 'Like, follower and following counters')
+def counter_columns(connection):
+    _add_column(connection, 'posts', 'like_count', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(connection, 'users', 'follower_count', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(connection, 'users', 'following_count', 'INTEGER NOT NULL DEFAULT 0')
+    # Backfill from the likes and follows tables, committed with the columns
+    with Session(bind=connection) as session:
+        reconcile_counters(session=session)
+
+@migration(4, 'News feed timelines')
+def timelines(connection):
+    # Entries are built from the existing posts by `flask rebuild-timelines`
+    _create_tables(connection, Table(
+        'timelines', MetaData(),
+        Column('user_id', Integer, primary_key=True),
+        Column('post_id', Integer, primary_key=True),
+        Column('author_id', Integer, nullable=False),
+        Column('created_at', Integer, nullable=False),
+        Index('ix_timelines_user_created', 'user_id', 'created_at'),
+    ))
+    _create_index(connection, 'timelines', 'ix_timelines_post_id', 'post_id')
+
+@migration(5, 'Username and fullname search postings')
+def user_search_grams(connection):
+    # Postings are built from the existing users by `flask rebuild-search-index`
+    _create_tables(connection, Table(
+        'user_search_grams', MetaData(),
+        Column('gram', String(3), primary_key=True),
+        Column('field', String(8), primary_key=True),
+        Column('user_id', Integer, primary_key=True),
+        Index('ix_user_search_grams_user_id', 'user_id'),
+    ))
+
+@migration(6, 'Resumable upload sessions')
+def upload_sessions(connection):
+    _create_tables(connection, Table(
+        'upload_sessions', MetaData(),
+        Column('id', String(32), primary_key=True),
+        Column('key', String(255), nullable=False),
+        Column('content_type', String(100)),
+        Column('total_size', BigInteger),
+        Column('received_bytes', BigInteger, nullable=False),
+        Column('backend', String(20), nullable=False),
+        Column('backend_ref', String(2048), nullable=False),
+        Column('completed', Boolean, nullable=False),
+        Column('created_at', Integer),
+        Column('updated_at', Integer),
+    ))
+
+@migration(7, 'Image variants')
+def media_variants(connection):
+    _create_tables(connection, Table(
+        'media_variants', MetaData(),
+        Column('source_url', String(255), primary_key=True),
+        Column('name', String(20), primary_key=True),
+        Column('key', String(255), nullable=False),
+        Column('url', String(255), nullable=False),
+        Column('width', Integer, nullable=False),
+        Column('height', Integer, nullable=False),
+        Column('size_bytes', Integer, nullable=False),
+        Column('created_at', Integer),
+    ))
+
+@migration(8, 'Background job queue')
+def jobs(connection):
+    _create_tables(connection, Table(
+        'jobs', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('task', String(100), nullable=False),
+        Column('payload', Text, nullable=False),
+        Column('idempotency_key', String(255), unique=True),
+        Column('status', String(20), nullable=False),
+        Column('attempts', Integer, nullable=False),
+        Column('max_attempts', Integer, nullable=False),
+        Column('run_at', Float, nullable=False),
+        Column('locked_by', String(100)),
+        Column('locked_at', Float),
+        Column('last_error', Text),
+        Column('created_at', Float, nullable=False),
+        Column('finished_at', Float),
+        Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    ))
+
+@migration(9, 'Revoked tokens')
+def revoked_tokens(connection):
+    metadata = MetaData()
+    # Referenced table, never created here
+    Table('users', metadata, Column('id', Integer, primary_key=True))
+    _create_tables(connection, Table(
+        'revoked_tokens', metadata,
+        Column('jti', String(36), primary_key=True),
+        Column('token_type', String(10), nullable=False),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+        Column('expires_at', Integer, nullable=False),
+        Column('revoked_at', Float, nullable=False),
+        Index('ix_revoked_tokens_revoked_at', 'revoked_at'),
+    ))
+
+@migration(10, 'Owner and expiry of upload sessions')
+def upload_session_owner(connection):
+    # No inline REFERENCES: MySQL ignores it and SQLite can not add a constraint afterwards
+    _add_column(connection, 'upload_sessions', 'user_id', 'INTEGER')
+    _add_column(connection, 'upload_sessions', 'expires_at', 'INTEGER')
+    _create_index(connection, 'upload_sessions', 'ix_upload_sessions_expires_at', 'expires_at')
+    # Sessions started before they had an owner can not be resumed by anyone: purge them
+    connection.exec_driver_sql('UPDATE upload_sessions SET expires_at = 0 WHERE expires_at IS NULL')
+
+@migration(11, 'Uploaded media')
+def media_uploads(connection):
+    metadata = MetaData()
+    # Referenced table, never created here
+    Table('users', metadata, Column('id', Integer, primary_key=True))
+    _create_tables(connection, Table(
+        'media_uploads', metadata,
+        Column('url', String(255), primary_key=True),
+        Column('key', String(255), nullable=False),
+        Column('backend', String(20), nullable=False),
+        Column('bucket', String(255)),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+        Column('created_at', Integer),
+        Index('ix_media_uploads_key', 'key'),
+    ))
+
+def migrations():
+    return [_migrations[version] for version in sorted(_migrations)]
+
+def applied_versions():
+    with db.engine.begin() as connection:
+        SchemaMigration.__table__.create(connection, checkfirst=True)
+        return {row.version for row in connection.execute(db.select(SchemaMigration.version))}
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in migrations() if m.version not in applied]
+
+def migrate(target=None, progress=None):
+    """Apply the pending migrations up to target (all by default).
+    Returns:
+        list: Versions applied.
+    """
+    applied = []
+    for m in pending_migrations():
+        if target is not None and m.version > target:
+            break
+        if progress:
+            progress(f'Applying {m.version}: {m.description}')
+        with db.engine.begin() as connection:
+            m.fn(connection)
+            connection.execute(db.insert(SchemaMigration).values(
+                version=m.version, description=m.description, applied_at=int(datetime.now().timestamp())
+            ))
+        logger.info('Applied migration %s: %s', m.version, m.description)
+        applied.append(m.version)
+    return applied
@@ -4,6 +4,10 @@ from app import db
 class Follow(db.Model):
     """Model for following feature between users and users"""
     __tablename__ = 'follows'
+    __table_args__ = (
+        # Followers of a user (fan-out, follower_count reconciliation)
+        db.Index('ix_follows_following_id', 'following_id'),
+    )
 
     # composite primary key
     follower_id = db.Column('follower_id', db.Integer, primary_key=True)
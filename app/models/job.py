@@ -0,0 +1,27 @@
+from datetime import datetime
+from app import db
+
+class Job(db.Model):
+    """Model background job of the durable queue (see app/jobs.py)"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers poll the oldest due job
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column('id', db.Integer, primary_key=True)
+    task = db.Column('task', db.String(100), nullable=False) # name of the registered task
+    payload = db.Column('payload', db.Text, nullable=False) # JSON {"args": [...], "kwargs": {...}}
+    idempotency_key = db.Column('idempotency_key', db.String(255), unique=True) # a key is enqueued only once
+    status = db.Column('status', db.String(20), nullable=False, default='queued') # queued, running, done, failed
+    attempts = db.Column('attempts', db.Integer, nullable=False, default=0)
+    max_attempts = db.Column('max_attempts', db.Integer, nullable=False)
+    run_at = db.Column('run_at', db.Float, nullable=False) # not run before this time (retry backoff)
+    locked_by = db.Column('locked_by', db.String(100)) # worker running the job
+    locked_at = db.Column('locked_at', db.Float)
+    last_error = db.Column('last_error', db.Text)
+    created_at = db.Column('created_at', db.Float, nullable=False, default=lambda: datetime.now().timestamp())
+    finished_at = db.Column('finished_at', db.Float)
+
+    def __repr__(self):
+        return f'Job {self.id}: {self.task} ({self.status}, attempt {self.attempts}/{self.max_attempts})'
@@ -4,6 +4,11 @@ from app import db
 class Like(db.Model):
     """Model user's like feature"""
     __tablename__ = 'likes'
+    __table_args__ = (
+        # Likes of a post (like_count reconciliation), the primary key starts with user_id
+        db.Index('ix_likes_post_id', 'post_id'),
+    )
+
     user_id = db.Column('user_id', db.Integer, primary_key=True, nullable=False)
     post_id = db.Column('post_id', db.Integer, primary_key=True, nullable=False)
     created_at = db.Column('created_at', db.Integer, nullable=False, default=lambda: int(datetime.now().timestamp()))
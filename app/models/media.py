@@ -0,0 +1,39 @@
+from datetime import datetime
+from app import db
+
+class MediaUpload(db.Model):
+    """Model file stored by the upload endpoints, only these files may be attached to posts and deleted"""
+    __tablename__ = 'media_uploads'
+    __table_args__ = (
+        # Private buckets: posts.image_url is the object key
+        db.Index('ix_media_uploads_key', 'key'),
+    )
+
+    url = db.Column('url', db.String(255), primary_key=True) # URL returned by the upload, stored as posts.image_url
+    key = db.Column('key', db.String(255), nullable=False) # storage key of the file
+    backend = db.Column('backend', db.String(20), nullable=False) # local, gcs
+    bucket = db.Column('bucket', db.String(255)) # GCS bucket of the key, NULL for local files
+    user_id = db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False) # uploader
+    created_at = db.Column('created_at', db.Integer, default=lambda: int(datetime.now().timestamp()))
+
+    def __repr__(self):
+        return f'Upload {self.url} of user {self.user_id}'
+
+class MediaVariant(db.Model):
+    """Model resized/recompressed variant of an uploaded image"""
+    __tablename__ = 'media_variants'
+
+    # composite primary key
+    source_url = db.Column('source_url', db.String(255), primary_key=True) # URL returned by the upload, stored as posts.image_url
+    name = db.Column('name', db.String(20), primary_key=True) # thumbnail, feed, full
+    #
+
+    key = db.Column('key', db.String(255), nullable=False) # storage key of the variant
+    url = db.Column('url', db.String(255), nullable=False)
+    width = db.Column('width', db.Integer, nullable=False)
+    height = db.Column('height', db.Integer, nullable=False)
+    size_bytes = db.Column('size_bytes', db.Integer, nullable=False)
+    created_at = db.Column('created_at', db.Integer, default=lambda: int(datetime.now().timestamp()))
+
+    def __repr__(self):
+        return f'Variant {self.name} of {self.source_url}'
@@ -1,32 +1,48 @@
 from datetime import datetime
+from flask import current_app
 from app import db
 from app.models.like import Like
+from app.models.media import MediaVariant
 from app.models.user import User
+from app.utils import generate_signed_urls, is_object_key
 
 class Post(db.Model):
     """Model Post"""
     __tablename__ = 'posts'
-    
+    __table_args__ = (
+        # Latest posts, and latest posts of some users (profile, celebrity posts merged into the news feed)
+        db.Index('ix_posts_deleted_created', 'deleted', 'created_at'),
+        db.Index('ix_posts_user_deleted_created', 'user_id', 'deleted', 'created_at'),
+    )
+
     id = db.Column('id', db.Integer, primary_key=True)
     user_id =  db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False) # [Complete this]
     image_url = db.Column('image_url', db.String(255), nullable=False) # [Complete this]
     caption = db.Column('caption', db.Text) # [Complete this]    
     deleted = db.Column('deleted', db.Boolean, default=False) # [Complete this]
+    like_count = db.Column('like_count', db.Integer, nullable=False, default=0, server_default='0') # Denormalized, kept in sync by app.counters
     created_at = db.Column('created_at', db.Integer, default=lambda: int(datetime.now().timestamp())) # [Complete this]
     updated_at = db.Column('updated_at', db.Integer, default=lambda: int(datetime.now().timestamp()), onupdate=lambda: int(datetime.now().timestamp())) # [Complete this]
     
     def __repr__(self):
         return f'Post: {self.id}, User: {self.user_id}'
     
-    def to_dict(self, include_author=False, include_likes=False, current_user=None):
+    def to_dict(self, include_author=False, include_likes=False, current_user=None, include_variants=False,
+                sign_images=False):
         """Converting post to dictionary for API response.
+        sign_images replaces private object names with signed URLs of SIGNED_MEDIA_BUCKET.
         Returns:
             dict: Dictionary representation of the post.
         """
+        image_url = self.image_url
+        bucket = current_app.config['SIGNED_MEDIA_BUCKET'] if sign_images else None
+        if bucket and is_object_key(image_url):
+            image_url = generate_signed_urls([image_url], bucket)[image_url]
+
         data = {
             'id': self.id,
             'author_id': self.user_id,
-            'image_url': self.image_url,
+            'image_url': image_url,
             'caption': self.caption,
             'deleted': self.deleted,
             'created_at': datetime.utcfromtimestamp(self.created_at).isoformat() if self.created_at else None
@@ -37,10 +53,77 @@ class Post(db.Model):
             data['author'] = user.to_dict()
 
         if include_likes:
-            data['like_count'] = Like.query.filter_by(post_id=self.id).count()
+            data['like_count'] = self.like_count
             if current_user:
                 data['liked_by_current_user'] = Like.query.filter_by(post_id=self.id, user_id=current_user.id).first() is not None
             else:
                 data['liked_by_current_user'] = False
+
+        if include_variants:
+            data['variants'] = {variant.name: variant.url for variant in MediaVariant.query.filter_by(source_url=self.image_url)}
          
-        return data
\ No newline at end of file
+        return data
+
+    @classmethod
+    def sign_images(cls, posts):
+        """Sign the private images of posts up front, e.g. before a page is streamed.
+        The URLs are kept in the signed URL cache, where to_dict_many(sign_images=True) finds them.
+        """
+        bucket = current_app.config['SIGNED_MEDIA_BUCKET']
+        if bucket and posts:
+            generate_signed_urls([post.image_url for post in posts if is_object_key(post.image_url)], bucket)
+
+    @classmethod
+    def to_dict_many(cls, posts, include_author=False, include_likes=False, current_user=None, include_variants=False,
+                     sign_images=False):
+        """Converting a list of posts to dictionaries with a fixed number of queries.
+        Same output as calling to_dict on every post, but authors, liked-by-current-user
+        flags and image variants are loaded with one IN query each, and private images
+        are signed with one bulk call.
+        Returns:
+            list: Dictionary representation of every post, in the same order.
+        """
+        post_ids = [post.id for post in posts]
+
+        authors = {}
+        if include_author and posts:
+            author_ids = {post.user_id for post in posts}
+            authors = {user.id: user for user in User.query.filter(User.id.in_(author_ids))}
+
+        liked_post_ids = set()
+        if include_likes and posts and current_user:
+            liked_post_ids = {row.post_id for row in db.session.query(Like.post_id)
+                              .filter(Like.post_id.in_(post_ids), Like.user_id == current_user.id)}
+
+        variants = {}
+        if include_variants and posts:
+            image_urls = {post.image_url for post in posts}
+            for variant in MediaVariant.query.filter(MediaVariant.source_url.in_(image_urls)):
+                variants.setdefault(variant.source_url, {})[variant.name] = variant.url
+
+        signed_urls = {}
+        bucket = current_app.config['SIGNED_MEDIA_BUCKET'] if sign_images else None
+        if bucket and posts:
+            signed_urls = generate_signed_urls(
+                [post.image_url for post in posts if is_object_key(post.image_url)], bucket
+            )
+
+        items = []
+        for post in posts:
+            data = post.to_dict()
+            if post.image_url in signed_urls:
+                data['image_url'] = signed_urls[post.image_url]
+
+            if include_author:
+                data['author'] = authors[post.user_id].to_dict()
+
+            if include_likes:
+                data['like_count'] = post.like_count
+                data['liked_by_current_user'] = post.id in liked_post_ids
+
+            if include_variants:
+                data['variants'] = variants.get(post.image_url, {})
+
+            items.append(data)
+
+        return items
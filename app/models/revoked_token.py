@@ -0,0 +1,16 @@
+from datetime import datetime
+from app import db
+
+class RevokedToken(db.Model):
+    """Model revoked JWT (logout, rotated refresh token), see app/revocation.py"""
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column('jti', db.String(36), primary_key=True) # JWT ID claim
+    token_type = db.Column('token_type', db.String(10), nullable=False) # access, refresh
+    user_id = db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False)
+    expires_at = db.Column('expires_at', db.Integer, nullable=False) # exp claim, the row is useless afterwards
+    revoked_at = db.Column('revoked_at', db.Float, nullable=False, index=True,
+                           default=lambda: datetime.now().timestamp()) # processes sync rows revoked since their last sync
+
+    def __repr__(self):
+        return f'Revoked {self.token_type} token {self.jti} of user {self.user_id}'
@@ -0,0 +1,13 @@
+from datetime import datetime
+from app import db
+
+class SchemaMigration(db.Model):
+    """Model applied schema migration (see app/migrations.py)"""
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column('version', db.Integer, primary_key=True)
+    description = db.Column('description', db.String(255), nullable=False)
+    applied_at = db.Column('applied_at', db.Integer, nullable=False, default=lambda: int(datetime.now().timestamp()))
+
+    def __repr__(self):
+        return f'Migration {self.version}: {self.description}'
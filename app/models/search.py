@@ -0,0 +1,17 @@
+from app import db
+
+class UserSearchGram(db.Model):
+    """Model trigram postings for username/fullname search"""
+    __tablename__ = 'user_search_grams'
+    __table_args__ = (
+        db.Index('ix_user_search_grams_user_id', 'user_id'),
+    )
+
+    # composite primary key, (gram, field) prefix serves the postings lookup
+    gram = db.Column('gram', db.String(3), primary_key=True)
+    field = db.Column('field', db.String(8), primary_key=True) # 'username' or 'fullname'
+    user_id = db.Column('user_id', db.Integer, primary_key=True)
+    #
+
+    def __repr__(self):
+        return f'Gram {self.gram!r} in {self.field} of user {self.user_id}'
@@ -0,0 +1,22 @@
+from datetime import datetime
+from app import db
+
+class Timeline(db.Model):
+    """Model precomputed news feed entry (fan-out-on-write)"""
+    __tablename__ = 'timelines'
+    __table_args__ = (
+        db.Index('ix_timelines_user_created', 'user_id', 'created_at'),
+        # Entries of a deleted post
+        db.Index('ix_timelines_post_id', 'post_id'),
+    )
+
+    # composite primary key
+    user_id = db.Column('user_id', db.Integer, primary_key=True) # ID of the timeline owner
+    post_id = db.Column('post_id', db.Integer, primary_key=True)
+    #
+
+    author_id = db.Column('author_id', db.Integer, nullable=False) # used to trim entries on unfollow
+    created_at = db.Column('created_at', db.Integer, nullable=False, default=lambda: int(datetime.now().timestamp())) # copied from the post
+
+    def __repr__(self):
+        return f'Timeline of user {self.user_id}: post {self.post_id}'
@@ -0,0 +1,32 @@
+from datetime import datetime
+from app import db
+
+class UploadSession(db.Model):
+    """Model resumable (chunked) upload in progress"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column('id', db.String(32), primary_key=True) # opaque upload_id returned to the client
+    user_id = db.Column('user_id', db.Integer, db.ForeignKey('users.id')) # only the owner can send chunks
+    key = db.Column('key', db.String(255), nullable=False) # storage key of the final file
+    content_type = db.Column('content_type', db.String(100))
+    total_size = db.Column('total_size', db.BigInteger) # NULL until the client sends the last chunk
+    received_bytes = db.Column('received_bytes', db.BigInteger, nullable=False, default=0) # resume offset
+    backend = db.Column('backend', db.String(20), nullable=False)
+    backend_ref = db.Column('backend_ref', db.String(2048), nullable=False) # partial file path or GCS session URI
+    completed = db.Column('completed', db.Boolean, nullable=False, default=False)
+    expires_at = db.Column('expires_at', db.Integer, index=True) # UPLOAD_SESSION_TTL after the start, then purged
+    created_at = db.Column('created_at', db.Integer, default=lambda: int(datetime.now().timestamp()))
+    updated_at = db.Column('updated_at', db.Integer, default=lambda: int(datetime.now().timestamp()), onupdate=lambda: int(datetime.now().timestamp()))
+
+    def __repr__(self):
+        return f'Upload {self.id}: {self.key} ({self.received_bytes}/{self.total_size})'
+
+    def to_dict(self):
+        """Converting upload session to dictionary for API response."""
+        return {
+            'upload_id': self.id,
+            'offset': self.received_bytes,
+            'total_size': self.total_size,
+            'completed': self.completed,
+            'expires_at': self.expires_at
+        }
@@ -1,7 +1,7 @@
 from app import db
 from app.models.follow import Follow
+from app.passwords import get_password_hasher
 
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 class User(db.Model):
@@ -15,6 +15,9 @@ class User(db.Model):
     fullname = db.Column('fullname', db.String(100))
     bio = db.Column('bio', db.Text)
     profile_picture = db.Column('profile_picture', db.String(255), default='default.jpg')
+    # Denormalized counters, kept in sync by app.counters
+    follower_count = db.Column('follower_count', db.Integer, nullable=False, default=0, server_default='0')
+    following_count = db.Column('following_count', db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column('created_at', db.Integer, default=lambda: int(datetime.now().timestamp()))
     updated_at = db.Column('updated_at', db.Integer, default=lambda: int(datetime.now().timestamp()), onupdate=lambda: int(datetime.now().timestamp()))
 
@@ -24,11 +27,13 @@ class User(db.Model):
         return f''
     
     def set_password(self, password):
-        """Set hasing password
+        """Set hasing password, the KDF runs in the password hashing pool
         Args:
             password (str): Raw password will be hashed
+        Raises:
+            PasswordHasherBusy: If the hashing pool is saturated.
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
         """Comparing password with hashed password
@@ -36,8 +41,14 @@ class User(db.Model):
             password (str): Raw password will be hashed
         Returns:
             bool: True if password is correct, False otherwise
+        Raises:
+            PasswordHasherBusy: If the hashing pool is saturated.
         """
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """The password hash was made with outdated PASSWORD_HASH_METHOD parameters"""
+        return get_password_hasher().needs_rehash(self.password_hash)
     
     def to_dict(self, viewer=None):
         """Converting user to dictionary for API response.
@@ -57,8 +68,32 @@ class User(db.Model):
         # viewer ở đây là người muốn xem profile
         # "is_following" để kiểm tra xem viewer có đang follow user này không.
         if viewer:
-            data['follower_count'] = Follow.query.filter_by(following_id=self.id).count()
-            data['following_count'] = Follow.query.filter_by(follower_id=self.id).count()
+            data['follower_count'] = self.follower_count
+            data['following_count'] = self.following_count
             data['is_following'] = Follow.query.filter_by(follower_id=viewer.id, following_id=self.id).first() is not None
 
-        return data
\ No newline at end of file
+        return data
+
+    @classmethod
+    def to_dict_many(cls, users, viewer=None):
+        """Converting a list of users to dictionaries, same output as to_dict on every user
+        but the is_following flags are loaded with one IN query.
+        Returns:
+            list: Dictionary representation of every user, in the same order.
+        """
+        followed_ids = set()
+        if viewer and users:
+            followed_ids = {row.following_id for row in db.session.query(Follow.following_id)
+                            .filter(Follow.follower_id == viewer.id,
+                                    Follow.following_id.in_([user.id for user in users]))}
+
+        items = []
+        for user in users:
+            data = user.to_dict()
+            if viewer:
+                data['follower_count'] = user.follower_count
+                data['following_count'] = user.following_count
+                data['is_following'] = user.id in followed_ids
+            items.append(data)
+
+        return items
\ No newline at end of file
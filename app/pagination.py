@@ -0,0 +1,142 @@
+import base64
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import or_, and_
+
+logger = logging.getLogger(__name__)
+
+# Các chế độ trả về total ở cursor mode
+TOTAL_MODES = ('cached', 'exact', 'none')
+
+class InvalidCursor(ValueError):
+    """Raised when the ?cursor= value cannot be decoded"""
+
+def encode_cursor(*position):
+    """Encode a position such as (created_at, id) as an opaque URL-safe cursor"""
+    raw = ':'.join(str(value) for value in position).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, size=2):
+    """Decode a cursor created by encode_cursor from a position of size integers.
+    Returns:
+        tuple: (created_at, id), or None for an empty cursor (first page).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = tuple(int(value) for value in base64.urlsafe_b64decode(padded).decode().split(':'))
+    except ValueError:
+        raise InvalidCursor(f'Invalid cursor: {cursor}')
+    if len(position) != size:
+        raise InvalidCursor(f'Invalid cursor: {cursor}')
+    return position
+
+def keyset_filter(created_col, id_col, position):
+    """Filter rows strictly after position in (created_at DESC, id DESC) order"""
+    created_at, item_id = position
+    return or_(created_col < created_at, and_(created_col == created_at, id_col < item_id))
+
+def clamp_per_page(per_page):
+    """Bound a ?per_page= value to [1, MAX_PER_PAGE]"""
+    return min(max(per_page, 1), current_app.config['MAX_PER_PAGE'])
+
+def paginate_keyset(query, created_col, id_col, cursor, per_page):
+    """Seek to the page after the cursor instead of using OFFSET.
+    Returns:
+        tuple: (list of items, next cursor or None on the last page)
+    """
+    per_page = clamp_per_page(per_page)
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(keyset_filter(created_col, id_col, position))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key) or 0, getattr(last, id_col.key))
+    return items, next_cursor
+
+class TotalsCache:
+    """Per-process cache of COUNT(*) results.
+    Stale or missing totals are recomputed in a background thread, the request
+    gets the last known value (or None) and never waits for the COUNT.
+    """
+
+    def __init__(self, max_size=10000, max_workers=2):
+        self.max_size = max_size
+        self.max_workers = max_workers
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get(self, key, count_fn, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None or entry[1] <= time.time():
+            self._schedule_refresh(key, count_fn, ttl)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _schedule_refresh(self, key, count_fn, ttl):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='totals')
+
+        app = current_app._get_current_object()
+        self._executor.submit(self._refresh, app, key, count_fn, ttl)
+
+    def _refresh(self, app, key, count_fn, ttl):
+        try:
+            with app.app_context():
+                self.set(key, count_fn(), ttl)
+        except Exception:
+            logger.exception('Error refreshing total for %s', key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+totals_cache = TotalsCache()
+
+def resolve_total(mode, key, count_fn):
+    """Return the total for a cursor page according to ?total=.
+    count_fn must build its query itself, it may run outside the request.
+    """
+    if mode == 'none':
+        return None
+    if mode == 'exact':
+        return count_fn()
+    return totals_cache.get(key, count_fn, current_app.config['PAGINATION_TOTAL_TTL'])
+
+def cursor_pagination(per_page, next_cursor, total):
+    """Pagination block of a cursor mode response"""
+    return {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'total': total
+    }
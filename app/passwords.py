@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+from app import PASSWORD_HASH_DURATION, PASSWORD_HASH_PENDING, PASSWORD_HASH_REJECTED
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot frees up within PASSWORD_HASH_QUEUE_TIMEOUT"""
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def _verify(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+def _normalize_method(method):
+    """Method string with Werkzeug's defaults filled in: 'pbkdf2:sha256' -> ('pbkdf2', 'sha256', 600000)"""
+    name, *args = method.split(':')
+    try:
+        if name == 'scrypt':
+            n, r, p = map(int, args) if args else (2**15, 8, 1)
+            return name, n, r, p
+        if name == 'pbkdf2':
+            hash_name = args[0] if args else 'sha256'
+            iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+            return name, hash_name, iterations
+    except ValueError:
+        pass
+    return (method,)
+
+class PasswordHasher:
+    """Run the (deliberately slow) password KDF in a bounded process pool.
+
+    At most max_pending hashes are queued or running per web process; a
+    request that cannot get a slot within queue_timeout seconds fails fast
+    with PasswordHasherBusy instead of holding its worker. The pool only pays
+    off when a web process serves several requests at once (gthread or ASGI
+    workers): a sync worker is blocked for the whole hash anyway, so it
+    should run with workers=0 and hash in the calling thread. gunicorn.conf.py
+    picks the value from the worker class and sizes the pools so that all
+    web processes together start about one hashing process per CPU.
+    """
+
+    def __init__(self, method, workers, max_pending, queue_timeout):
+        self.method = method
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            # A pool inherited through fork has no live worker processes
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _run(self, operation, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            PASSWORD_HASH_REJECTED.labels(operation=operation).inc()
+            raise PasswordHasherBusy('Too many concurrent password operations, try again later')
+
+        PASSWORD_HASH_PENDING.inc()
+        started = time.perf_counter()
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+            PASSWORD_HASH_PENDING.dec()
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run('hash', _hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Check a password against a stored hash"""
+        return self._run('verify', _verify, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """The stored hash was made with other parameters than PASSWORD_HASH_METHOD"""
+        return _normalize_method(pwhash.split('$', 1)[0]) != _normalize_method(self.method)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+def get_password_hasher():
+    """Return the password hasher of the current app"""
+    return current_app.extensions['password_hasher']
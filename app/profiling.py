@@ -0,0 +1,99 @@
+import cProfile
+import glob
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import time
+
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+# Header bật profiling cho một request, giá trị phải bằng PROFILING_TOKEN
+PROFILE_HEADER = 'X-Profile'
+# "inline": trả về bảng thống kê pstats thay cho response, mặc định ghi file .prof
+PROFILE_OUTPUT_HEADER = 'X-Profile-Output'
+
+def _authorized():
+    """The request carries a valid profiling token"""
+    token = current_app.config['PROFILING_TOKEN']
+    header = request.headers.get(PROFILE_HEADER)
+    return bool(token and header and hmac.compare_digest(header.encode(), token.encode()))
+
+def _sampled():
+    rate = current_app.config['PROFILING_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+def _rotate(folder, max_files):
+    """Keep only the max_files most recent profiles"""
+    paths = sorted(glob.glob(os.path.join(folder, '*.prof')), key=os.path.getmtime)
+    for path in paths[:max(0, len(paths) - max_files)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def dump_profile(profiler, endpoint):
+    """Write a snakeviz/pstats compatible .prof file named after the endpoint.
+    Returns:
+        str: Path of the file.
+    """
+    folder = current_app.config['PROFILING_DIR']
+    os.makedirs(folder, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint or 'unknown')
+    path = os.path.join(folder, f'{name}-{request.method}-{int(time.time() * 1000)}-{os.getpid()}.prof')
+    profiler.dump_stats(path)
+    _rotate(folder, current_app.config['PROFILING_MAX_FILES'])
+    return path
+
+def summarize(profiler, limit):
+    """pstats report sorted by cumulative time, limited to the top functions"""
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+def register_profiling(app):
+    """Profile selected requests with cProfile, without touching controller code"""
+
+    @app.before_request
+    def start_profiling():
+        authorized = _authorized()
+        if not authorized and not _sampled():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return
+        g.profiler = profiler
+        g.profile_authorized = authorized
+
+    @app.after_request
+    def stop_profiling(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+
+        # Only the token holder sees the profile, sampled requests are written to disk silently
+        authorized = g.pop('profile_authorized', False)
+        if authorized and request.headers.get(PROFILE_OUTPUT_HEADER) == 'inline':
+            summary = app.response_class(
+                summarize(profiler, app.config['PROFILING_SUMMARY_LINES']),
+                mimetype='text/plain'
+            )
+            summary.headers['X-Profile-Status'] = str(response.status_code)
+            return summary
+
+        try:
+            path = dump_profile(profiler, request.endpoint)
+            if authorized:
+                response.headers['X-Profile-File'] = os.path.basename(path)
+        except OSError:
+            logger.exception('Error writing profile of %s', request.endpoint)
+        return response
@@ -0,0 +1,141 @@
+import re
+
+from flask import current_app
+from sqlalchemy import func, text
+
+from app import db
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.post import Post
+from app.models.timeline import Timeline
+from app.models.user import User
+
+# Giá trị mẫu dùng để dựng các query, plan không phụ thuộc vào giá trị cụ thể
+SAMPLE_ID = 1
+SAMPLE_IDS = [1, 2, 3]
+SAMPLE_LIMIT = 20
+
+_hot_queries = {}
+
+def hot_query(name):
+    """Register a function building one of the hot queries (a select statement) for the EXPLAIN check"""
+    def decorator(build):
+        _hot_queries[name] = build
+        return build
+    return decorator
+
+# --- News feed (app/timeline.py) ---
+
+@hot_query('newsfeed.timeline')
+def newsfeed_timeline():
+    return db.select(Timeline.post_id, Timeline.created_at)\
+        .where(Timeline.user_id == SAMPLE_ID)\
+        .order_by(Timeline.created_at.desc(), Timeline.post_id.desc())\
+        .limit(SAMPLE_LIMIT)
+
+@hot_query('newsfeed.celebrity_followees')
+def newsfeed_celebrity_followees():
+    return db.select(Follow.following_id)\
+        .join(User, User.id == Follow.following_id)\
+        .where(Follow.follower_id == SAMPLE_ID, User.follower_count > current_app.config['FANOUT_FOLLOWER_LIMIT'])
+
+@hot_query('newsfeed.celebrity_posts')
+def newsfeed_celebrity_posts():
+    return db.select(Post.id, Post.created_at)\
+        .where(Post.user_id.in_(SAMPLE_IDS), Post.deleted == False)\
+        .order_by(Post.created_at.desc(), Post.id.desc())\
+        .limit(SAMPLE_LIMIT)
+
+@hot_query('newsfeed.fanout_recipients')
+def newsfeed_fanout_recipients():
+    return db.select(Follow.follower_id).where(Follow.following_id == SAMPLE_ID)
+
+@hot_query('newsfeed.remove_post')
+def newsfeed_remove_post():
+    return db.select(Timeline.user_id).where(Timeline.post_id == SAMPLE_ID)
+
+# --- Posts ---
+
+@hot_query('posts.latest')
+def posts_latest():
+    return db.select(Post.id)\
+        .where(Post.deleted == False)\
+        .order_by(Post.created_at.desc())\
+        .limit(SAMPLE_LIMIT)
+
+@hot_query('posts.of_user')
+def posts_of_user():
+    return db.select(Post.id)\
+        .where(Post.user_id == SAMPLE_ID, Post.deleted == False)\
+        .order_by(Post.created_at.desc(), Post.id.desc())\
+        .limit(SAMPLE_LIMIT)
+
+@hot_query('posts.count_of_user')
+def posts_count_of_user():
+    return db.select(func.count()).select_from(Post).where(Post.user_id == SAMPLE_ID, Post.deleted == False)
+
+# --- Counters (app/counters.py) ---
+
+@hot_query('counters.like_count')
+def counters_like_count():
+    return db.select(Like.post_id, func.count()).where(Like.post_id.in_(SAMPLE_IDS)).group_by(Like.post_id)
+
+@hot_query('counters.follower_count')
+def counters_follower_count():
+    return db.select(Follow.following_id, func.count())\
+        .where(Follow.following_id.in_(SAMPLE_IDS))\
+        .group_by(Follow.following_id)
+
+@hot_query('counters.following_count')
+def counters_following_count():
+    return db.select(Follow.follower_id, func.count())\
+        .where(Follow.follower_id.in_(SAMPLE_IDS))\
+        .group_by(Follow.follower_id)
+
+def hot_queries():
+    return dict(_hot_queries)
+
+def _sql(statement):
+    return str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+def explain(statement):
+    """Plan of a statement on the current database.
+    Returns:
+        list: (plan line, scanned table or None when the line is not a full scan)
+    """
+    tables = set(db.metadata.tables)
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as connection:
+        if dialect == 'sqlite':
+            # "SCAN posts" reads the whole table or index, "SEARCH posts USING INDEX ..." seeks into it
+            lines = []
+            for row in connection.execute(text('EXPLAIN QUERY PLAN ' + _sql(statement))):
+                match = re.match(r'SCAN (?:TABLE )?(\w+)', row.detail)
+                lines.append((row.detail, match.group(1) if match and match.group(1) in tables else None))
+            return lines
+        if dialect == 'mysql':
+            # type ALL is a full table scan, index a full index scan
+            return [
+                (' '.join(f'{key}={value}' for key, value in row.items()),
+                 row['table'] if row['type'] in ('ALL', 'index') else None)
+                for row in connection.execute(text('EXPLAIN ' + _sql(statement))).mappings()
+            ]
+        if dialect == 'postgresql':
+            lines = []
+            for (line,) in connection.execute(text('EXPLAIN ' + _sql(statement))):
+                match = re.search(r'Seq Scan on (\w+)', line)
+                lines.append((line, match.group(1) if match else None))
+            return lines
+    raise NotImplementedError(f'EXPLAIN is not supported on {dialect}')
+
+def check_query_plans():
+    """EXPLAIN every hot query.
+    Returns:
+        dict: {query name: list of full scan plan lines}, only the queries falling back to a full scan.
+    """
+    failures = {}
+    for name, build in _hot_queries.items():
+        scans = [line for line, table in explain(build()) if table]
+        if scans:
+            failures[name] = scans
+    return failures
@@ -0,0 +1,135 @@
+import random
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+# Các method chỉ đọc dữ liệu, được phép đọc từ replica
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Bind key của replica thứ i: replica_0, replica_1, ...
+REPLICA_BIND_PREFIX = 'replica_'
+# Cookie đánh dấu client vừa ghi dữ liệu, các request tiếp theo đọc từ primary
+STICKY_COOKIE = 'db_primary'
+# Header trả về sau khi ghi (unix timestamp hết hạn sticky), client không giữ cookie gửi lại header này
+STICKY_HEADER = 'X-DB-Primary-Until'
+
+def _pool_options(uri, size, timeout):
+    """Pool options of one bind, SQLite in-memory databases use a StaticPool without size/timeout"""
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {'pool_size': size, 'pool_timeout': timeout}
+
+def configure_binds(app, poolclass):
+    """Pool options of the primary and one bind per SQLALCHEMY_REPLICA_URIS, before db.init_app"""
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('poolclass', poolclass)
+    if app.config['SQLALCHEMY_DATABASE_URI']:
+        for key, value in _pool_options(app.config['SQLALCHEMY_DATABASE_URI'],
+                                        app.config['DB_POOL_SIZE'], app.config['DB_POOL_TIMEOUT']).items():
+            options.setdefault(key, value)
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for index, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = {
+            'url': uri,
+            'poolclass': poolclass,
+            **_pool_options(uri, app.config['DB_REPLICA_POOL_SIZE'], app.config['DB_REPLICA_POOL_TIMEOUT']),
+        }
+
+def replica_keys(app=None):
+    config = (app or current_app).config
+    return [key for key in config['SQLALCHEMY_BINDS'] if key and key.startswith(REPLICA_BIND_PREFIX)]
+
+def _identity():
+    """JWT identity of the request once it has been verified (token_required), else None"""
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+def _sticky():
+    """The client wrote recently: its replicas may lag behind, read from the primary.
+    The cookie and the header come back with the request, whichever worker served the write;
+    the identity cache only knows the writes served by this process.
+    """
+    if request.cookies.get(STICKY_COOKIE):
+        return True
+    until = request.headers.get(STICKY_HEADER, type=float)
+    if until is not None and until > time.time():
+        return True
+    identity = _identity()
+    return identity is not None and current_app.extensions['primary_sticky'].get(identity) is not None
+
+@contextmanager
+def primary():
+    """Run the statements of the block on the primary, e.g. to read a row right after it was written"""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('db_primary', False)
+    g.db_primary = True
+    try:
+        yield
+    finally:
+        g.db_primary = previous
+
+class RoutingSession(Session):
+    """Session sending the reads of safe requests (GET, HEAD, OPTIONS) to a replica.
+    Writes, every statement after a write in the same request, and the requests of
+    a client that wrote less than REPLICA_STICKY_SECONDS ago go to the primary
+    (read-your-writes). Without a request context (jobs, CLI) everything goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_primary = True
+                g.db_wrote = True
+            elif request.method in SAFE_METHODS and not g.get('db_primary'):
+                key = self._replica_key()
+                if key is not None:
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_key(self):
+        if 'db_replica' not in g:
+            keys = replica_keys()
+            g.db_replica = random.choice(keys) if keys else None
+        if g.db_replica is None:
+            return None
+        if _sticky():
+            g.db_primary = True
+            return None
+        return g.db_replica
+
+def register_replica_routing(app):
+    """Remember the clients that wrote, so that their next reads see their own writes"""
+
+    # Replicas serve the tables of the default bind: no metadata of their own, db.create_all() skips them
+    from app import db
+    for key in replica_keys(app):
+        db.metadatas.pop(key, None)
+
+    @app.before_request
+    def reset_routing():
+        # g outlives the request when an app context was already pushed (tests, CLI)
+        for key in ('db_primary', 'db_wrote', 'db_replica'):
+            g.pop(key, None)
+
+    @app.after_request
+    def remember_write(response):
+        if not g.get('db_wrote') or not app.config['SQLALCHEMY_REPLICA_URIS']:
+            return response
+        sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+        # Cookie for clients keeping cookies, a header for API clients to send back,
+        # and the identity for clients doing neither (only in this process)
+        response.set_cookie(STICKY_COOKIE, '1', max_age=sticky_seconds, httponly=True, samesite='Lax')
+        response.headers[STICKY_HEADER] = str(int(time.time()) + sticky_seconds)
+        identity = _identity()
+        if identity is not None:
+            app.extensions['primary_sticky'].set(identity, True)
+        return response
@@ -0,0 +1,119 @@
+import gzip
+import zlib
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: the default provider (json module) is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered
+    brotli = None
+
+# Loại response được nén (ảnh/video đã được nén sẵn)
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/css', 'text/csv', 'application/javascript'}
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider serializing with orjson, several times faster than the json module on API payloads.
+    Values orjson does not know (dates, Decimal, UUID, dataclasses) are converted like the default
+    provider does, and anything orjson rejects (e.g. integers above 64 bits) falls back to it.
+    """
+
+    mimetype = 'application/json'
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) \
+        if orjson else 0
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._fallback = DefaultJSONProvider(app)
+
+    def _dumps_bytes(self, obj):
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.options)
+        except TypeError:
+            return self._fallback.dumps(obj).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson returns bytes: skip the str round trip of JSONProvider.response
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
+
+def create_json_provider(app):
+    """JSON provider selected by JSON_PROVIDER ("orjson" when installed, or "default")"""
+    if app.config['JSON_PROVIDER'] == 'orjson' and orjson is not None:
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
+
+def available_encodings(algorithms):
+    """Configured algorithms whose library is installed, in order of preference"""
+    return [algorithm for algorithm in algorithms if algorithm == 'gzip' or (algorithm == 'br' and brotli)]
+
+def _compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+def _compress_stream(chunks, encoding, config):
+    """Compress a streamed body chunk by chunk, without buffering it"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        compress, finish = compressor.process, compressor.finish
+    else:
+        # wbits 31: gzip container
+        compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            data = compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def register_compression(app):
+    """Compress text responses with the best encoding accepted by the client (br, gzip).
+    Must be registered before the other after_request hooks: it runs last and sees the final body.
+    """
+    encodings = available_encodings(app.config['COMPRESS_ALGORITHMS'])
+
+    @app.after_request
+    def compress_response(response):
+        if not encodings or response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304) or request.method == 'HEAD':
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, app.config)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < app.config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(_compress(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+
+        # The compressed body is a different byte sequence: a strong validator becomes weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
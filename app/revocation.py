@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.util import await_
+
+from app import db, jwt, TOKEN_REVOCATION_CHECKS
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Khoảng chồng lấn (giây) khi sync: row có revoked_at cũ hơn lần sync trước nhưng commit muộn vẫn được đọc
+SYNC_OVERLAP = 60
+# Chu kỳ (giây) kiểm tra lại lock khi request chạy trên event loop (ASGI) phải chờ lần sync đầu tiên
+LOCK_POLL_INTERVAL = 0.005
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings: no false negatives, error_rate false positives at capacity."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+def _acquire(lock, wait):
+    """Acquire a threading lock, also from a request run on the event loop by the ASGI entry
+    point (app/aio.py): there the holder may be another greenlet of the same thread, so the
+    wait yields to the loop instead of blocking it.
+    """
+    if lock.acquire(blocking=False):
+        return True
+    if not wait:
+        return False
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return lock.acquire()
+    while not lock.acquire(blocking=False):
+        await_(asyncio.sleep(LOCK_POLL_INTERVAL))
+    return True
+
+class RevocationList:
+    """Per-process copy of the revoked_tokens table.
+
+    A Bloom filter answers almost every check ("not revoked") without
+    touching the exact set; neither needs the database. New rows are pulled
+    at most every sync_interval seconds, and the structures are rebuilt from
+    unexpired rows every rebuild_interval seconds so they do not grow forever.
+    Tokens revoked by another process are rejected here after at most sync_interval.
+    """
+
+    def __init__(self, capacity, error_rate, sync_interval, rebuild_interval):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        # Held by the caller running the sync query (no lock is held during database I/O)
+        self._sync_lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = {}
+        self._synced_at = None
+        self._next_sync = 0
+        self._next_rebuild = 0
+
+    def _add(self, jti, expires_at):
+        self._bloom.add(jti)
+        self._revoked[jti] = expires_at
+
+    def _sync(self, now):
+        rebuild = now >= self._next_rebuild
+        if rebuild:
+            rows = db.session.query(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)\
+                .filter(RevokedToken.expires_at > now).all()
+        else:
+            rows = db.session.query(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)\
+                .filter(RevokedToken.revoked_at >= self._synced_at - SYNC_OVERLAP).all()
+
+        with self._lock:
+            if rebuild:
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+                self._revoked = {}
+                self._next_rebuild = now + self.rebuild_interval
+            for jti, expires_at, revoked_at in rows:
+                self._add(jti, expires_at)
+            self._synced_at = max([now] + [revoked_at for _, _, revoked_at in rows])
+            self._next_sync = now + self.sync_interval
+
+    def refresh(self):
+        """Pull the revoked tokens if the copy is due.
+        One caller syncs, the others check against the current copy instead of waiting
+        (no lock is held during the query), except before the first sync.
+        """
+        now = time.time()
+        if now < self._next_sync or not _acquire(self._sync_lock, wait=self._synced_at is None):
+            return
+        try:
+            if now >= self._next_sync:
+                self._sync(now)
+        except Exception:
+            # Keep checking against the last synced copy, retry on the next interval
+            db.session.rollback()
+            self._next_sync = now + self.sync_interval
+            logger.exception('Error syncing revoked tokens')
+        finally:
+            self._sync_lock.release()
+
+    def is_revoked(self, jti):
+        self.refresh()
+        with self._lock:
+            if jti not in self._bloom:
+                TOKEN_REVOCATION_CHECKS.labels(result='bloom_miss').inc()
+                return False
+            revoked = jti in self._revoked
+            TOKEN_REVOCATION_CHECKS.labels(result='revoked' if revoked else 'false_positive').inc()
+            return revoked
+
+    def revoke(self, payload):
+        """Record a decoded token as revoked in the current transaction (the caller commits)"""
+        jti, expires_at = payload['jti'], payload['exp']
+        if db.session.get(RevokedToken, jti) is None:
+            db.session.add(RevokedToken(
+                jti=jti,
+                token_type=payload.get('type', 'access'),
+                user_id=int(payload['sub']),
+                expires_at=expires_at
+            ))
+        # This process sees the revocation immediately, the others on their next sync
+        with self._lock:
+            self._add(jti, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            self._revoked = {}
+            self._synced_at = None
+            self._next_sync = self._next_rebuild = 0
+
+def get_revocation_list():
+    """Return the token revocation list of the current app"""
+    return current_app.extensions['revocation_list']
+
+@jwt.token_in_blocklist_loader
+def is_token_revoked(jwt_header, jwt_payload):
+    """Called by verify_jwt_in_request (token_required, refresh) for every token"""
+    return get_revocation_list().is_revoked(jwt_payload['jti'])
+
+def purge_revoked_tokens():
+    """Delete revocation rows of tokens that have expired anyway.
+    Returns:
+        int: Number of rows deleted.
+    """
+    result = db.session.execute(db.delete(RevokedToken).where(RevokedToken.expires_at <= time.time()))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,158 @@
+from flask import current_app
+from sqlalchemy import case, func
+
+from app import db
+from app.models.search import UserSearchGram
+from app.models.user import User
+from app.pagination import keyset_filter
+
+# Các field được đánh index, theo thứ tự ưu tiên khi xếp hạng kết quả
+INDEXED_FIELDS = ('username', 'fullname')
+# Số candidate lấy từ trigram index = SEARCH_MAX_RESULTS * hệ số này, vì trigram chỉ là
+# điều kiện cần: một phần candidate bị loại khi kiểm tra substring
+GRAM_OVERSAMPLE = 4
+
+def trigrams(text):
+    """Return the set of lowercase 3-character grams of text"""
+    text = (text or '').lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def index_user(user):
+    """(Re)build the search postings of one user in the current transaction.
+    The user must already be flushed.
+    """
+    UserSearchGram.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+    rows = [
+        {'gram': gram, 'field': field, 'user_id': user.id}
+        for field in INDEXED_FIELDS
+        for gram in trigrams(getattr(user, field))
+    ]
+    if rows:
+        db.session.execute(db.insert(UserSearchGram), rows)
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the postings of every user, batch by batch.
+    Returns:
+        int: Number of indexed users.
+    """
+    indexed = 0
+    last_id = 0
+    while True:
+        users = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+        for user in users:
+            index_user(user)
+        db.session.commit()
+        indexed += len(users)
+        last_id = users[-1].id
+    return indexed
+
+def _escape_like(term):
+    """Make the LIKE wildcards of term literal (escape character: backslash)"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _prefix_candidates(term, limit):
+    """Users whose username starts with term, served by the unique username index, newest first"""
+    escaped = _escape_like(term)
+    return (User.query.filter(User.username.like(f'{escaped}%', escape='\\'))
+            .order_by(User.created_at.desc(), User.id.desc())
+            .limit(limit).all())
+
+def _gram_candidates(term, limit):
+    """Users having every trigram of term in the username or fullname postings.
+    Ordered in SQL like the final ranking (username matches first, then newest first)
+    so the limit drops the weakest candidates.
+    """
+    grams = trigrams(term)
+    matches = (db.session.query(UserSearchGram.user_id, UserSearchGram.field)
+               .filter(UserSearchGram.gram.in_(grams))
+               .group_by(UserSearchGram.user_id, UserSearchGram.field)
+               .having(func.count() == len(grams))
+               .subquery())
+    ranked = (db.session.query(
+                  matches.c.user_id,
+                  func.min(case((matches.c.field == 'username', 0), else_=1)).label('field_rank'))
+              .group_by(matches.c.user_id)
+              .subquery())
+    return (User.query.join(ranked, ranked.c.user_id == User.id)
+            .order_by(ranked.c.field_rank, User.created_at.desc(), User.id.desc())
+            .limit(limit).all())
+
+def _rank(user, term):
+    """Ranking bucket: username prefix, username substring, fullname substring"""
+    username = user.username.lower()
+    if username.startswith(term):
+        return 0
+    if term in username:
+        return 1
+    if term in (user.fullname or '').lower():
+        return 2
+    return None
+
+def find_users(term):
+    """Search users by username (prefix first) and fullname.
+    Terms shorter than a trigram only match username prefixes.
+    Returns:
+        list: Matching users, best rank first then newest first, at most SEARCH_MAX_RESULTS.
+    """
+    term = term.lower()
+    limit = current_app.config['SEARCH_MAX_RESULTS']
+    # The username prefixes (best rank) are always candidates, whatever the trigram limit keeps
+    candidates = {user.id: user for user in _prefix_candidates(term, limit)}
+    if len(term) >= 3:
+        for user in _gram_candidates(term, limit * GRAM_OVERSAMPLE):
+            candidates.setdefault(user.id, user)
+
+    # Trigram postings are a superset of the substring matches, check each candidate
+    ranked = []
+    for user in candidates.values():
+        rank = _rank(user, term)
+        if rank is not None:
+            ranked.append((rank, -(user.created_at or 0), -user.id, user))
+    ranked.sort(key=lambda entry: entry[:3])
+    return [entry[3] for entry in ranked[:limit]]
+
+def _gram_matches(term, field):
+    """Ids of the users having every trigram of term in the postings of field"""
+    grams = trigrams(term)
+    return (db.select(UserSearchGram.user_id)
+            .where(UserSearchGram.gram.in_(grams), UserSearchGram.field == field)
+            .group_by(UserSearchGram.user_id)
+            .having(func.count() == len(grams)))
+
+def _rank_queries(term):
+    """One query per ranking bucket of _rank, as (rank, query), term already lowercase.
+    The substring buckets are narrowed by the trigram postings and checked with LIKE.
+    """
+    escaped = _escape_like(term)
+    prefix = User.username.like(f'{escaped}%', escape='\\')
+    in_username = User.username.like(f'%{escaped}%', escape='\\')
+    queries = [(0, User.query.filter(prefix))]
+    if len(term) >= 3:
+        queries.append((1, User.query.filter(User.id.in_(_gram_matches(term, 'username')), in_username, ~prefix)))
+        queries.append((2, User.query.filter(User.id.in_(_gram_matches(term, 'fullname')),
+                                             User.fullname.like(f'%{escaped}%', escape='\\'), ~in_username)))
+    return queries
+
+def find_users_after(term, position, limit):
+    """Page of the find_users ranking seeking after position instead of slicing the bounded list.
+    position is the (rank, created_at, id) of the last user of the previous page, or None.
+    Returns:
+        list: (rank, user) of at most limit users, in ranking order.
+    """
+    results = []
+    for rank, query in _rank_queries(term.lower()):
+        if position and rank < position[0]:
+            continue
+        if position and rank == position[0]:
+            query = query.filter(keyset_filter(User.created_at, User.id, position[1:]))
+        users = query.order_by(User.created_at.desc(), User.id.desc()).limit(limit - len(results)).all()
+        results.extend((rank, user) for user in users)
+        if len(results) >= limit:
+            break
+    return results
+
+def count_users(term):
+    """Number of users find_users_after can return for term"""
+    return sum(query.count() for _, query in _rank_queries(term.lower()))
@@ -0,0 +1,60 @@
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import SQL_QUERY_DURATION, SQL_QUERIES, SQL_QUERIES_PER_REQUEST, DB_POOL_CHECKOUT_WAIT
+
+# Loại câu lệnh dùng làm label, các loại khác được gộp vào OTHER
+STATEMENT_TYPES = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+
+def current_endpoint():
+    """Metrics label of the statement: Flask endpoint, or "background" for jobs/CLI/threads"""
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+def _statement_type(statement):
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return keyword if keyword in STATEMENT_TYPES else 'OTHER'
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+    endpoint = current_endpoint()
+    SQL_QUERY_DURATION.labels(endpoint=endpoint, statement=_statement_type(statement)).observe(duration)
+    SQL_QUERIES.labels(endpoint=endpoint).inc()
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+def observe_request_queries(endpoint, request_g):
+    """Record the number of statements run by a request, once its body has been sent.
+    request_g is the g of the request: a streamed body runs queries after after_request.
+    """
+    SQL_QUERIES_PER_REQUEST.labels(endpoint=endpoint).observe(request_g.get('sql_query_count', 0))
+
+class _TimedCheckout:
+    """Pool mixin recording how long a checkout waits for a free connection.
+    SQLAlchemy has no event before a checkout starts, so the wait is timed here.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool of the sync engines, with the checkout wait metric"""
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """Pool of the asyncio engines (app/aio.py), with the checkout wait metric.
+    The checkout runs in the greenlet of the request: the time it waits on the loop is recorded.
+    """
@@ -0,0 +1,299 @@
+import abc
+import asyncio
+import functools
+import os
+import shutil
+import threading
+import uuid
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy.util import await_
+
+# Kích thước buffer khi copy stream, bộ nhớ dùng cho một upload không vượt quá giá trị này
+COPY_BUFFER_SIZE = 64 * 1024
+
+# Chunk của GCS resumable upload phải là bội số của 256 KiB (trừ chunk cuối)
+GCS_CHUNK_ALIGNMENT = 256 * 1024
+
+StoredFile = namedtuple('StoredFile', ['key', 'url'])
+
+class StorageError(Exception):
+    """Raised when a storage backend rejects an upload"""
+
+class GCSClientRegistry:
+    """Lazily created, per-process Google Cloud Storage clients.
+
+    google.cloud is imported on first use only. The client (and its pooled
+    HTTP session) is shared by every bucket and every call in the process, and
+    dropped after fork so workers never reuse the parent's connections.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._buckets = {}
+        self._session = None
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._buckets = {}
+        self._session = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._client = None
+            self._buckets = {}
+            self._session = None
+
+    def client(self):
+        with self._lock:
+            self._check_pid()
+            if self._client is None:
+                from google.cloud import storage
+                self._client = storage.Client()
+            return self._client
+
+    def bucket(self, bucket_name):
+        client = self.client()
+        with self._lock:
+            bucket = self._buckets.get(bucket_name)
+            if bucket is None:
+                bucket = self._buckets[bucket_name] = client.bucket(bucket_name)
+            return bucket
+
+    def session(self):
+        """Keep-alive HTTP session for pre-authorized resumable upload URIs"""
+        with self._lock:
+            self._check_pid()
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            return self._session
+
+gcs_clients = GCSClientRegistry()
+
+def run_blocking(fn, *args, **kwargs):
+    """Call a blocking storage function (GCS HTTP request, IAM signing).
+    Under the ASGI entry point (app/aio.py) the read endpoints run in a greenlet on the
+    event loop: the call then runs in the loop's thread pool and only its request waits.
+    In a WSGI worker thread it is a plain call.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return fn(*args, **kwargs)
+    return await_(loop.run_in_executor(None, functools.partial(fn, *args, **kwargs)))
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=gcs_clients.reset)
+
+class StorageBackend(abc.ABC):
+    """Interface of the media storage backends.
+
+    Resumable uploads are driven by the caller: start_upload returns an opaque
+    reference that is persisted (see UploadSession) and passed back to
+    write_chunk and finish_upload on the following requests.
+    """
+
+    @abc.abstractmethod
+    def save(self, stream, filename, content_type=None):
+        """Stream a whole file to the backend under a new unique key.
+        Returns:
+            StoredFile: Storage key and public URL.
+        """
+
+    @abc.abstractmethod
+    def put(self, key, stream, content_type=None):
+        """Stream a whole file to the backend under the given key.
+        Returns:
+            StoredFile: Storage key and public URL.
+        """
+
+    @abc.abstractmethod
+    def open(self, key):
+        """Open a stored file for reading"""
+
+    @abc.abstractmethod
+    def start_upload(self, filename, content_type=None, total_size=None):
+        """Open a resumable upload.
+        Returns:
+            tuple: (storage key, backend reference of the upload)
+        """
+
+    @abc.abstractmethod
+    def write_chunk(self, reference, offset, stream, length, total_size=None):
+        """Write length bytes read from stream at offset of a resumable upload"""
+
+    @abc.abstractmethod
+    def finish_upload(self, key, reference):
+        """Complete a resumable upload once every byte has been written.
+        Returns:
+            StoredFile: Storage key and public URL.
+        """
+
+    @abc.abstractmethod
+    def abort_upload(self, reference):
+        """Discard the bytes of an unfinished resumable upload"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Delete a stored file"""
+
+    @abc.abstractmethod
+    def url(self, key):
+        """Public URL of a stored file"""
+
+def _copy_exactly(stream, destination, length):
+    """Copy exactly length bytes from stream to destination in bounded buffers"""
+    remaining = length
+    while remaining > 0:
+        data = stream.read(min(COPY_BUFFER_SIZE, remaining))
+        if not data:
+            raise StorageError(f'Chunk is {length - remaining} bytes, expected {length}')
+        destination.write(data)
+        remaining -= len(data)
+
+class LocalStorage(StorageBackend):
+    """Store media in the local upload folder, served by the /uploads/<filename> route"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.partial_folder = os.path.join(folder, '.partial')
+
+    def _path(self, key):
+        # Keys are flat filenames, never paths
+        return os.path.join(self.folder, os.path.basename(key))
+
+    def save(self, stream, filename, content_type=None):
+        path = self._path(filename)
+        with open(path, 'xb') as f:
+            shutil.copyfileobj(stream, f, COPY_BUFFER_SIZE)
+        return StoredFile(filename, self.url(filename))
+
+    def put(self, key, stream, content_type=None):
+        with open(self._path(key), 'wb') as f:
+            shutil.copyfileobj(stream, f, COPY_BUFFER_SIZE)
+        return StoredFile(key, self.url(key))
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def start_upload(self, filename, content_type=None, total_size=None):
+        os.makedirs(self.partial_folder, exist_ok=True)
+        reference = os.path.join(self.partial_folder, uuid.uuid4().hex)
+        open(reference, 'xb').close()
+        return filename, reference
+
+    def write_chunk(self, reference, offset, stream, length, total_size=None):
+        with open(reference, 'r+b') as f:
+            f.seek(offset)
+            _copy_exactly(stream, f, length)
+            f.truncate()
+
+    def finish_upload(self, key, reference):
+        path = self._path(key)
+        if os.path.exists(path):
+            raise StorageError(f'File {key} already exists')
+        os.replace(reference, path)
+        return StoredFile(key, self.url(key))
+
+    def abort_upload(self, reference):
+        try:
+            os.remove(reference)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key):
+        return f'/uploads/{os.path.basename(key)}'
+
+class GCSStorage(StorageBackend):
+    """Store media in a Google Cloud Storage bucket"""
+
+    def __init__(self, bucket_name, folder, chunk_size):
+        self.bucket_name = bucket_name
+        self.folder = folder
+        self.chunk_size = chunk_size
+
+    @property
+    def bucket(self):
+        return gcs_clients.bucket(self.bucket_name)
+
+    @property
+    def session(self):
+        # Resumable session URIs are pre-authorized, a plain keep-alive session is enough
+        return gcs_clients.session()
+
+    def _key(self, filename):
+        return f'{self.folder}/{uuid.uuid4().hex}_{filename}'
+
+    def save(self, stream, filename, content_type=None):
+        return self.put(self._key(filename), stream, content_type)
+
+    def put(self, key, stream, content_type=None):
+        blob = self.bucket.blob(key)
+        # chunk_size makes the client send a resumable upload chunk by chunk
+        blob.chunk_size = self.chunk_size
+        blob.upload_from_file(stream, content_type=content_type)
+        return StoredFile(blob.name, blob.public_url)
+
+    def open(self, key):
+        return self.bucket.blob(key).open('rb')
+
+    def start_upload(self, filename, content_type=None, total_size=None):
+        blob = self.bucket.blob(self._key(filename))
+        reference = blob.create_resumable_upload_session(content_type=content_type, size=total_size)
+        return blob.name, reference
+
+    def write_chunk(self, reference, offset, stream, length, total_size=None):
+        is_last = total_size is not None and offset + length == total_size
+        if not is_last and length % GCS_CHUNK_ALIGNMENT:
+            raise StorageError(f'Chunk size must be a multiple of {GCS_CHUNK_ALIGNMENT} bytes')
+
+        data = stream.read(length)
+        if len(data) != length:
+            raise StorageError(f'Chunk is {len(data)} bytes, expected {length}')
+
+        total = total_size if total_size is not None else '*'
+        response = self.session.put(reference, data=data, headers={
+            'Content-Range': f'bytes {offset}-{offset + length - 1}/{total}'
+        })
+        # 308 = chunk stored, upload incomplete; 200/201 = upload complete
+        if response.status_code not in (200, 201, 308):
+            raise StorageError(f'GCS rejected chunk: {response.status_code} {response.text}')
+
+    def finish_upload(self, key, reference):
+        return StoredFile(key, self.url(key))
+
+    def abort_upload(self, reference):
+        # Cancels the resumable session, GCS answers 499 and drops the uploaded bytes
+        self.session.delete(reference)
+
+    def delete(self, key):
+        self.bucket.blob(key).delete()
+
+    def url(self, key):
+        return self.bucket.blob(key).public_url
+
+def create_storage(config):
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    backend = config['STORAGE_BACKEND']
+    if backend == 'local':
+        return LocalStorage(config['LOCAL_UPLOAD_FOLDER'])
+    if backend == 'gcs':
+        return GCSStorage(config['GCS_BUCKET_NAME'], config['GCS_UPLOAD_FOLDER'], config['UPLOAD_CHUNK_SIZE'])
+    raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
+
+def get_storage():
+    """Return the storage backend of the current app"""
+    return current_app.extensions['storage']
@@ -0,0 +1,230 @@
+import bisect
+import itertools
+import math
+import random
+from array import array
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.post import Post
+from app.models.search import UserSearchGram
+from app.models.timeline import Timeline
+from app.models.user import User
+from app.search import INDEXED_FIELDS, trigrams
+from app.timeline import build_timelines
+
+# Tỉ lệ bài đăng theo giờ trong ngày (0h-23h): ít vào ban đêm, nhiều nhất vào buổi tối
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 7, 8, 7, 6, 6, 7, 8, 10, 12, 13, 12, 8, 4]
+
+# Bảng bị ảnh hưởng khi nạp dữ liệu, index phụ của chúng có thể được drop rồi tạo lại
+LOADED_TABLES = (User, Follow, Post, Like, Timeline, UserSearchGram)
+
+def _lognormal(rng, mean, sigma):
+    """Heavy-tailed positive integer with the given mean (most values small, a few very large)"""
+    if mean <= 0:
+        return 0
+    return int(rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma) + 0.5)
+
+class _ZipfSampler:
+    """Sample ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** alpha"""
+
+    def __init__(self, n, alpha):
+        self.cumulative = array('d', itertools.accumulate((rank + 1) ** -alpha for rank in range(n)))
+        self.total = self.cumulative[-1]
+
+    def sample(self, rng):
+        return bisect.bisect_left(self.cumulative, rng.random() * self.total)
+
+class _BatchWriter:
+    """Bulk insert rows with one executemany per batch_size rows, committing each batch"""
+
+    def __init__(self, model, batch_size):
+        self.model = model
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            db.session.execute(db.insert(self.model), self.rows)
+            db.session.commit()
+            self.count += len(self.rows)
+            self.rows = []
+
+def secondary_indexes():
+    """Non-unique indexes of the loaded tables, cheaper to rebuild once than to maintain row by row"""
+    return [index for model in LOADED_TABLES for index in model.__table__.indexes if not index.unique]
+
+def _write_users(first_id, users, days, password_hash, prefix, now, batch_size, progress):
+    writer = _BatchWriter(User, batch_size)
+    grams = _BatchWriter(UserSearchGram, batch_size)
+    for user_id in range(first_id, first_id + users):
+        created_at = now - days * 86400 + (user_id - first_id) * days * 86400 // max(users, 1)
+        row = {
+            'id': user_id,
+            'username': f'{prefix}{user_id}',
+            'email': f'{prefix}{user_id}@example.com',
+            'fullname': f'Synthetic User {user_id}',
+            'password_hash': password_hash,
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+        writer.add(row)
+        for field in INDEXED_FIELDS:
+            for gram in trigrams(row[field]):
+                grams.add({'gram': gram, 'field': field, 'user_id': user_id})
+        if progress and user_id > first_id and (user_id - first_id) % batch_size == 0:
+            progress(f'users: {user_id - first_id}/{users}')
+    writer.flush()
+    grams.flush()
+    return writer.count
+
+def _write_follows(first_id, users, follows_per_user, zipf_alpha, rng, batch_size, progress):
+    """Power-law graph: out-degree is log-normal, followees are picked by Zipf popularity rank.
+    Returns:
+        tuple: (number of follows, follower count per user offset, following count per user offset)
+    """
+    follower_counts = array('l', bytes(8 * users)) if users else array('l')
+    following_counts = array('l', bytes(8 * users)) if users else array('l')
+    sampler = _ZipfSampler(users, zipf_alpha)
+    writer = _BatchWriter(Follow, batch_size)
+
+    for offset in range(users):
+        wanted = min(users - 1, _lognormal(rng, follows_per_user, 1.0))
+        followees = set()
+        attempts = 0
+        while len(followees) < wanted and attempts < wanted * 4:
+            attempts += 1
+            target = sampler.sample(rng)
+            if target != offset:
+                followees.add(target)
+        for target in followees:
+            writer.add({'follower_id': first_id + offset, 'following_id': first_id + target})
+            follower_counts[target] += 1
+        following_counts[offset] = len(followees)
+        if progress and offset and offset % batch_size == 0:
+            progress(f'follows: {offset}/{users} users done')
+
+    writer.flush()
+    return writer.count, follower_counts, following_counts
+
+def _write_posts_and_likes(first_id, users, posts_per_user, likes_per_post, days, follower_counts,
+                           follows_per_user, rng, now, batch_size, progress):
+    """Posting cadence: posts per user are log-normal, spread over the last days with a daily rhythm.
+    Like skew: the expected likes of a post grow with its author's follower count.
+    Returns:
+        tuple: (number of posts, number of likes)
+    """
+    first_post_id = (db.session.query(func.max(Post.id)).scalar() or 0) + 1
+    posts = _BatchWriter(Post, batch_size)
+    likes = _BatchWriter(Like, batch_size)
+    hours = list(range(24))
+    post_id = first_post_id
+
+    for offset in range(users):
+        author_id = first_id + offset
+        popularity = (follower_counts[offset] + 1) / (follows_per_user + 1)
+        for _ in range(_lognormal(rng, posts_per_user, 1.2)):
+            day = rng.randrange(days)
+            hour = rng.choices(hours, HOURLY_WEIGHTS)[0]
+            created_at = now - day * 86400 - (23 - hour) * 3600 - rng.randrange(3600)
+            like_count = min(users, _lognormal(rng, likes_per_post * popularity, 1.0))
+
+            posts.add({
+                'id': post_id,
+                'user_id': author_id,
+                'image_url': f'https://picsum.photos/seed/{post_id}/1080/1080',
+                'caption': f'Synthetic post {post_id}',
+                'deleted': False,
+                'like_count': like_count,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+            for liker in rng.sample(range(first_id, first_id + users), like_count):
+                likes.add({'user_id': liker, 'post_id': post_id, 'created_at': created_at})
+            post_id += 1
+
+        if progress and offset and offset % batch_size == 0:
+            progress(f'posts: {offset}/{users} users done')
+
+    # Posts first: likes reference them
+    posts.flush()
+    likes.flush()
+    return posts.count, likes.count
+
+def _write_counters(first_id, follower_counts, following_counts, batch_size):
+    """Set the denormalized follow counters with batched UPDATE ... WHERE id = ?"""
+    rows = []
+    for offset, (followers, following) in enumerate(zip(follower_counts, following_counts)):
+        rows.append({'id': first_id + offset, 'follower_count': followers, 'following_count': following})
+        if len(rows) >= batch_size:
+            db.session.execute(db.update(User), rows)
+            db.session.commit()
+            rows = []
+    if rows:
+        db.session.execute(db.update(User), rows)
+        db.session.commit()
+
+def _write_timelines(first_id, users, batch_size, progress):
+    """Build the fan-out-on-write timelines of the generated users, one batch of owners at a time.
+    Posts of accounts above FANOUT_FOLLOWER_LIMIT are left out, they are merged at read time.
+    """
+    owners_per_batch = max(1, batch_size // 100)
+    written = 0
+    for start in range(first_id, first_id + users, owners_per_batch):
+        end = min(start + owners_per_batch, first_id + users) - 1
+        written += build_timelines(list(range(start, end + 1)))
+        db.session.commit()
+        if progress:
+            progress(f'timelines: {end - first_id + 1}/{users} users done')
+    return written
+
+def generate_dataset(users, posts_per_user=10, follows_per_user=50, likes_per_post=5, days=90, zipf_alpha=1.1,
+                     batch_size=10000, seed=42, password='password123', prefix='user', timelines=True,
+                     drop_indexes=False, progress=None):
+    """Generate a synthetic social graph and bulk load it after the existing rows.
+    The same seed always produces the same dataset. With drop_indexes the secondary
+    indexes of the loaded tables are dropped during the load and rebuilt at the end.
+    Returns:
+        dict: Number of rows written per table.
+    """
+    rng = random.Random(seed)
+    now = int(datetime.now().timestamp())
+    first_id = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    password_hash = current_app.extensions['password_hasher'].hash(password)
+    db.session.commit()
+
+    indexes = secondary_indexes() if drop_indexes else []
+    for index in indexes:
+        index.drop(db.engine, checkfirst=True)
+
+    try:
+        counts = {'users': _write_users(first_id, users, days, password_hash, prefix, now, batch_size, progress)}
+        counts['follows'], follower_counts, following_counts = _write_follows(
+            first_id, users, follows_per_user, zipf_alpha, rng, batch_size, progress
+        )
+        _write_counters(first_id, follower_counts, following_counts, batch_size)
+        counts['posts'], counts['likes'] = _write_posts_and_likes(
+            first_id, users, posts_per_user, likes_per_post, days, follower_counts, follows_per_user,
+            rng, now, batch_size, progress
+        )
+        if timelines:
+            counts['timelines'] = _write_timelines(first_id, users, batch_size, progress)
+    finally:
+        db.session.rollback()
+        for index in indexes:
+            if progress:
+                progress(f'rebuilding index {index.name}')
+            index.create(db.engine, checkfirst=True)
+
+    return counts
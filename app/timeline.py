@@ -0,0 +1,223 @@
+from flask import current_app
+from sqlalchemy import func, or_, and_, select
+
+from app import db
+from app.models.follow import Follow
+from app.models.post import Post
+from app.models.user import User
+from app.models.timeline import Timeline
+from app.pagination import clamp_per_page, decode_cursor, encode_cursor, keyset_filter
+
+def _config(key):
+    return current_app.config[key]
+
+def _is_fanout_on_read(author_id):
+    """Check if the author has too many followers for fan-out-on-write"""
+    follower_count = db.session.query(User.follower_count).filter(User.id == author_id).scalar()
+    return (follower_count or 0) > _config('FANOUT_FOLLOWER_LIMIT')
+
+def _fanout_recipients(author_id):
+    """Return the user IDs whose timeline receives a new post of the author.
+    Returns:
+        list: [author_id] plus the followers, or only [author_id] when the author
+        has too many followers (their posts are merged at read time instead).
+    """
+    if _is_fanout_on_read(author_id):
+        return [author_id]
+    followers = [row.follower_id for row in db.session.query(Follow.follower_id)
+                 .filter(Follow.following_id == author_id)]
+    return [author_id] + followers
+
+def _celebrity_followees(user_id):
+    """Return IDs of the accounts followed by user_id that are served by fan-out-on-read"""
+    rows = db.session.query(Follow.following_id)\
+        .join(User, User.id == Follow.following_id)\
+        .filter(Follow.follower_id == user_id, User.follower_count > _config('FANOUT_FOLLOWER_LIMIT'))
+    return [row.following_id for row in rows]
+
+def _trim_timelines(user_ids):
+    """Cut timelines back to TIMELINE_MAX_LENGTH entries.
+    Only timelines that grew past the limit plus a slack are trimmed, so a follower
+    is trimmed once every few posts instead of on every post.
+    """
+    if not user_ids:
+        return
+    max_length = _config('TIMELINE_MAX_LENGTH')
+    slack = max(max_length // 4, 1)
+    overfull = db.session.query(Timeline.user_id)\
+        .filter(Timeline.user_id.in_(user_ids))\
+        .group_by(Timeline.user_id)\
+        .having(func.count() > max_length + slack)\
+        .all()
+
+    for (user_id,) in overfull:
+        # The oldest entry that is still kept
+        cutoff = db.session.query(Timeline.created_at, Timeline.post_id)\
+            .filter(Timeline.user_id == user_id)\
+            .order_by(Timeline.created_at.desc(), Timeline.post_id.desc())\
+            .offset(max_length - 1).limit(1).first()
+        Timeline.query.filter(
+            Timeline.user_id == user_id,
+            or_(Timeline.created_at < cutoff.created_at,
+                and_(Timeline.created_at == cutoff.created_at, Timeline.post_id < cutoff.post_id))
+        ).delete(synchronize_session=False)
+
+def fan_out_post(post):
+    """Push a new post into the timelines of its author and followers.
+    The caller owns the transaction, the post must already be flushed.
+    """
+    recipients = _fanout_recipients(post.user_id)
+    db.session.execute(db.insert(Timeline), [
+        {'user_id': user_id, 'post_id': post.id, 'author_id': post.user_id, 'created_at': post.created_at}
+        for user_id in recipients
+    ])
+    _trim_timelines(recipients)
+
+def backfill_timeline(follower_id, author_id):
+    """Copy the latest posts of a newly followed author into the follower's timeline"""
+    if _is_fanout_on_read(author_id):
+        # Posts of this author are merged into the feed at read time
+        return
+
+    existing = db.select(Timeline.post_id).where(Timeline.user_id == follower_id, Timeline.author_id == author_id)
+    posts = db.session.query(Post.id, Post.created_at)\
+        .filter(Post.user_id == author_id, Post.deleted == False, Post.id.not_in(existing))\
+        .order_by(Post.created_at.desc(), Post.id.desc())\
+        .limit(_config('TIMELINE_BACKFILL_SIZE'))\
+        .all()
+    if not posts:
+        return
+
+    db.session.execute(db.insert(Timeline), [
+        {'user_id': follower_id, 'post_id': post.id, 'author_id': author_id, 'created_at': post.created_at}
+        for post in posts
+    ])
+    _trim_timelines([follower_id])
+
+def build_timelines(user_ids):
+    """Fill the empty timelines of user_ids from the follows and posts tables with INSERT ... SELECT:
+    their own posts and the posts of the followed accounts served by fan-out-on-write.
+    The caller owns the transaction.
+    Returns:
+        int: Number of entries written.
+    """
+    if not user_ids:
+        return 0
+    followed = select(Follow.follower_id, Post.id, Post.user_id, Post.created_at)\
+        .join(Post, Post.user_id == Follow.following_id)\
+        .join(User, User.id == Post.user_id)\
+        .where(Follow.follower_id.in_(user_ids), Follow.following_id != Follow.follower_id,
+               Post.deleted == False, User.follower_count <= _config('FANOUT_FOLLOWER_LIMIT'))
+    own = select(Post.user_id, Post.id, Post.user_id.label('author_id'), Post.created_at)\
+        .where(Post.user_id.in_(user_ids), Post.deleted == False)
+    result = db.session.execute(
+        db.insert(Timeline).from_select(['user_id', 'post_id', 'author_id', 'created_at'], followed.union_all(own))
+    )
+    _trim_timelines(user_ids)
+    return max(result.rowcount, 0)
+
+def rebuild_timelines(batch_size=100, progress=None):
+    """Rebuild the timeline of every user from the follows and posts tables, one batch of users
+    per transaction. Used after deploying timelines on an existing database, or to repair them.
+    Returns:
+        int: Number of entries written.
+    """
+    written = 0
+    done = 0
+    last_id = 0
+    while True:
+        user_ids = [row.id for row in db.session.query(User.id)
+                    .filter(User.id > last_id).order_by(User.id).limit(batch_size)]
+        if not user_ids:
+            break
+        Timeline.query.filter(Timeline.user_id.in_(user_ids)).delete(synchronize_session=False)
+        written += build_timelines(user_ids)
+        db.session.commit()
+        done += len(user_ids)
+        last_id = user_ids[-1]
+        if progress:
+            progress(f'timelines: {done} users done')
+    return written
+
+def trim_author_from_timeline(follower_id, author_id):
+    """Remove every post of an unfollowed author from the follower's timeline"""
+    Timeline.query.filter_by(user_id=follower_id, author_id=author_id)\
+        .delete(synchronize_session=False)
+
+def remove_post_from_timelines(post_id):
+    """Remove a deleted post from every timeline it was fanned out to"""
+    Timeline.query.filter_by(post_id=post_id).delete(synchronize_session=False)
+
+def _feed_entries(user_id, limit, position=None):
+    """Merge precomputed timeline entries with the posts of fan-out-on-read authors.
+    Returns:
+        tuple: (list of (post_id, created_at) newest first, celebrity followee IDs)
+    """
+    query = db.session.query(Timeline.post_id, Timeline.created_at)\
+        .filter(Timeline.user_id == user_id)
+    if position:
+        query = query.filter(keyset_filter(Timeline.created_at, Timeline.post_id, position))
+    entries = query.order_by(Timeline.created_at.desc(), Timeline.post_id.desc())\
+        .limit(limit)\
+        .all()
+
+    celebrities = _celebrity_followees(user_id)
+    if celebrities:
+        pulled = db.session.query(Post.id, Post.created_at)\
+            .filter(Post.user_id.in_(celebrities), Post.deleted == False)
+        if position:
+            pulled = pulled.filter(keyset_filter(Post.created_at, Post.id, position))
+        entries = entries + pulled.order_by(Post.created_at.desc(), Post.id.desc())\
+            .limit(limit)\
+            .all()
+        # A post could be both precomputed (backfilled before the author grew) and pulled
+        entries = sorted(set((post_id, created_at or 0) for post_id, created_at in entries),
+                         key=lambda entry: (entry[1], entry[0]), reverse=True)
+
+    return entries[:limit], celebrities
+
+def _load_posts(post_ids):
+    """Load posts by ID, keeping the given order and skipping deleted posts"""
+    if not post_ids:
+        return []
+    posts = {post.id: post for post in Post.query.filter(Post.id.in_(post_ids), Post.deleted == False)}
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+def count_timeline(user_id, celebrities=None):
+    """Count the entries of the user's news feed"""
+    total = Timeline.query.filter_by(user_id=user_id).count()
+    if celebrities is None:
+        celebrities = _celebrity_followees(user_id)
+    if celebrities:
+        total += Post.query.filter(Post.user_id.in_(celebrities), Post.deleted == False).count()
+    return total
+
+def read_timeline(user_id, page, per_page):
+    """Read one page of the user's news feed.
+    Precomputed timeline entries are merged with the latest posts of followed
+    accounts that are too large for fan-out-on-write.
+    Returns:
+        tuple: (list of Post ordered newest first, total number of feed entries)
+    """
+    page = max(page, 1)
+    per_page = clamp_per_page(per_page)
+    window = page * per_page
+
+    entries, celebrities = _feed_entries(user_id, window)
+    post_ids = [post_id for post_id, _ in entries[(page - 1) * per_page:window]]
+    return _load_posts(post_ids), count_timeline(user_id, celebrities)
+
+def read_timeline_after(user_id, cursor, per_page):
+    """Read the page of the user's news feed that follows the cursor.
+    Returns:
+        tuple: (list of Post ordered newest first, next cursor or None on the last page)
+    """
+    per_page = clamp_per_page(per_page)
+    entries, _ = _feed_entries(user_id, per_page + 1, decode_cursor(cursor))
+    page_entries = entries[:per_page]
+
+    next_cursor = None
+    if len(entries) > per_page:
+        post_id, created_at = page_entries[-1]
+        next_cursor = encode_cursor(created_at, post_id)
+    return _load_posts([post_id for post_id, _ in page_entries]), next_cursor
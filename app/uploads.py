@@ -0,0 +1,78 @@
+import hashlib
+import mimetypes
+import os
+import re
+import time
+
+from flask import abort, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+from app import db
+from app.models.upload import UploadSession
+from app.storage import get_storage
+
+# Tên file upload có prefix timestamp (xem unique_filename) nên nội dung không bao giờ đổi
+IMMUTABLE_FILENAME = re.compile(r'^\d{9,}_')
+
+def stat_etag(filename, stat):
+    """Strong ETag derived from the file name, size and mtime, no byte of the file is read"""
+    raw = f'{filename}:{stat.st_size}:{stat.st_mtime_ns}'
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+def send_upload(filename):
+    """Serve a local upload with validators, Range support and cache headers.
+    Conditional requests are answered with 304 before any byte is read;
+    with UPLOADS_OFFLOAD the bytes themselves are sent by the proxy.
+    """
+    folder = current_app.config['LOCAL_UPLOAD_FOLDER']
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    stat = os.stat(path)
+    etag = stat_etag(filename, stat)
+    immutable = bool(IMMUTABLE_FILENAME.match(filename))
+    max_age = current_app.config['UPLOADS_IMMUTABLE_MAX_AGE' if immutable else 'UPLOADS_MAX_AGE']
+
+    if current_app.config['UPLOADS_OFFLOAD'] == 'x-accel':
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = current_app.response_class(mimetype=mimetype)
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        response = response.make_conditional(request)
+        if response.status_code != 304:
+            # nginx serves the file (and Range requests) from its internal location
+            response.headers['X-Accel-Redirect'] = f"{current_app.config['UPLOADS_ACCEL_PREFIX']}/{filename}"
+    else:
+        # Werkzeug answers If-None-Match/If-Modified-Since with 304 and Range with 206;
+        # X-Sendfile is used when USE_X_SENDFILE is enabled
+        response = send_from_directory(folder, filename, etag=etag, max_age=max_age, conditional=True)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = immutable
+    return response
+
+def purge_upload_sessions(batch_size=1000):
+    """Delete expired upload sessions, and the partial files of the unfinished ones.
+    Completed uploads keep their file, only the session row is deleted.
+    Returns:
+        int: Number of sessions deleted.
+    """
+    storage = get_storage()
+    backend = current_app.config['STORAGE_BACKEND']
+    deleted = 0
+    while True:
+        expired = UploadSession.query\
+            .filter(UploadSession.expires_at <= time.time())\
+            .limit(batch_size)\
+            .all()
+        if not expired:
+            break
+        for upload in expired:
+            if not upload.completed and upload.backend == backend:
+                storage.abort_upload(upload.backend_ref)
+        db.session.execute(db.delete(UploadSession).where(UploadSession.id.in_([upload.id for upload in expired])))
+        db.session.commit()
+        deleted += len(expired)
+    return deleted
@@ -1,20 +1,25 @@
-from flask import jsonify
+from flask import jsonify, current_app, request, stream_with_context
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from functools import wraps
-from google.cloud import storage
-import uuid
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
 from datetime import timedelta
 
+from app import db, IDENTITY_CACHE_REQUESTS, SIGNED_URL_CACHE_REQUESTS
+from app.jobs import task
 from app.models.user import User
+from app.replicas import primary, replica_keys
+from app.storage import gcs_clients, run_blocking
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-BUCKET_NAME = "kilogram-media"
-client = storage.Client()
-bucket = client.bucket(BUCKET_NAME)
+# Counters change on every follow/unfollow, they are always loaded from the database
+IDENTITY_CACHE_EXCLUDE = ('follower_count', 'following_count')
 
-def api_response(data=None, message=None, status=200):
-    """Formating JSON response for API"""
+def api_response(data=None, message=None, status=200, etag=None):
+    """Formating JSON response for API
+    etag (see app/etags.py) lets the client revalidate the response with If-None-Match.
+    """
     response = {
         'success': 200 <= status < 300,
         'status': status
@@ -26,7 +31,58 @@ def api_response(data=None, message=None, status=200):
     if data is not None:
         response['data'] = data
 
-    return jsonify(response), status
+    json_response = jsonify(response)
+    if etag is not None:
+        # Per-user data: only the client may cache it, and must revalidate it every time
+        json_response.set_etag(etag, weak=True)
+        json_response.headers['Cache-Control'] = 'private, no-cache'
+    return json_response, status
+
+def api_list_response(items, serialize, extra=None, etag=None, prepare=None):
+    """Formating the JSON response {'items': [...], **extra} of a list endpoint.
+    Pages of at least STREAM_MIN_ITEMS items are streamed: serialize(batch) runs on
+    STREAM_BATCH_SIZE items at a time and every item is written once encoded, so the
+    memory used does not grow with per_page. The items list is consumed.
+    prepare(items) runs on the whole page before the status line is sent (e.g. signing
+    every image URL), and so does the first batch: their errors are still a 500 response.
+    The session is closed once the last batch is serialized.
+    """
+    extra = extra or {}
+    if len(items) < current_app.config['STREAM_MIN_ITEMS']:
+        return api_response(data={'items': serialize(items), **extra}, etag=etag)
+
+    batch_size = max(current_app.config['STREAM_BATCH_SIZE'], 1)
+    dumps = current_app.json.dumps
+
+    if prepare is not None:
+        prepare(items)
+
+    def next_batch():
+        batch = items[:batch_size]
+        # Drop the references to the batch: serialized posts can be garbage collected
+        del items[:batch_size]
+        return serialize(batch)
+
+    pending = [next_batch()]
+
+    def generate():
+        yield '{"success":true,"status":200,"data":{"items":['
+        separator = ''
+        while pending or items:
+            batch = pending.pop() if pending else next_batch()
+            if not items:
+                # Every row is loaded: give the connection back while the client reads the rest
+                db.session.close()
+            for data in batch:
+                yield separator + dumps(data)
+                separator = ','
+        yield ']' + (',' + dumps(extra)[1:] if extra else '}') + '}'
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=current_app.json.mimetype)
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 def token_required(fn):
     """Decorator for authenticate API Using JWT token."""
@@ -39,8 +95,8 @@ def token_required(fn):
             # Get the user_id (identity) from the JWT token
             user_id = get_jwt_identity()
 
-            # Get the user profile from the database
-            current_user = User.query.get(user_id)
+            # Get the user profile from the identity cache or the database
+            current_user = load_user(user_id)
 
             # Check if the user exists in the database
             if not current_user:
@@ -52,20 +108,55 @@ def token_required(fn):
             return api_response(message=f"Token is invalid: {str(e)}", status=401)
     return wrapper
 
+def load_user(identity):
+    """Load the authenticated user, served from the per-process identity cache when possible.
+    A cache hit returns a session-bound User without running any query.
+    """
+    cache = current_app.extensions['identity_cache']
+    snapshot = cache.get(identity)
+    if snapshot is not None:
+        IDENTITY_CACHE_REQUESTS.labels(result='hit').inc()
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    IDENTITY_CACHE_REQUESTS.labels(result='miss').inc()
+    user = User.query.get(identity)
+    if user is None and replica_keys():
+        # A user created a moment ago may not have reached the replica yet
+        with primary():
+            user = User.query.get(identity)
+    if user:
+        cache.set(identity, {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+            if attr.key not in IDENTITY_CACHE_EXCLUDE
+        })
+    return user
+
+def invalidate_user(user_id):
+    """Drop a user from the identity cache, must be called after the user row changes"""
+    current_app.extensions['identity_cache'].delete(str(user_id))
+
+def parse_ids(max_ids):
+    """Read the ?ids= list of a bulk lookup, comma separated and/or repeated (ids=1,2&ids=3).
+    Returns:
+        list: Distinct integer IDs in request order.
+    Raises:
+        ValueError: If an ID is not an integer, or there are more than max_ids IDs.
+    """
+    values = [value for param in request.args.getlist('ids') for value in param.split(',') if value.strip()]
+    ids = list(dict.fromkeys(int(value) for value in values))
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids are allowed")
+    return ids
+
 def allowed_file(filename):
     """Check if the file extension is allowed
     """
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS and filename.rsplit('.', 1)[0].lower() != ''
 
-def upload_file_to_gcs(file_obj, destination_folder):
-    """Upload file to Google Cloud Storage
-    """
-    filename = f"{destination_folder}/{uuid.uuid4().hex}_{file_obj.filename}"
-    blob = bucket.blob(filename)
-    blob.upload_from_file(file_obj, content_type=file_obj.content_type)
-    return blob.public_url
-
-def generate_signed_url(filename, bucket_name, expiration_minutes=15):
+def generate_signed_url(filename, bucket_name, expiration_minutes=15, method="GET"):
     """
     Giả sử bucket đã được thiết lập không công khai, chúng ta có thể tạo signed URL
     Khi nào cần ?
@@ -74,23 +165,58 @@ def generate_signed_url(filename, bucket_name, expiration_minutes=15):
         - Tăng bảo mật cho ảnh tải từ mobile app.
         - Giới hạn thời gian xem file, giảm nguy cơ bị phát tán URL.
     Nếu không có yêu cầu riêng tư, việc dùng public URL vẫn là lựa chọn đơn giản và tiết kiệm chi phí hơn.
-    """
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(filename)
 
-    url = blob.generate_signed_url(
+    URL đã ký được cache theo (bucket, object, method) và dùng lại cho tới
+    SIGNED_URL_SAFETY_MARGIN giây trước khi hết hạn, vì ký V4 tốn CPU.
+    """
+    cache = current_app.extensions['signed_url_cache']
+    key = (bucket_name, filename, method)
+    url = cache.get(key)
+    if url is not None:
+        SIGNED_URL_CACHE_REQUESTS.labels(result='hit').inc()
+        return url
+
+    SIGNED_URL_CACHE_REQUESTS.labels(result='miss').inc()
+    # The first call creates the client (credentials lookup), signing may call the IAM API
+    blob = run_blocking(gcs_clients.bucket, bucket_name).blob(filename)
+
+    url = run_blocking(
+        blob.generate_signed_url,
         version="v4",
         expiration=timedelta(minutes=expiration_minutes),
-        method="GET"
+        method=method
     )
 
+    ttl = expiration_minutes * 60 - current_app.config['SIGNED_URL_SAFETY_MARGIN']
+    if ttl > 0:
+        cache.set(key, url, ttl=ttl)
+
     return url
 
+def generate_signed_urls(filenames, bucket_name, expiration_minutes=15, method="GET"):
+    """Sign many objects at once, e.g. every image of a feed page.
+    Returns:
+        dict: {filename: signed URL}, each distinct object is signed at most once.
+    """
+    return {
+        filename: generate_signed_url(filename, bucket_name, expiration_minutes, method)
+        for filename in dict.fromkeys(filenames)
+    }
+
+def is_object_key(image_url):
+    """image_url is a private object name (not an absolute or /uploads URL)"""
+    return bool(image_url) and '://' not in image_url and not image_url.startswith('/')
+
+@task()
 def delete_file_from_gcs(filename, bucket_name):
     """UC09 – người dùng xóa bài viết, chúng ta cũng cần xóa ảnh/video khỏi bucket tương ứng.
+    Chạy ở background job (xem delete_post), chỉ cho object được ghi nhận trong media_uploads thuộc
+    các bucket đã cấu hình; có thể được retry nên object đã bị xóa không phải là lỗi.
     """
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(filename)
-    blob.delete()
\ No newline at end of file
+    from google.api_core.exceptions import NotFound
+
+    blob = gcs_clients.bucket(bucket_name).blob(filename)
+    try:
+        blob.delete()
+    except NotFound:
+        pass
\ No newline at end of file
@@ -0,0 +1,5 @@
+# ASGI entry point (uvicorn asgi:app), next to the WSGI one (gunicorn main:app)
+from app.aio import AsyncApp
+from main import app as flask_app
+
+app = AsyncApp(flask_app)
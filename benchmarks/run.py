@@ -0,0 +1,263 @@
+"""Microbenchmarks of the hot request paths, against a seeded SQLite database.
+
+    python -m benchmarks.run                          # compare with benchmarks/baselines/default.json
+    python -m benchmarks.run --save                   # record the current numbers as the baseline
+    python -m benchmarks.run --sizes 100,1000 --threshold 0.25 --filter newsfeed
+
+Each case is timed per dataset size (number of users). The run fails (exit code 1)
+when a case is slower than the baseline by more than the threshold, or runs more
+SQL statements than the baseline (an N+1 regression).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.post import Post
+from app.models.user import User
+from benchmarks.seed import seed
+
+BENCHMARKS_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_ROOT, 'baselines', 'default.json')
+
+# Chênh lệch tuyệt đối (ms) nhỏ hơn giá trị này được coi là nhiễu, không phải regression
+NOISE_FLOOR_MS = 0.05
+
+CASES = {}
+
+def case(name):
+    """Register a benchmark case: prepare(ctx) does the untimed setup and returns the timed callable"""
+    def decorator(prepare):
+        CASES[name] = prepare
+        return prepare
+    return decorator
+
+class Context:
+    """Seeded app shared by the cases of one dataset size"""
+
+    def __init__(self, app, users):
+        self.app = app
+        self.client = app.test_client()
+        self.users = users
+        self.user_id = 1
+        self.other_id = 2
+        self.post_id = db.session.query(Post.id).filter(Post.user_id == self.other_id).first()[0]
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+
+    def get(self, path):
+        def request():
+            response = self.client.get(path, headers=self.headers)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {path} returned {response.status_code}')
+        return request
+
+# --- Serializers ---
+
+@case('serializer.post_to_dict')
+def post_to_dict(ctx):
+    post, viewer = db.session.get(Post, ctx.post_id), db.session.get(User, ctx.user_id)
+    return lambda: post.to_dict(include_author=True, include_likes=True, current_user=viewer, include_variants=True)
+
+@case('serializer.post_to_dict_many')
+def post_to_dict_many(ctx):
+    posts = Post.query.order_by(Post.created_at.desc()).limit(20).all()
+    viewer = db.session.get(User, ctx.user_id)
+    return lambda: Post.to_dict_many(posts, include_author=True, include_likes=True, current_user=viewer,
+                                     include_variants=True)
+
+@case('serializer.user_to_dict')
+def user_to_dict(ctx):
+    user, viewer = db.session.get(User, ctx.other_id), db.session.get(User, ctx.user_id)
+    return lambda: user.to_dict(viewer=viewer)
+
+# --- Endpoints ---
+
+@case('auth.token_required')
+def token_required(ctx):
+    return ctx.get('/api/auth/me')
+
+@case('endpoint.newsfeed')
+def newsfeed(ctx):
+    return ctx.get('/api/posts/newsfeed?per_page=20')
+
+@case('endpoint.newsfeed_cursor')
+def newsfeed_cursor(ctx):
+    return ctx.get('/api/posts/newsfeed?per_page=20&cursor=&total=none')
+
+@case('endpoint.get_post')
+def get_post(ctx):
+    return ctx.get(f'/api/posts/{ctx.post_id}')
+
+@case('endpoint.bulk_posts')
+def bulk_posts(ctx):
+    ids = ','.join(str(post_id) for post_id in range(1, 21))
+    return ctx.get(f'/api/posts?ids={ids}')
+
+@case('endpoint.user_profile')
+def user_profile(ctx):
+    return ctx.get(f'/api/users/{ctx.other_id}/profile')
+
+@case('endpoint.user_posts')
+def user_posts(ctx):
+    return ctx.get(f'/api/users/{ctx.other_id}/posts?per_page=20')
+
+@case('endpoint.search_users')
+def search_users(ctx):
+    return ctx.get('/api/users/search?username=user1')
+
+def measure(ctx, prepare, repeat, warmup):
+    """Time one case; the session is reset before every call so nothing is served from the identity map.
+    Returns:
+        dict: median/p95/mean duration in milliseconds and SQL statements per call.
+    """
+    statements = []
+    engine = db.engine
+    count = lambda *args: statements.append(1)
+    event.listen(engine, 'after_cursor_execute', count)
+
+    durations = []
+    queries = None
+    try:
+        for i in range(warmup + repeat):
+            db.session.remove()
+            fn = prepare(ctx)
+            statements.clear()
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            if i >= warmup:
+                durations.append(elapsed * 1000)
+                queries = len(statements) if queries is None else min(queries, len(statements))
+    finally:
+        event.remove(engine, 'after_cursor_execute', count)
+
+    durations.sort()
+    return {
+        'median_ms': round(statistics.median(durations), 4),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 4),
+        'mean_ms': round(statistics.fmean(durations), 4),
+        'queries': queries,
+    }
+
+def run(sizes, repeat=30, warmup=3, name_filter=None):
+    """Run every case for every dataset size.
+    Returns:
+        dict: {size: {case: measurement}}, sizes as strings (JSON keys).
+    """
+    results = {}
+    for size in sizes:
+        folder = tempfile.mkdtemp(prefix='kilogram-bench-')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(folder, "bench.db")}',
+            'STORAGE_BACKEND': 'local',
+            'LOCAL_UPLOAD_FOLDER': folder,
+            'MEDIA_VARIANTS_ENABLED': False,
+            'PASSWORD_HASH_WORKERS': 0,
+        })
+        try:
+            with app.app_context():
+                db.create_all()
+                seed(size)
+                ctx = Context(app, size)
+                results[str(size)] = {
+                    name: measure(ctx, prepare, repeat, warmup)
+                    for name, prepare in CASES.items()
+                    if not name_filter or name_filter in name
+                }
+                db.session.remove()
+                db.engine.dispose()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Compare results with a baseline.
+    Returns:
+        list: (size, case, reason) of every regression.
+    """
+    regressions = []
+    for size, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if not previous:
+                continue
+            slower = current['median_ms'] - previous['median_ms']
+            if current['median_ms'] > previous['median_ms'] * (1 + threshold) and slower > NOISE_FLOOR_MS:
+                regressions.append((size, name, f"median {previous['median_ms']:.3f} -> {current['median_ms']:.3f} ms"))
+            if previous.get('queries') is not None and current['queries'] > previous['queries']:
+                regressions.append((size, name, f"queries {previous['queries']} -> {current['queries']}"))
+    return regressions
+
+def report(results, baseline=None):
+    """Text table of the results, with the change against the baseline when there is one"""
+    lines = [f"{'size':>6}  {'case':<32} {'median ms':>10} {'p95 ms':>10} {'queries':>8}  {'vs baseline':>11}"]
+    for size, cases in results.items():
+        for name, current in cases.items():
+            previous = (baseline or {}).get('results', {}).get(size, {}).get(name)
+            change = f"{(current['median_ms'] / previous['median_ms'] - 1) * 100:+.1f}%" \
+                if previous and previous['median_ms'] else ''
+            lines.append(f"{size:>6}  {name:<32} {current['median_ms']:>10.3f} {current['p95_ms']:>10.3f} "
+                         f"{current['queries']:>8}  {change:>11}")
+    return '\n'.join(lines)
+
+def save(results, path, repeat):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Microbenchmarks of the hot request paths.')
+    parser.add_argument('--sizes', default='100,1000', help='Comma separated dataset sizes (number of users).')
+    parser.add_argument('--repeat', type=int, default=30, help='Timed calls per case.')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed calls per case.')
+    parser.add_argument('--filter', dest='name_filter', help='Only run cases whose name contains this text.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file.')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', 0.2)),
+                        help='Allowed slowdown of the median, 0.2 = 20%%.')
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline.')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = run(sizes, repeat=args.repeat, warmup=args.warmup, name_filter=args.name_filter)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(report(results, baseline))
+
+    if args.output:
+        save(results, args.output, args.repeat)
+    if args.save:
+        save(results, args.baseline, args.repeat)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    if baseline is None:
+        print(f'No baseline at {args.baseline}, run with --save to create one')
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for size, name, reason in regressions:
+        print(f'REGRESSION size={size} {name}: {reason}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import random
+from collections import Counter
+from datetime import datetime
+
+from app import db
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.post import Post
+from app.models.timeline import Timeline
+from app.models.user import User
+from app.search import index_user
+
+# Password của mọi user được seed (hash một lần, dùng chung)
+PASSWORD = 'password123'
+
+def seed(users, posts_per_user=5, follows_per_user=10, likes_per_post=3, seed_value=42):
+    """Fill an empty database with a deterministic social graph.
+    Timelines and counters are written directly, as fan-out and app.counters would have.
+    Returns:
+        dict: Number of rows per table.
+    """
+    rng = random.Random(seed_value)
+    now = int(datetime.now().timestamp())
+
+    probe = User(username='probe', email='probe@example.com')
+    probe.set_password(PASSWORD)
+    password_hash = probe.password_hash
+
+    user_rows = [{
+        'id': i,
+        'username': f'user{i}',
+        'email': f'user{i}@example.com',
+        'fullname': f'Bench User {i}',
+        'password_hash': password_hash,
+        'created_at': now - users + i,
+        'updated_at': now - users + i,
+    } for i in range(1, users + 1)]
+
+    follow_rows = {}
+    for follower in range(1, users + 1):
+        candidates = [user_id for user_id in rng.sample(range(1, users + 1), min(users, follows_per_user + 1))
+                      if user_id != follower][:follows_per_user]
+        for following in candidates:
+            follow_rows[(follower, following)] = {'follower_id': follower, 'following_id': following, 'created_at': now}
+
+    post_rows = []
+    post_id = 0
+    for author in range(1, users + 1):
+        for _ in range(posts_per_user):
+            post_id += 1
+            created_at = now - rng.randint(0, 30 * 24 * 3600)
+            post_rows.append({
+                'id': post_id,
+                'user_id': author,
+                'image_url': f'/uploads/{post_id}.jpg',
+                'caption': f'Post {post_id} of user {author}',
+                'deleted': False,
+                'like_count': 0,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+
+    like_rows = {}
+    for post in post_rows:
+        for user_id in rng.sample(range(1, users + 1), min(users, likes_per_post)):
+            like_rows[(user_id, post['id'])] = {'user_id': user_id, 'post_id': post['id'], 'created_at': now}
+            post['like_count'] += 1
+
+    followers = {}
+    for follower, following in follow_rows:
+        followers.setdefault(following, []).append(follower)
+    timeline_rows = [
+        {'user_id': user_id, 'post_id': post['id'], 'author_id': post['user_id'], 'created_at': post['created_at']}
+        for post in post_rows
+        for user_id in [post['user_id']] + followers.get(post['user_id'], [])
+    ]
+
+    following_counts = Counter(follower for follower, _ in follow_rows)
+    for row in user_rows:
+        row['follower_count'] = len(followers.get(row['id'], []))
+        row['following_count'] = following_counts[row['id']]
+
+    db.session.execute(db.insert(User), user_rows)
+    db.session.execute(db.insert(Follow), list(follow_rows.values()))
+    db.session.execute(db.insert(Post), post_rows)
+    db.session.execute(db.insert(Like), list(like_rows.values()))
+    db.session.execute(db.insert(Timeline), timeline_rows)
+    for user in User.query.all():
+        index_user(user)
+    db.session.commit()
+
+    return {
+        'users': len(user_rows),
+        'follows': len(follow_rows),
+        'posts': len(post_rows),
+        'likes': len(like_rows),
+        'timelines': len(timeline_rows),
+    }
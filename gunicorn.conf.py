@@ -0,0 +1,42 @@
+# Cấu hình Gunicorn (gunicorn --config gunicorn.conf.py main:app)
+#
+# Prometheus multiprocess mode: mỗi worker ghi metrics vào file trong
+# PROMETHEUS_MULTIPROC_DIR, /metrics đọc và cộng dồn file của mọi worker.
+# Biến môi trường phải được đặt trước khi prometheus_client được import,
+# file config này được Gunicorn load trước app nên đặt ở đây.
+import glob
+import multiprocessing
+import os
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "kilogram-prometheus"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+
+# Password hashing (app/passwords.py): pool process của mỗi worker chỉ có ích khi
+# worker xử lý nhiều request cùng lúc (gthread, uvicorn). Sync worker bị chặn suốt
+# thời gian hash nên hash ngay trong worker (PASSWORD_HASH_WORKERS=0), số worker đã
+# giới hạn số hash chạy song song. Với worker khác, tổng số process hash của mọi
+# worker khoảng bằng số CPU. PASSWORD_HASH_MAX_PENDING tính theo từng worker.
+def _password_hash_workers(server):
+    if server.cfg.worker_class_str == "sync":
+        return 0
+    return max(1, multiprocessing.cpu_count() // server.cfg.workers)
+
+def on_starting(server):
+    """Master start: drop metric files of the previous run, they would be summed with the new workers,
+    and size the password hashing pools for the worker class"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+    # Worker được fork sau on_starting nên kế thừa biến môi trường này
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(_password_hash_workers(server)))
+
+def child_exit(server, worker):
+    """Worker exit: remove its live gauge files (counters/histograms are kept so totals never go down)"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -10,9 +10,10 @@ API_BASE_URL = "http://127.0.0.1:3000/api" # GIẢ ĐỊNH BACKEND CHẠY TRÊN
 
 # Danh sách các cặp username/password hợp lệ để đăng nhập (nên có nhiều để đa dạng hóa)
 # Trong thực tế, bạn có thể đọc từ file hoặc tạo động
+# Mặc định dùng các user sinh bởi `flask generate-dataset` (username user<id>, password password123)
 VALID_USERS = [
-    {},
-    # Thêm nhiều user ở đây nếu có
+    {"username": f"user{i}", "password": "password123"}
+    for i in range(1, 1001)
 ]
 
 # Lưu trữ access token sau khi đăng nhập thành công
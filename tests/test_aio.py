@@ -0,0 +1,182 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+from flask_jwt_extended import create_access_token
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.models.follow import Follow
+from app.models.timeline import Timeline
+
+ASYNC_STACK = all(find_spec(name) for name in ("greenlet", "aiosqlite", "a2wsgi", "httpx"))
+
+@unittest.skipUnless(ASYNC_STACK, "greenlet, aiosqlite, a2wsgi and httpx are required")
+class AsyncAppTestCase(unittest.TestCase):
+    def setUp(self):
+        import httpx
+        from app.aio import AsyncApp
+
+        # Engine sync và engine async phải thấy cùng một database: dùng file SQLite
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{self.path}",
+            "MEDIA_VARIANTS_ENABLED": False,
+            "DB_POOL_SIZE": 2,
+            "STREAM_MIN_ITEMS": 3,
+            "STREAM_BATCH_SIZE": 2,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", fullname="Alice", password_hash="x")
+        self.bob = User(username="bob", email="bob@sydexa.com", fullname="Bob", password_hash="x")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.posts = [Post(user_id=self.bob.id, image_url=f"/uploads/{i}.jpg", caption=f"post {i}", created_at=i)
+                      for i in range(5)]
+        db.session.add_all(self.posts)
+        db.session.add(Follow(follower_id=self.alice.id, following_id=self.bob.id))
+        db.session.commit()
+        db.session.add_all([Timeline(user_id=self.alice.id, post_id=post.id, author_id=self.bob.id,
+                                     created_at=post.created_at) for post in self.posts])
+        db.session.commit()
+
+        self.post_id, self.bob_id = self.posts[0].id, self.bob.id
+
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.alice.id))}"}
+
+        self.asgi = AsyncApp(self.app)
+        self.loop = asyncio.new_event_loop()
+        self.http = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.asgi), base_url="http://localhost")
+
+        self.statements = {"sync": 0, "async": 0}
+        self._count = {key: self._counter(key) for key in self.statements}
+        event.listen(db.engine, "before_cursor_execute", self._count["sync"])
+        event.listen(self.asgi.database.engines[None], "before_cursor_execute", self._count["async"])
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count["sync"])
+        event.remove(self.asgi.database.engines[None], "before_cursor_execute", self._count["async"])
+        self.loop.run_until_complete(self.http.aclose())
+        self.loop.run_until_complete(self.asgi.database.dispose())
+        self.loop.close()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        os.remove(self.path)
+
+    def _counter(self, key):
+        def count(*args):
+            self.statements[key] += 1
+        return count
+
+    def _run(self, *requests):
+        async def send_all():
+            return await asyncio.gather(*requests)
+        return self.loop.run_until_complete(send_all())
+
+    def _get(self, path, **headers):
+        return self.http.get(path, headers=dict(self.headers, **headers))
+
+    # Test case 1: URL của driver asyncio
+    def test_async_url(self):
+        from app.aio import async_url
+        self.assertEqual(async_url("mysql+pymysql://root:@localhost:3306/kilogram").drivername, "mysql+aiomysql")
+        self.assertEqual(async_url("sqlite:////tmp/kilogram.db").drivername, "sqlite+aiosqlite")
+        self.assertEqual(async_url("postgresql+asyncpg://localhost/kilogram").drivername, "postgresql+asyncpg")
+        with self.assertRaises(ValueError):
+            async_url("oracle://localhost/kilogram")
+
+    # Test case 2: Endpoint đọc trả về cùng JSON với app WSGI, query chạy trên engine async
+    def test_same_contract(self):
+        paths = [
+            "/api/posts/newsfeed",
+            "/api/posts/newsfeed?cursor=&per_page=2&total=exact",
+            f"/api/posts/{self.post_id}",
+            f"/api/users/{self.bob_id}/profile",
+            "/api/users/profile",
+            f"/api/users/{self.bob_id}/posts?per_page=5",
+        ]
+        responses = self._run(*(self._get(path) for path in paths))
+        self.assertEqual(self.statements["sync"], 0)
+        self.assertGreater(self.statements["async"], 0)
+
+        for path, response in zip(paths, responses):
+            db.session.remove()
+            expected = self.client.get(path, headers=self.headers)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.json(), expected.get_json(), path)
+            self.assertEqual(response.headers.get("ETag"), expected.headers.get("ETag"), path)
+
+        # Không tìm thấy, thiếu token
+        missing, unauthorized = self._run(self._get("/api/posts/999"), self.http.get("/api/posts/newsfeed"))
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(unauthorized.status_code, 401)
+
+    # Test case 3: ETag / 304 qua ASGI, endpoint ghi chạy trong thread pool
+    def test_revalidation_and_writes(self):
+        path = f"/api/posts/{self.post_id}"
+        (response,) = self._run(self._get(path))
+        etag = response.headers["ETag"]
+        (cached,) = self._run(self._get(path, **{"If-None-Match": etag}))
+        self.assertEqual(cached.status_code, 304)
+
+        (liked,) = self._run(self.http.post(f"{path}/like", headers=self.headers))
+        self.assertEqual(liked.status_code, 200)
+        self.assertGreater(self.statements["sync"], 0)
+
+        (response,) = self._run(self._get(path, **{"If-None-Match": etag}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["liked_by_current_user"])
+
+    # Test case 4: Nhiều request đồng thời hơn số connection của pool, thời gian chờ checkout được đo
+    def test_concurrent_requests(self):
+        from app.sql_metrics import TimedAsyncAdaptedQueuePool
+        self.assertIsInstance(self.asgi.database.async_engines[None].pool, TimedAsyncAdaptedQueuePool)
+        self.assertEqual(self.asgi.database.async_engines[None].pool.size(), 2)
+        checkouts = REGISTRY.get_sample_value("kilogram_db_pool_checkout_wait_seconds_count") or 0
+
+        responses = self._run(*(self._get("/api/posts/newsfeed") for _ in range(20)))
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertGreaterEqual(REGISTRY.get_sample_value("kilogram_db_pool_checkout_wait_seconds_count") - checkouts, 20)
+
+    # Test case 5: Connection được trả về pool trước khi client đọc body
+    def test_connection_released_before_body(self):
+        pool = self.asgi.database.async_engines[None].pool
+
+        def request(path):
+            checked_out = []
+
+            async def send(message):
+                checked_out.append((message["type"], message.get("more_body", False), pool.checkedout()))
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            headers = [(b"authorization", self.headers["Authorization"].encode()), (b"host", b"localhost")]
+            scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+                     "root_path": "", "headers": headers, "scheme": "http", "server": ("localhost", 80),
+                     "http_version": "1.1", "asgi": {"version": "3.0"}}
+            self.loop.run_until_complete(self.asgi(scope, receive, send))
+            return checked_out
+
+        # Body trong bộ nhớ: session đã được đóng trước status line
+        checked_out = request(f"/api/posts/{self.post_id}")
+        self.assertEqual({count for _, _, count in checked_out}, {0})
+
+        # Body streamed (5 post, batch 2): connection được giữ đến khi batch cuối được load
+        checked_out = request("/api/posts/newsfeed")
+        self.assertEqual(checked_out[0], ("http.response.start", False, 1))
+        self.assertEqual(checked_out[-1], ("http.response.body", False, 0))
+        self.assertEqual(checked_out[-2][2], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.run import CASES, compare, main, run
+
+class BenchmarksTestCase(unittest.TestCase):
+    # Test case 1: Mọi case chạy được trên dataset nhỏ
+    def test_run_every_case(self):
+        results = run([10], repeat=1, warmup=0)
+        self.assertEqual(set(results["10"]), set(CASES))
+        for measurement in results["10"].values():
+            self.assertGreater(measurement["median_ms"], 0)
+            self.assertGreaterEqual(measurement["queries"], 0)
+
+    # Test case 2: Chậm hơn threshold hoặc nhiều query hơn baseline là regression
+    def test_compare(self):
+        baseline = {"results": {"10": {
+            "a": {"median_ms": 1.0, "queries": 3},
+            "b": {"median_ms": 1.0, "queries": 3},
+            "c": {"median_ms": 0.01, "queries": 3},
+        }}}
+        results = {"10": {
+            "a": {"median_ms": 1.1, "queries": 3},
+            "b": {"median_ms": 1.5, "queries": 4},
+            "c": {"median_ms": 0.03, "queries": 3},
+            "new": {"median_ms": 9.0, "queries": 9},
+        }}
+        regressions = compare(results, baseline, threshold=0.2)
+        self.assertEqual([(size, name) for size, name, _ in regressions], [("10", "b"), ("10", "b")])
+
+    # Test case 3: --save ghi baseline, lần chạy sau so sánh với baseline đó
+    def test_save_then_compare(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "baseline.json")
+            args = ["--sizes", "10", "--repeat", "1", "--warmup", "0", "--filter", "serializer.user", "--baseline", path]
+            self.assertEqual(main(args + ["--save"]), 0)
+            with open(path) as f:
+                baseline = json.load(f)
+            self.assertIn("serializer.user_to_dict", baseline["results"]["10"])
+            self.assertEqual(main(args + ["--threshold", "1000"]), 0)
+
+if __name__ == "__main__":
+    unittest.main()
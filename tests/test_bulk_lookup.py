@@ -0,0 +1,72 @@
+import unittest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+
+class BulkLookupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "BULK_LOOKUP_MAX_IDS": 5,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        self.bob = User(username="bob", email="bob@sydexa.com", password_hash="x")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.posts = [Post(user_id=self.bob.id, image_url=f"/uploads/{i}.jpg") for i in range(3)]
+        self.posts[2].deleted = True
+        db.session.add_all(self.posts)
+        db.session.add(Follow(follower_id=self.alice.id, following_id=self.bob.id))
+        db.session.commit()
+        db.session.add(Like(user_id=self.alice.id, post_id=self.posts[1].id))
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.alice.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 1: Post trả về theo thứ tự yêu cầu, post đã xóa hoặc không tồn tại nằm trong not_found
+    def test_get_posts(self):
+        first, second, deleted = (post.id for post in self.posts)
+        response = self.client.get(f"/api/posts?ids={second},{first},999&ids={deleted},{second}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json["data"]
+        self.assertEqual([item["id"] for item in data["items"]], [second, first])
+        self.assertEqual(data["not_found"], [999, deleted])
+        self.assertEqual([item["liked_by_current_user"] for item in data["items"]], [True, False])
+        self.assertEqual(data["items"][0]["author"]["username"], "bob")
+
+    # Test case 2: Profile theo danh sách id, is_following giống endpoint từng user
+    def test_get_users(self):
+        response = self.client.get(f"/api/users?ids={self.bob.id},{self.alice.id},42", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json["data"]
+        self.assertEqual(data["not_found"], [42])
+        single = self.client.get(f"/api/users/{self.bob.id}/profile", headers=self.headers).json["data"]
+        self.assertEqual(data["items"][0], single)
+        self.assertTrue(data["items"][0]["is_following"])
+        self.assertFalse(data["items"][1]["is_following"])
+
+    # Test case 3: ids không hợp lệ, thiếu hoặc vượt quá giới hạn
+    def test_invalid_ids(self):
+        for query in ("ids=1,x", "ids=1,2,3,4,5,6", ""):
+            response = self.client.get(f"/api/posts?{query}", headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+            response = self.client.get(f"/api/users?{query}", headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
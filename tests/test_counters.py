@@ -0,0 +1,62 @@
+import unittest
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.models.like import Like
+from app.models.follow import Follow
+from app.counters import adjust_like_count, adjust_follow_counts, reconcile_counters
+
+class CountersTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        self.bob = User(username="bob", email="bob@sydexa.com", password_hash="x")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.post = Post(user_id=self.alice.id, image_url="image.jpg", updated_at=100)
+        db.session.add(self.post)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 1: Counter được cập nhật trong cùng transaction, updated_at giữ nguyên
+    def test_adjust_counters(self):
+        db.session.add(Like(user_id=self.bob.id, post_id=self.post.id))
+        adjust_like_count(self.post.id, 1)
+        db.session.add(Follow(follower_id=self.bob.id, following_id=self.alice.id))
+        adjust_follow_counts(self.bob.id, self.alice.id, 1)
+        db.session.commit()
+
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.updated_at, 100)
+        self.assertEqual((self.alice.follower_count, self.alice.following_count), (1, 0))
+        self.assertEqual((self.bob.follower_count, self.bob.following_count), (0, 1))
+
+    # Test case 2: Reconcile phát hiện và sửa counter bị lệch
+    def test_reconcile_repairs_drift(self):
+        db.session.add(Like(user_id=self.bob.id, post_id=self.post.id))
+        db.session.add(Follow(follower_id=self.bob.id, following_id=self.alice.id))
+        self.bob.follower_count = 5
+        db.session.commit()
+
+        expected = {'posts.like_count': 1, 'users.follower_count': 2, 'users.following_count': 1}
+        self.assertEqual(reconcile_counters(batch_size=1, dry_run=True), expected)
+        self.assertEqual(self.bob.follower_count, 5)
+
+        self.assertEqual(reconcile_counters(batch_size=1), expected)
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.alice.follower_count, 1)
+        self.assertEqual(self.bob.follower_count, 0)
+        self.assertEqual(self.bob.following_count, 1)
+
+        self.assertEqual(set(reconcile_counters().values()), {0})
+
+if __name__ == "__main__":
+    unittest.main()
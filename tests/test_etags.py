@@ -0,0 +1,113 @@
+import unittest
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.models.follow import Follow
+from app.models.timeline import Timeline
+
+class ETagTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "MEDIA_VARIANTS_ENABLED": False})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", fullname="Alice", password_hash="x")
+        self.bob = User(username="bob", email="bob@sydexa.com", fullname="Bob", password_hash="x")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.post = Post(user_id=self.bob.id, image_url="/uploads/image.jpg", caption="hello")
+        db.session.add(self.post)
+        db.session.add(Follow(follower_id=self.alice.id, following_id=self.bob.id))
+        db.session.commit()
+        db.session.add(Timeline(user_id=self.alice.id, post_id=self.post.id, author_id=self.bob.id,
+                                created_at=self.post.created_at))
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        self.alice_headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.alice.id))}"}
+        self.bob_headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.bob.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _get(self, path, etag=None, headers=None):
+        headers = dict(headers or self.alice_headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        db.session.remove()
+        return self.client.get(path, headers=headers)
+
+    def _assert_revalidates(self, path):
+        response = self._get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+        etag = response.headers["ETag"]
+
+        cached = self._get(path, etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b"")
+        self.assertEqual(cached.headers["ETag"], etag)
+        return etag
+
+    # Test case 1: Chi tiết post, ETag thay đổi khi like hoặc tác giả đổi tên
+    def test_post_detail(self):
+        path = f"/api/posts/{self.post.id}"
+        etag = self._assert_revalidates(path)
+
+        self.client.post(f"/api/posts/{self.post.id}/like", headers=self.alice_headers)
+        response = self._get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()["data"]["liked_by_current_user"])
+        etag = response.headers["ETag"]
+
+        self.client.put("/api/users/profile", json={"fullname": "Bobby"}, headers=self.bob_headers)
+        response = self._get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["data"]["author"]["fullname"], "Bobby")
+
+        # ETag của một user không dùng được cho user khác
+        self.assertEqual(self._get(path, response.headers["ETag"], self.bob_headers).status_code, 200)
+
+    # Test case 2: Profile, ETag thay đổi khi follow/unfollow
+    def test_profile(self):
+        path = f"/api/users/{self.bob.id}/profile"
+        etag = self._assert_revalidates(path)
+
+        self.client.delete(f"/api/users/{self.bob.id}/follow", headers=self.alice_headers)
+        response = self._get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.get_json()["data"]["is_following"])
+
+    # Test case 3: News feed (page và cursor), 304 không serialize lại các post
+    def test_newsfeed(self):
+        for path in ("/api/posts/newsfeed", "/api/posts/newsfeed?cursor=&total=exact"):
+            etag = self._assert_revalidates(path)
+
+            with mock.patch.object(Post, "to_dict_many", side_effect=AssertionError("serialized")):
+                self.assertEqual(self._get(path, etag).status_code, 304)
+
+            post = Post(user_id=self.bob.id, image_url="/uploads/new.jpg", caption=path)
+            db.session.add(post)
+            db.session.commit()
+            db.session.add(Timeline(user_id=self.alice.id, post_id=post.id, author_id=self.bob.id, created_at=post.created_at + 1))
+            db.session.commit()
+            self.assertEqual(self._get(path, etag).status_code, 200)
+
+    # Test case 4: Ảnh riêng tư được ký, ETag đổi trước khi URL đã ký hết hạn
+    def test_signed_images_expire_etag(self):
+        self.app.config["SIGNED_MEDIA_BUCKET"] = "private-bucket"
+        path = f"/api/posts/{self.post.id}"
+        with mock.patch("app.etags.time.time", return_value=1000.0):
+            etag = self._get(path).headers["ETag"]
+            self.assertEqual(self._get(path, etag).status_code, 304)
+        later = 1000.0 + self.app.config["SIGNED_URL_SAFETY_MARGIN"]
+        with mock.patch("app.etags.time.time", return_value=later):
+            self.assertEqual(self._get(path, etag).status_code, 200)
+
+if __name__ == "__main__":
+    unittest.main()
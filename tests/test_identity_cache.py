@@ -0,0 +1,66 @@
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models.user import User
+from app.utils import load_user, invalidate_user
+
+class IdentityCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username="alice", email="alice@sydexa.com", fullname="Alice", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        self.identity = str(user.id)
+        db.session.remove()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._record)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    # Test case 1: Lần thứ hai không cần query database
+    def test_hit_does_not_query(self):
+        self.assertEqual(load_user(self.identity).username, "alice")
+        self.assertEqual(len(self.statements), 1)
+        db.session.remove()
+
+        user = load_user(self.identity)
+        self.assertEqual(user.to_dict()["fullname"], "Alice")
+        self.assertEqual(len(self.statements), 1)
+
+    # Test case 2: User lấy từ cache vẫn cập nhật được, invalidate thì đọc lại từ database
+    def test_update_and_invalidate(self):
+        load_user(self.identity)
+        db.session.remove()
+
+        user = load_user(self.identity)
+        user.fullname = "Alice Nguyen"
+        db.session.commit()
+        invalidate_user(user.id)
+        db.session.remove()
+
+        self.assertEqual(load_user(self.identity).fullname, "Alice Nguyen")
+
+    # Test case 3: Counter không được cache
+    def test_counters_are_not_cached(self):
+        load_user(self.identity)
+        db.session.remove()
+        User.query.filter_by(id=int(self.identity)).update({"follower_count": 7})
+        db.session.commit()
+        db.session.remove()
+
+        self.assertEqual(load_user(self.identity).follower_count, 7)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import time
+import unittest
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.jobs import claim_job, enqueue, run_job, run_pending, task
+from app.models.job import Job
+from app.models.media import MediaUpload
+from app.models.post import Post
+from app.models.user import User
+
+calls = []
+
+@task(name='test_record')
+def record(value, suffix=''):
+    calls.append(value + suffix)
+
+@task(name='test_flaky', max_attempts=3)
+def flaky():
+    calls.append('flaky')
+    raise RuntimeError('GCS timeout')
+
+class JobsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "JOB_RETRY_BACKOFF": 0,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        calls.clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 1: Job chỉ được chạy sau khi commit, idempotency key không bị enqueue lại
+    def test_enqueue_and_run(self):
+        first = enqueue('test_record', 'a', suffix='!', idempotency_key='record:a')
+        second = enqueue('test_record', 'a', suffix='!', idempotency_key='record:a')
+        enqueue('test_record', 'b')
+        self.assertIs(first, second)
+        db.session.commit()
+
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, ['a!', 'b'])
+        self.assertEqual({job.status for job in Job.query.all()}, {'done'})
+        self.assertEqual(run_pending(), 0)
+
+        with self.assertRaises(ValueError):
+            enqueue('unknown_task')
+
+    # Test case 2: Job lỗi được retry với backoff rồi chuyển sang failed
+    def test_retry_then_fail(self):
+        job = enqueue('test_flaky')
+        db.session.commit()
+
+        with mock.patch('app.jobs.retry_delay', return_value=3600):
+            self.assertEqual(run_pending(), 1)
+        job = db.session.get(Job, job.id)
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, time.time() + 3000)
+        self.assertIn('GCS timeout', job.last_error)
+        self.assertEqual(run_pending(), 0)
+
+        job.run_at = 0
+        db.session.commit()
+        self.assertEqual(run_pending(), 2)
+        job = db.session.get(Job, job.id)
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertEqual(calls, ['flaky'] * 3)
+
+    # Test case 3: Một job chỉ được một worker claim, lock hết hạn thì được chạy lại
+    def test_claim_is_exclusive(self):
+        job = enqueue('test_record', 'c')
+        db.session.commit()
+
+        claimed = claim_job('worker-1')
+        self.assertEqual(claimed.id, job.id)
+        self.assertIsNone(claim_job('worker-2'))
+
+        claimed.locked_at = time.time() - self.app.config['JOB_LOCK_TIMEOUT'] - 1
+        db.session.commit()
+        reclaimed = claim_job('worker-2')
+        self.assertEqual((reclaimed.locked_by, reclaimed.attempts), ('worker-2', 2))
+        self.assertEqual(run_job(reclaimed), 'done')
+
+    # Test case 4: Xóa post enqueue việc xóa ảnh trên GCS thay vì gọi GCS trong request
+    def test_delete_post_enqueues_media_deletion(self):
+        user = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        url = "https://storage.googleapis.com/kilogram-media/test/a%20b.jpg"
+        db.session.add(MediaUpload(url=url, key="test/a b.jpg", backend="gcs", bucket="kilogram-media", user_id=user.id))
+        post = Post(user_id=user.id, image_url=url)
+        db.session.add(post)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+
+        with mock.patch('app.utils.gcs_clients.bucket') as bucket:
+            response = self.app.test_client().delete(
+                f"/api/posts/{post.id}", headers={"Authorization": f"Bearer {token}"}
+            )
+            self.assertEqual(response.status_code, 200)
+            bucket.assert_not_called()
+
+            job = Job.query.one()
+            self.assertEqual(job.task, 'delete_file_from_gcs')
+            self.assertEqual(run_pending(), 1)
+
+        bucket.assert_called_once_with('kilogram-media')
+        bucket.return_value.blob.assert_called_once_with('test/a b.jpg')
+        bucket.return_value.blob.return_value.delete.assert_called_once_with()
+
+    # Test case 5: Chỉ xóa file do tác giả upload trong bucket đã cấu hình
+    def test_foreign_media_is_never_deleted(self):
+        alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        bob = User(username="bob", email="bob@sydexa.com", password_hash="x")
+        db.session.add_all([alice, bob])
+        db.session.commit()
+        bob_url = "https://storage.googleapis.com/kilogram-media/test/bob.jpg"
+        other_bucket_url = "https://storage.googleapis.com/other-bucket/test/alice.jpg"
+        db.session.add_all([
+            MediaUpload(url=bob_url, key="test/bob.jpg", backend="gcs", bucket="kilogram-media", user_id=bob.id),
+            MediaUpload(url=other_bucket_url, key="test/alice.jpg", backend="gcs", bucket="other-bucket",
+                        user_id=alice.id),
+        ])
+        db.session.commit()
+        client = self.app.test_client()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(alice.id))}"}
+
+        # File của user khác, bucket không được cấu hình, URL không được ghi nhận
+        image_urls = (bob_url, other_bucket_url, "https://storage.googleapis.com/victim-bucket/secret.jpg")
+        for image_url in image_urls:
+            response = client.post("/api/posts", json={"image_url": image_url}, headers=headers)
+            self.assertEqual(response.status_code, 201, image_url)
+            post_id = response.json["data"]["id"]
+            self.assertEqual(client.delete(f"/api/posts/{post_id}", headers=headers).status_code, 200)
+        self.assertEqual(Job.query.count(), 0)
+
+    # Test case 6: Ảnh còn được post khác dùng thì không bị xóa
+    def test_shared_image_is_kept(self):
+        user = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        url = "https://storage.googleapis.com/kilogram-media/test/a.jpg"
+        db.session.add(MediaUpload(url=url, key="test/a.jpg", backend="gcs", bucket="kilogram-media", user_id=user.id))
+        db.session.commit()
+        client = self.app.test_client()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+        ids = [client.post("/api/posts", json={"image_url": url}, headers=headers).json["data"]["id"] for _ in range(2)]
+        client.delete(f"/api/posts/{ids[0]}", headers=headers)
+        self.assertEqual(Job.query.count(), 0)
+        client.delete(f"/api/posts/{ids[1]}", headers=headers)
+        self.assertEqual(Job.query.count(), 1)
+
+    # Test case 7: Key đã được enqueue bởi transaction khác: trả về job đó, transaction hiện tại không bị hỏng
+    def test_enqueue_existing_key_is_not_an_error(self):
+        first = enqueue('test_record', 'a', idempotency_key='record:a')
+        db.session.commit()
+        first_id = first.id
+        db.session.expunge_all()
+
+        enqueue('test_record', 'b')
+        second = enqueue('test_record', 'a', idempotency_key='record:a')
+        self.assertEqual(second.id, first_id)
+        db.session.commit()
+
+        self.assertEqual(Job.query.count(), 2)
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(sorted(calls), ['a', 'b'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from flask_jwt_extended import create_access_token
+from PIL import Image
+from app import create_app, db
+from app.jobs import run_pending
+from app.media import generate_variants, variant_key
+from app.models.job import Job
+from app.models.media import MediaVariant
+from app.models.post import Post
+from app.models.user import User
+
+class MediaVariantsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "STORAGE_BACKEND": "local",
+            "LOCAL_UPLOAD_FOLDER": self.folder,
+            "MEDIA_VARIANTS_ENABLED": False,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.user = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(self.user)
+        db.session.commit()
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.user.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.folder)
+
+    def _upload(self, width, height):
+        image = io.BytesIO()
+        Image.new("RGBA", (width, height), (255, 128, 0, 255)).save(image, "PNG")
+        image.seek(0)
+        response = self.app.test_client().post("/api/upload", data={"file": (image, "cat.png")},
+                                                 headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        return response.json["data"]["filepath"]
+
+    # Test case 1: Tạo đủ các variant với kích thước đúng
+    def test_generate_variants(self):
+        filepath = self._upload(2000, 1000)
+        key = os.path.basename(filepath)
+        variants = {variant.name: variant for variant in generate_variants(key, filepath)}
+
+        self.assertEqual((variants["thumbnail"].width, variants["thumbnail"].height), (150, 150))
+        self.assertEqual((variants["feed"].width, variants["feed"].height), (640, 320))
+        self.assertEqual((variants["full"].width, variants["full"].height), (1080, 540))
+        self.assertEqual(variants["feed"].url, "/uploads/" + variant_key(key, "feed"))
+        self.assertTrue(os.path.exists(os.path.join(self.folder, variant_key(key, "thumbnail"))))
+
+    # Test case 2: Ảnh nhỏ không bị phóng to
+    def test_small_image_is_not_upscaled(self):
+        filepath = self._upload(300, 200)
+        variants = {variant.name: variant for variant in generate_variants(os.path.basename(filepath), filepath)}
+        self.assertEqual((variants["full"].width, variants["full"].height), (300, 200))
+
+    # Test case 3: Post trả về URL của các variant
+    def test_post_exposes_variants(self):
+        filepath = self._upload(800, 800)
+        generate_variants(os.path.basename(filepath), filepath)
+
+        user = self.user
+        post = Post(user_id=user.id, image_url=filepath)
+        other = Post(user_id=user.id, image_url="https://example.com/cat.jpg")
+        db.session.add_all([post, other])
+        db.session.commit()
+
+        data = post.to_dict(include_variants=True)
+        self.assertEqual(set(data["variants"]), {"thumbnail", "feed", "full"})
+        self.assertEqual(other.to_dict(include_variants=True)["variants"], {})
+        self.assertEqual(Post.to_dict_many([post, other], include_variants=True),
+                         [data, other.to_dict(include_variants=True)])
+
+    # Test case 4: Upload thêm job tạo variant trong cùng transaction, job worker tạo variant
+    def test_upload_enqueues_variants_job(self):
+        self.app.config["MEDIA_VARIANTS_ENABLED"] = True
+        filepath = self._upload(800, 400)
+
+        job = Job.query.one()
+        self.assertEqual((job.task, job.idempotency_key), ("generate_variants", f"generate_variants:{filepath}"))
+        self.assertEqual(MediaVariant.query.count(), 0)
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(db.session.get(Job, job.id).status, "done")
+        self.assertEqual({variant.name for variant in MediaVariant.query.filter_by(source_url=filepath)},
+                         {"thumbnail", "feed", "full"})
+
+if __name__ == "__main__":
+    unittest.main()
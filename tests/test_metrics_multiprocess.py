@@ -0,0 +1,99 @@
+import glob
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mỗi lần chạy là một process riêng, giống một worker của Gunicorn
+WORKER = (
+    "from app import REQUEST_COUNT, PASSWORD_HASH_PENDING\n"
+    "REQUEST_COUNT.labels(method='GET', endpoint='multiprocess_test').inc()\n"
+    "PASSWORD_HASH_PENDING.inc()\n"
+    "import os; print(os.getpid())\n"
+)
+
+SCRAPE = (
+    "from app import create_app\n"
+    "app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})\n"
+    "print(app.test_client().get('/metrics').get_data(as_text=True))\n"
+)
+
+class MultiprocessMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=self.metrics_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.metrics_dir)
+
+    def _run(self, code):
+        return subprocess.check_output([sys.executable, "-c", code], text=True, env=self.env,
+                                       cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL)
+
+    def _load_gunicorn_config(self):
+        spec = importlib.util.spec_from_file_location("gunicorn_conf", os.path.join(PROJECT_ROOT, "gunicorn.conf.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    # Test case 1: /metrics cộng dồn metrics của mọi process, gauge của worker đã chết bị xóa
+    def test_metrics_aggregated_across_workers(self):
+        pids = [int(self._run(WORKER)) for _ in range(2)]
+
+        output = self._run(SCRAPE)
+        self.assertIn('kilogram_http_requests_total_test_total{endpoint="multiprocess_test",method="GET"} 2.0', output)
+
+        # Hook của Gunicorn chạy trong process master, nơi biến môi trường đã được đặt
+        environ = mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=self.metrics_dir)
+        environ.start()
+        self.addCleanup(environ.stop)
+
+        config = self._load_gunicorn_config()
+        for pid in pids:
+            config.child_exit(None, type("Worker", (), {"pid": pid}))
+        for pid in pids:
+            self.assertFalse(os.path.exists(os.path.join(self.metrics_dir, f"gauge_livesum_{pid}.db")))
+
+        output = self._run(SCRAPE)
+        self.assertIn('kilogram_http_requests_total_test_total{endpoint="multiprocess_test",method="GET"} 2.0', output)
+
+        # Lần khởi động tiếp theo của Gunicorn bắt đầu từ thư mục rỗng
+        with mock.patch.dict(os.environ):
+            config.on_starting(self._server("sync", 3))
+        self.assertFalse(glob.glob(os.path.join(self.metrics_dir, "*.db")))
+
+    # Test case 2: Sync worker hash ngay trong worker, worker khác chia CPU cho pool hash
+    def test_password_hash_workers_for_worker_class(self):
+        config = self._load_gunicorn_config()
+        with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=self.metrics_dir), \
+                mock.patch.object(config.multiprocessing, "cpu_count", return_value=8):
+            os.environ.pop("PASSWORD_HASH_WORKERS", None)
+            config.on_starting(self._server("sync", 17))
+            self.assertEqual(os.environ["PASSWORD_HASH_WORKERS"], "0")
+
+            os.environ.pop("PASSWORD_HASH_WORKERS")
+            config.on_starting(self._server("gthread", 4))
+            self.assertEqual(os.environ["PASSWORD_HASH_WORKERS"], "2")
+
+            os.environ.pop("PASSWORD_HASH_WORKERS")
+            config.on_starting(self._server("uvicorn.workers.UvicornWorker", 17))
+            self.assertEqual(os.environ["PASSWORD_HASH_WORKERS"], "1")
+
+            # Giá trị đặt sẵn trong môi trường được giữ nguyên
+            os.environ["PASSWORD_HASH_WORKERS"] = "3"
+            config.on_starting(self._server("sync", 17))
+            self.assertEqual(os.environ["PASSWORD_HASH_WORKERS"], "3")
+
+    @staticmethod
+    def _server(worker_class, workers):
+        cfg = type("Config", (), {"worker_class_str": worker_class, "workers": workers})
+        return type("Arbiter", (), {"cfg": cfg})
+
+if __name__ == "__main__":
+    unittest.main()
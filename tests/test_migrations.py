@@ -0,0 +1,97 @@
+import unittest
+from sqlalchemy import inspect
+from app import create_app, db
+from app.migrations import applied_versions, migrate, migrations, pending_migrations
+
+NEW_INDEXES = {
+    "posts": {"ix_posts_deleted_created", "ix_posts_user_deleted_created"},
+    "likes": {"ix_likes_post_id"},
+    "follows": {"ix_follows_following_id"},
+    "timelines": {"ix_timelines_post_id"},
+}
+
+class MigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _indexes(self, table):
+        return {index["name"] for index in inspect(db.engine).get_indexes(table)}
+
+    # Test case 1: Database rỗng, mọi migration được áp dụng một lần theo thứ tự
+    def test_migrate_empty_database(self):
+        versions = [m.version for m in migrations()]
+        self.assertEqual(versions, sorted(versions))
+
+        self.assertEqual(migrate(), versions)
+        self.assertEqual(applied_versions(), set(versions))
+        self.assertEqual(pending_migrations(), [])
+        self.assertEqual(migrate(), [])
+        self.assertIn("posts", inspect(db.engine).get_table_names())
+        for table, names in NEW_INDEXES.items():
+            self.assertTrue(names <= self._indexes(table))
+
+    # Test case 2: Database tạo trước khi có migration (không có index mới) được bổ sung index
+    def test_migrate_legacy_database(self):
+        db.create_all()
+        for table, names in NEW_INDEXES.items():
+            for index in db.metadata.tables[table].indexes:
+                if index.name in names:
+                    index.drop(db.engine)
+
+        self.assertEqual(migrate(), [m.version for m in migrations()])
+        for table, names in NEW_INDEXES.items():
+            self.assertTrue(names <= self._indexes(table))
+
+    # Test case 3: --to dừng ở version chỉ định
+    def test_migrate_to_version(self):
+        self.assertEqual(migrate(target=1), [1])
+        self.assertEqual([m.version for m in pending_migrations()], [m.version for m in migrations()][1:])
+
+        result = self.app.test_cli_runner().invoke(args=["migration-status"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertRegex(result.output, r"1 applied\s+Initial schema")
+        self.assertRegex(result.output, r"2 pending")
+
+        result = self.app.test_cli_runner().invoke(args=["migrate"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(f"{len(migrations()) - 1} migrations applied", result.output)
+
+    # Test case 4: Database chưa có cột counter được thêm cột rồi backfill từ likes/follows
+    def test_migrate_adds_and_backfills_counters(self):
+        migrate(target=1)
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO users (id, username, email, password_hash) VALUES "
+                "(1, 'alice', 'alice@sydexa.com', 'x'), (2, 'bob', 'bob@sydexa.com', 'x')"
+            )
+            connection.exec_driver_sql("INSERT INTO posts (id, user_id, image_url) VALUES (1, 1, 'a.jpg')")
+            connection.exec_driver_sql("INSERT INTO likes (user_id, post_id, created_at) VALUES (1, 1, 1), (2, 1, 1)")
+            connection.exec_driver_sql("INSERT INTO follows (follower_id, following_id) VALUES (2, 1)")
+
+        migrate()
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql("SELECT like_count FROM posts").scalar(), 2)
+            self.assertEqual(
+                connection.exec_driver_sql("SELECT id, follower_count, following_count FROM users ORDER BY id").all(),
+                [(1, 1, 0), (2, 0, 1)]
+            )
+
+    # Test case 5: Schema tạo bởi các migration giống schema của các model
+    def test_migrations_match_models(self):
+        migrate()
+        inspector = inspect(db.engine)
+        self.assertEqual(set(inspector.get_table_names()), set(db.metadata.tables))
+        for name, table in db.metadata.tables.items():
+            self.assertEqual({column["name"] for column in inspector.get_columns(name)},
+                             {column.name for column in table.columns}, name)
+            self.assertEqual(self._indexes(name), {index.name for index in table.indexes}, name)
+
+if __name__ == "__main__":
+    unittest.main()
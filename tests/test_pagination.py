@@ -0,0 +1,94 @@
+import unittest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.pagination import InvalidCursor, TotalsCache, decode_cursor, encode_cursor, paginate_keyset
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "MAX_PER_PAGE": 5})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.user = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(self.user)
+        db.session.commit()
+
+        # Nhiều bài viết có cùng created_at để kiểm tra tie-break theo id
+        for created_at in (100, 100, 100, 200, 300, 300, 400):
+            db.session.add(Post(user_id=self.user.id, image_url="image.jpg", created_at=created_at))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 1: Cursor encode/decode
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(1747162696, 42)), (1747162696, 42))
+        self.assertIsNone(decode_cursor(''))
+        self.assertIsNone(decode_cursor(None))
+        self.assertEqual(decode_cursor(encode_cursor(2, 1747162696, 42), size=3), (2, 1747162696, 42))
+
+    # Test case 2: Cursor không hợp lệ
+    def test_invalid_cursor(self):
+        for cursor in ('not-a-cursor', encode_cursor('x', 1), '###', encode_cursor(0, 1, 2)):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    # Test case 3: Duyệt hết các trang bằng cursor giống như order_by + OFFSET
+    def test_keyset_walk_matches_offset_order(self):
+        expected = [post.id for post in Post.query.order_by(Post.created_at.desc(), Post.id.desc())]
+
+        seen, cursor = [], ''
+        while True:
+            posts, cursor = paginate_keyset(Post.query, Post.created_at, Post.id, cursor, 3)
+            seen.extend(post.id for post in posts)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+
+    # Test case 4: Total đã cache và còn hạn được trả về ngay
+    def test_totals_cache_fresh_entry(self):
+        cache = TotalsCache(max_size=2)
+        cache.set('a', 10, ttl=60)
+        self.assertEqual(cache.get('a', lambda: 99, ttl=60), 10)
+
+        cache.set('b', 1, ttl=60)
+        cache.set('c', 2, ttl=60)
+        self.assertNotIn('a', cache._entries)
+
+    # Test case 5: per_page nằm ngoài [1, MAX_PER_PAGE] bị giới hạn lại
+    def test_per_page_is_clamped(self):
+        posts, cursor = paginate_keyset(Post.query, Post.created_at, Post.id, '', 0)
+        self.assertEqual(len(posts), 1)
+        self.assertIsNotNone(cursor)
+        self.assertEqual(len(paginate_keyset(Post.query, Post.created_at, Post.id, '', -3)[0]), 1)
+        self.assertEqual(len(paginate_keyset(Post.query, Post.created_at, Post.id, '', 10 ** 9)[0]), 5)
+
+        client = self.app.test_client()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.user.id))}"}
+        for path in (f"/api/users/{self.user.id}/posts?cursor=&per_page=0",
+                     "/api/posts/newsfeed?cursor=&per_page=0",
+                     "/api/posts/newsfeed?per_page=-1"):
+            db.session.remove()
+            response = client.get(path, headers=headers)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.get_json()["data"]["pagination"]["per_page"], 1, path)
+
+        db.session.remove()
+        response = client.get(f"/api/users/{self.user.id}/posts?cursor=&per_page=1000", headers=headers)
+        self.assertEqual(len(response.get_json()["data"]["items"]), 5)
+        self.assertEqual(response.get_json()["data"]["pagination"]["per_page"], 5)
+
+        # Số trang nhỏ hơn 1 được đưa về trang 1
+        db.session.remove()
+        response = client.get("/api/posts/newsfeed?page=0", headers=headers)
+        self.assertEqual(response.get_json()["data"]["pagination"]["page"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import threading
+import unittest
+from app import create_app, db
+from app.models.user import User
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+class PasswordHasherTestCase(unittest.TestCase):
+    # Test case 1: Hash và verify chạy trong process pool
+    def test_hash_in_process_pool(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1, max_pending=2, queue_timeout=5)
+        try:
+            pwhash = hasher.hash("secret123")
+            self.assertTrue(pwhash.startswith("pbkdf2:sha256:1000$"))
+            self.assertTrue(hasher.verify(pwhash, "secret123"))
+            self.assertFalse(hasher.verify(pwhash, "wrong"))
+            self.assertFalse(hasher.needs_rehash(pwhash))
+            self.assertTrue(hasher.needs_rehash("pbkdf2:sha256:600000$salt$hash"))
+        finally:
+            hasher.shutdown()
+
+    # Test case 4: Method không ghi tham số được so sánh với tham số mặc định của Werkzeug
+    def test_needs_rehash_default_parameters(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256", workers=0, max_pending=1, queue_timeout=1)
+        self.assertFalse(hasher.needs_rehash("pbkdf2:sha256:600000$salt$hash"))
+        self.assertTrue(hasher.needs_rehash("pbkdf2:sha256:1000$salt$hash"))
+        hasher = PasswordHasher(method="scrypt", workers=0, max_pending=1, queue_timeout=1)
+        self.assertFalse(hasher.needs_rehash("scrypt:32768:8:1$salt$hash"))
+        self.assertTrue(hasher.needs_rehash("scrypt:16384:8:1$salt$hash"))
+        self.assertTrue(hasher.needs_rehash("pbkdf2:sha256:600000$salt$hash"))
+
+    # Test case 2: Khi hết slot, request bị từ chối sau queue_timeout thay vì chờ mãi
+    def test_busy_when_saturated(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, max_pending=1, queue_timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+
+        def slow(*args):
+            started.set()
+            release.wait(5)
+            return "done"
+
+        worker = threading.Thread(target=hasher._run, args=("hash", slow))
+        worker.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                hasher.hash("secret123")
+        finally:
+            release.set()
+            worker.join()
+        self.assertTrue(hasher.verify(hasher.hash("secret123"), "secret123"))
+
+class RehashOnLoginTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "PASSWORD_HASH_METHOD": "pbkdf2:sha256:2000",
+            "PASSWORD_HASH_WORKERS": 0,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 5: Hash với tham số cũ được hash lại khi đăng nhập thành công
+    def test_rehash_on_login(self):
+        user = User(username="alice", email="alice@sydexa.com")
+        self.app.extensions["password_hasher"].method = "pbkdf2:sha256:1000"
+        user.set_password("secret123")
+        self.app.extensions["password_hasher"].method = "pbkdf2:sha256:2000"
+        db.session.add(user)
+        db.session.commit()
+        self.assertTrue(user.password_needs_rehash())
+
+        client = self.app.test_client()
+        response = client.post("/api/auth/login", json={"username": "alice", "password": "wrong"})
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(db.session.get(User, user.id).password_hash.startswith("pbkdf2:sha256:1000$"))
+
+        response = client.post("/api/auth/login", json={"username": "alice", "password": "secret123"})
+        self.assertEqual(response.status_code, 200)
+        db.session.expire_all()
+        user = db.session.get(User, user.id)
+        self.assertTrue(user.password_hash.startswith("pbkdf2:sha256:2000$"))
+        self.assertTrue(user.check_password("secret123"))
+
+if __name__ == "__main__":
+    unittest.main()
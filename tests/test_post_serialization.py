@@ -0,0 +1,86 @@
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.models.like import Like
+from app.counters import reconcile_counters
+
+class PostSerializationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        self.bob = User(username="bob", email="bob@sydexa.com", password_hash="x")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+        self.posts = []
+        for i in range(6):
+            author = self.alice if i % 2 else self.bob
+            post = Post(user_id=author.id, image_url=f"image{i}.jpg", caption=f"caption {i}", created_at=100 + i)
+            db.session.add(post)
+            self.posts.append(post)
+        db.session.commit()
+
+        db.session.add_all([
+            Like(user_id=self.alice.id, post_id=self.posts[0].id),
+            Like(user_id=self.bob.id, post_id=self.posts[0].id),
+            Like(user_id=self.bob.id, post_id=self.posts[3].id),
+        ])
+        db.session.commit()
+        reconcile_counters()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count_queries(self, fn):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        return result, len(statements)
+
+    # Test case 1: Kết quả giống hệt to_dict từng bài
+    def test_same_output_as_to_dict(self):
+        for current_user in (self.alice, self.bob, None):
+            expected = [post.to_dict(include_author=True, include_likes=True, current_user=current_user,
+                                     include_variants=True)
+                        for post in self.posts]
+            self.assertEqual(
+                Post.to_dict_many(self.posts, include_author=True, include_likes=True, current_user=current_user,
+                                  include_variants=True),
+                expected
+            )
+
+        self.assertEqual(Post.to_dict_many(self.posts), [post.to_dict() for post in self.posts])
+
+    # Test case 2: Số query không phụ thuộc vào số bài viết
+    def test_fixed_number_of_queries(self):
+        db.session.expire_all()
+        posts = Post.query.order_by(Post.id).all()
+        _, queries = self._count_queries(
+            lambda: Post.to_dict_many(posts, include_author=True, include_likes=True, current_user=self.alice)
+        )
+        self.assertLessEqual(queries, 3)
+
+    # Test case 3: Danh sách rỗng không chạy query nào
+    def test_empty_list(self):
+        items, queries = self._count_queries(
+            lambda: Post.to_dict_many([], include_author=True, include_likes=True, current_user=self.alice)
+        )
+        self.assertEqual((items, queries), ([], 0))
+
+if __name__ == "__main__":
+    unittest.main()
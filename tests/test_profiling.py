@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+
+class ProfilingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "PROFILING_TOKEN": "secret-token",
+            "PROFILING_DIR": self.folder,
+            "PROFILING_MAX_FILES": 2,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        self.client = self.app.test_client()
+        self.auth = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.folder)
+
+    def _get(self, **headers):
+        return self.client.get("/api/users/profile", headers={**self.auth, **headers})
+
+    # Test case 1: Chỉ request có token hợp lệ được profile, file .prof mang tên endpoint
+    def test_profile_with_token(self):
+        self.assertNotIn("X-Profile-File", self._get().headers)
+        self.assertNotIn("X-Profile-File", self._get(**{"X-Profile": "wrong"}).headers)
+        self.assertEqual(os.listdir(self.folder), [])
+
+        response = self._get(**{"X-Profile": "secret-token"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["data"]["username"], "alice")
+        filename = response.headers["X-Profile-File"]
+        self.assertTrue(filename.startswith("user.get_profile-GET-"))
+        self.assertEqual(os.listdir(self.folder), [filename])
+
+    # Test case 2: Thư mục chỉ giữ PROFILING_MAX_FILES file mới nhất
+    def test_rotation(self):
+        filenames = []
+        for i in range(4):
+            filenames.append(self._get(**{"X-Profile": "secret-token"}).headers["X-Profile-File"])
+            path = os.path.join(self.folder, filenames[-1])
+            os.utime(path, (i, i))
+        self.assertEqual(sorted(os.listdir(self.folder)), sorted(filenames[-2:]))
+
+    # Test case 3: Tóm tắt pstats trả về trực tiếp, request lấy mẫu chỉ ghi file
+    def test_inline_summary_and_sampling(self):
+        response = self._get(**{"X-Profile": "secret-token", "X-Profile-Output": "inline"})
+        self.assertEqual(response.mimetype, "text/plain")
+        self.assertEqual(response.headers["X-Profile-Status"], "200")
+        self.assertIn("cumulative", response.get_data(as_text=True))
+
+        self.app.config["PROFILING_SAMPLE_RATE"] = 1.0
+        response = self._get(**{"X-Profile-Output": "inline"})
+        self.assertEqual(response.json["data"]["username"], "alice")
+        self.assertNotIn("X-Profile-File", response.headers)
+        self.assertEqual(len(os.listdir(self.folder)), 1)
+
+if __name__ == "__main__":
+    unittest.main()
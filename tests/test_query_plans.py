@@ -0,0 +1,43 @@
+import unittest
+from app import create_app, db
+from app.models.like import Like
+from app.query_plans import check_query_plans, explain, hot_queries
+
+class QueryPlansTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 1: Không query nóng nào phải quét toàn bộ bảng
+    def test_no_full_scan(self):
+        self.assertEqual(check_query_plans(), {})
+        for build in hot_queries().values():
+            self.assertTrue(explain(build()))
+
+    # Test case 2: Thiếu index thì query rơi về full scan và command trả về exit code 1
+    def test_missing_index_detected(self):
+        index = next(index for index in Like.__table__.indexes if index.name == "ix_likes_post_id")
+        index.drop(db.engine)
+
+        failures = check_query_plans()
+        self.assertEqual(list(failures), ["counters.like_count"])
+        self.assertIn("likes", failures["counters.like_count"][0])
+
+        result = self.app.test_cli_runner().invoke(args=["check-query-plans"])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("FULL SCAN counters.like_count", result.output)
+
+    # Test case 3: Command thành công khi mọi plan dùng index
+    def test_command_ok(self):
+        result = self.app.test_cli_runner().invoke(args=["check-query-plans"])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.replicas import replica_keys
+from app.sql_metrics import TimedQueuePool
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        # Hai file SQLite: primary và một replica (dữ liệu của replica được ghi riêng để phân biệt)
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(self.folder, 'primary.db')}",
+            "SQLALCHEMY_REPLICA_URIS": [f"sqlite:///{os.path.join(self.folder, 'replica.db')}"],
+            "DB_POOL_SIZE": 3,
+            "DB_REPLICA_POOL_SIZE": 2,
+            "DB_REPLICA_POOL_TIMEOUT": 7,
+            "PASSWORD_HASH_WORKERS": 0,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.replica = db.engines["replica_0"]
+        db.create_all()
+        db.metadata.create_all(self.replica)
+
+        for engine, suffix in ((db.engine, ""), (self.replica, " (replica)")):
+            with engine.begin() as connection:
+                connection.execute(db.insert(User), [
+                    {"id": 1, "username": "alice", "email": "alice@sydexa.com", "fullname": "Alice" + suffix, "password_hash": "x"},
+                    {"id": 2, "username": "bob", "email": "bob@sydexa.com", "fullname": "Bob" + suffix, "password_hash": "x"},
+                ])
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    def tearDown(self):
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.ctx.pop()
+        shutil.rmtree(self.folder)
+
+    # Test case 1: GET đọc từ replica, ngoài request (job, CLI) đọc từ primary
+    def test_get_reads_replica(self):
+        self.assertEqual(replica_keys(), ["replica_0"])
+        response = self.app.test_client().get("/api/users/2/profile", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["data"]["fullname"], "Bob (replica)")
+
+        self.assertEqual(db.session.get(User, 2).fullname, "Bob")
+
+    # Test case 2: Ghi vào primary, client vừa ghi đọc từ primary (cookie hoặc JWT identity)
+    def test_read_your_writes(self):
+        client = self.app.test_client()
+        response = client.put("/api/users/profile", json={"fullname": "Alice Updated"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(db.session.get(User, 1).fullname, "Alice Updated")
+        with self.replica.connect() as connection:
+            self.assertEqual(connection.execute(db.select(User.fullname).where(User.id == 1)).scalar(), "Alice (replica)")
+
+        # Cùng client (cookie)
+        response = client.get("/api/users/profile", headers=self.headers)
+        self.assertEqual(response.get_json()["data"]["fullname"], "Alice Updated")
+
+        # Client khác, cùng user (JWT identity)
+        response = self.app.test_client().get("/api/users/2/profile", headers=self.headers)
+        self.assertEqual(response.get_json()["data"]["fullname"], "Bob")
+
+        # Hết thời gian sticky: đọc lại từ replica
+        self.app.extensions["primary_sticky"].clear()
+        db.session.remove()
+        response = self.app.test_client().get("/api/users/2/profile", headers=self.headers)
+        self.assertEqual(response.get_json()["data"]["fullname"], "Bob (replica)")
+
+    # Test case 3: User chưa có trên replica vẫn xác thực được (token_required đọc lại từ primary)
+    def test_token_required_falls_back_to_primary(self):
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(User).values(id=3, username="carol", email="carol@sydexa.com", password_hash="x"))
+        headers = {"Authorization": f"Bearer {create_access_token(identity='3')}"}
+
+        response = self.app.test_client().get("/api/auth/me", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["data"]["username"], "carol")
+
+    # Test case 4: Kích thước pool và timeout cấu hình riêng cho từng bind
+    def test_pool_options(self):
+        self.assertIsInstance(db.engine.pool, TimedQueuePool)
+        self.assertIsInstance(self.replica.pool, TimedQueuePool)
+        self.assertEqual(db.engine.pool.size(), 3)
+        self.assertEqual(self.replica.pool.size(), 2)
+        self.assertEqual(self.replica.pool.timeout(), 7)
+
+    # Test case 5: Client không giữ cookie gửi lại header X-DB-Primary-Until, kể cả khi worker khác xử lý request
+    def test_sticky_header(self):
+        response = self.app.test_client().put("/api/users/profile", json={"fullname": "Alice Updated"}, headers=self.headers)
+        until = response.headers["X-DB-Primary-Until"]
+        self.assertGreater(float(until), 0)
+
+        # Một worker khác không biết identity vừa ghi
+        self.app.extensions["primary_sticky"].clear()
+        for value, fullname in ((until, "Bob"), (None, "Bob (replica)"), ("1", "Bob (replica)"),
+                                ("not-a-time", "Bob (replica)")):
+            db.session.remove()
+            headers = dict(self.headers, **({"X-DB-Primary-Until": value} if value else {}))
+            response = self.app.test_client().get("/api/users/2/profile", headers=headers)
+            self.assertEqual(response.get_json()["data"]["fullname"], fullname, value)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import datetime
+import decimal
+import gzip
+import json
+import unittest
+import uuid
+from unittest import mock
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import create_access_token
+from prometheus_client import REGISTRY
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.responses import OrjsonProvider, available_encodings, orjson
+from app.utils import api_list_response, api_response
+
+def fail(items):
+    raise RuntimeError("IAM unavailable")
+
+class ResponsesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "MEDIA_VARIANTS_ENABLED": False,
+            "COMPRESS_ALGORITHMS": ["gzip"],
+            "STREAM_MIN_ITEMS": 3,
+            "STREAM_BATCH_SIZE": 2,
+        })
+        self.app.add_url_rule("/test/list", "test_list", lambda: api_response(data=["kilogram"] * 500))
+        self.app.add_url_rule("/test/small", "test_small", lambda: api_response(data="ok"))
+        self.app.add_url_rule("/test/prepare-error", "test_prepare_error",
+                              lambda: api_list_response(list(range(5)), lambda batch: batch, prepare=fail))
+        self.app.add_url_rule("/test/serialize-error", "test_serialize_error",
+                              lambda: api_list_response(list(range(5)), fail))
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(self.alice)
+        db.session.commit()
+        db.session.add_all([Post(user_id=self.alice.id, image_url=f"/uploads/{i}.jpg", created_at=i) for i in range(5)])
+        db.session.commit()
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.alice.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    # Test case 1: orjson cho kết quả giống provider mặc định
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_provider(self):
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+        value = {
+            "date": datetime.datetime(2025, 1, 2, 3, 4, 5),
+            "amount": decimal.Decimal("1.50"),
+            "id": uuid.UUID(int=1),
+            "big": 2 ** 70,
+        }
+        self.assertEqual(json.loads(self.app.json.dumps(value)), json.loads(DefaultJSONProvider(self.app).dumps(value)))
+        self.assertEqual(json.loads(self.app.json.dumps({1: "a"})), {"1": "a"})
+        self.assertEqual(self.app.json.loads(b'{"a": [1, 2]}'), {"a": [1, 2]})
+
+        app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "JSON_PROVIDER": "default"})
+        self.assertIs(type(app.json), DefaultJSONProvider)
+
+    # Test case 2: Nén gzip khi client chấp nhận và response đủ lớn
+    def test_compression(self):
+        response = self.client.get("/test/list", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(int(response.headers["Content-Length"]), len(response.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data))["data"], ["kilogram"] * 500)
+
+        self.assertNotIn("Content-Encoding", self.client.get("/test/list").headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/test/small", headers={"Accept-Encoding": "gzip"}).headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/test/list", headers={"Accept-Encoding": "br"}).headers)
+
+    # Test case 3: Brotli chỉ được dùng khi thư viện đã được cài
+    def test_available_encodings(self):
+        with mock.patch("app.responses.brotli", None):
+            self.assertEqual(available_encodings(["br", "gzip"]), ["gzip"])
+        with mock.patch("app.responses.brotli", object()):
+            self.assertEqual(available_encodings(["br", "gzip"]), ["br", "gzip"])
+
+    # Test case 4: Trang lớn được stream theo batch, nội dung giống response thường
+    def test_streamed_list(self):
+        path = f"/api/users/{self.alice.id}/posts?per_page=5"
+        with mock.patch.object(Post, "to_dict_many", wraps=Post.to_dict_many) as to_dict_many:
+            response = self.client.get(path, headers=self.headers)
+            self.assertNotIn("Content-Length", response.headers)
+            streamed = response.get_json()
+            self.assertEqual([len(call.args[0]) for call in to_dict_many.call_args_list], [2, 2, 1])
+
+        self.app.config["STREAM_MIN_ITEMS"] = 100
+        db.session.remove()
+        buffered = self.client.get(path, headers=self.headers)
+        self.assertIn("Content-Length", buffered.headers)
+        self.assertEqual(streamed, buffered.get_json())
+        self.assertEqual([item["image_url"] for item in streamed["data"]["items"]],
+                         [f"/uploads/{i}.jpg" for i in range(4, -1, -1)])
+
+        # Stream được nén từng phần
+        self.app.config["STREAM_MIN_ITEMS"] = 3
+        db.session.remove()
+        response = self.client.get(path, headers=dict(self.headers, **{"Accept-Encoding": "gzip"}))
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.data)), streamed)
+
+    # Test case 5: Trang stream: query của các batch được tính vào metrics, lỗi ký URL trả về 500 trước khi gửi body
+    def test_streamed_list_metrics_and_errors(self):
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        endpoint = "user.get_user_posts"
+        alice_id = self.alice.id
+        path = f"/api/users/{alice_id}/posts?per_page=5"
+        queries = sample("kilogram_sql_queries_total", endpoint=endpoint)
+        per_request = sample("kilogram_sql_queries_per_request_sum", endpoint=endpoint)
+        requests = sample("kilogram_http_request_duration_seconds_test_count", method="GET", endpoint=endpoint)
+
+        response = self.client.get(path, headers=self.headers)
+        self.assertEqual(len(response.get_json()["data"]["items"]), 5)
+        response.close()
+        executed = sample("kilogram_sql_queries_total", endpoint=endpoint) - queries
+        self.assertEqual(sample("kilogram_sql_queries_per_request_sum", endpoint=endpoint) - per_request, executed)
+        self.assertEqual(sample("kilogram_http_request_duration_seconds_test_count", method="GET", endpoint=endpoint) - requests, 1)
+
+        # Lỗi khi ký URL (prepare) hoặc ở batch đầu tiên: response 500, không phải body 200 bị cắt ngang
+        for path in ("/test/prepare-error", "/test/serialize-error"):
+            self.assertEqual(self.client.get(path).status_code, 500, path)
+
+if __name__ == "__main__":
+    unittest.main()
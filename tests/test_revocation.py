@@ -0,0 +1,94 @@
+import time
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.revocation import BloomFilter, get_revocation_list
+
+class BloomFilterTestCase(unittest.TestCase):
+    # Test case 1: Không có false negative, false positive gần error_rate
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        self.assertTrue(all(f"jti-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+class RevocationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "PASSWORD_HASH_WORKERS": 0,
+            "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username="alice", email="alice@sydexa.com")
+        user.set_password("secret123")
+        db.session.add(user)
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        tokens = self.client.post("/api/auth/login", json={"username": "alice", "password": "secret123"}).json["data"]
+        self.access_token, self.refresh_token = tokens["access_token"], tokens["refresh_token"]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _me(self, token):
+        return self.client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+    def _refresh(self, token):
+        return self.client.post("/api/auth/refresh", headers={"Authorization": f"Bearer {token}"})
+
+    # Test case 2: Refresh token được rotate, token cũ không dùng lại được
+    def test_refresh_rotates_token(self):
+        response = self._refresh(self.refresh_token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._me(response.json["data"]["access_token"]).status_code, 200)
+
+        self.assertEqual(self._refresh(self.refresh_token).status_code, 401)
+        self.assertEqual(self._refresh(response.json["data"]["refresh_token"]).status_code, 200)
+        self.assertEqual(self._refresh(self.access_token).status_code, 401)
+
+    # Test case 3: Logout thu hồi access token và refresh token
+    def test_logout(self):
+        self.assertEqual(self._me(self.access_token).status_code, 200)
+        response = self.client.post(
+            "/api/auth/logout",
+            json={"refresh_token": self.refresh_token},
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RevokedToken.query.count(), 2)
+
+        self.assertEqual(self._me(self.access_token).status_code, 401)
+        self.assertEqual(self._refresh(self.refresh_token).status_code, 401)
+
+    # Test case 4: Token thu hồi ở process khác được đọc khi sync, không query database cho mỗi request
+    def test_sync_from_database(self):
+        revocations = get_revocation_list()
+        self.assertEqual(self._me(self.access_token).status_code, 200)
+
+        with mock.patch("app.revocation.db.session.query", side_effect=AssertionError("query")):
+            self.assertEqual(self._me(self.access_token).status_code, 200)
+
+        response = self.client.post("/api/auth/logout", headers={"Authorization": f"Bearer {self.access_token}"})
+        self.assertEqual(response.status_code, 200)
+        revocations.clear()
+        self.assertEqual(self._me(self.access_token).status_code, 401)
+
+        # Rows của token đã hết hạn bị bỏ khi rebuild
+        db.session.add(RevokedToken(jti="expired", token_type="access", user_id=1, expires_at=int(time.time()) - 1))
+        db.session.commit()
+        revocations.clear()
+        self.assertFalse(revocations.is_revoked("expired"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+from app import create_app, db
+from app.models.user import User
+from flask_jwt_extended import create_access_token
+from app.search import trigrams, index_user, find_users, find_users_after, count_users
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        for created_at, username, fullname in (
+            (100, "james_bro", "James Nguyen"),
+            (200, "bro_james", "Bro"),
+            (300, "anna", "Anna Jameson"),
+            (400, "jam", None),
+            (500, "test_user_1", "Test"),
+            (600, "testXuser", "Test"),
+        ):
+            user = User(username=username, email=f"{username}@sydexa.com", fullname=fullname,
+                        password_hash="x", created_at=created_at)
+            db.session.add(user)
+            db.session.flush()
+            index_user(user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _usernames(self, term):
+        return [user.username for user in find_users(term)]
+
+    # Test case 1: Trigram
+    def test_trigrams(self):
+        self.assertEqual(trigrams("James"), {"jam", "ame", "mes"})
+        self.assertEqual(trigrams("ab"), set())
+        self.assertEqual(trigrams(None), set())
+
+    # Test case 2: Prefix username trước, rồi substring username, rồi fullname
+    def test_ranking(self):
+        self.assertEqual(self._usernames("JAMES"), ["james_bro", "bro_james", "anna"])
+
+    # Test case 3: Từ khóa ngắn chỉ tìm theo prefix
+    def test_short_term_prefix(self):
+        self.assertEqual(self._usernames("ja"), ["jam", "james_bro"])
+        self.assertEqual(self._usernames("mes"), ["bro_james", "james_bro", "anna"])
+
+    # Test case 4: Ký tự đặc biệt của LIKE không phải wildcard
+    def test_like_wildcards_are_literal(self):
+        self.assertEqual(self._usernames("t_"), [])
+        self.assertEqual(self._usernames("test_"), ["test_user_1"])
+
+    # Test case 5: Đổi username thì index được cập nhật
+    def test_reindex_on_update(self):
+        user = User.query.filter_by(username="anna").first()
+        user.username = "hanna"
+        user.fullname = "Hanna"
+        index_user(user)
+        db.session.commit()
+
+        self.assertEqual(self._usernames("anna"), ["hanna"])
+        self.assertEqual(self._usernames("jameson"), [])
+
+    # Test case 6: Kết quả tốt nhất không bị mất khi có nhiều candidate hơn SEARCH_MAX_RESULTS
+    def test_limit_keeps_best_matches(self):
+        for i in range(10):
+            user = User(username=f"fan{i}", email=f"fan{i}@sydexa.com", fullname="Fan of James",
+                        password_hash="x", created_at=1000 + i)
+            db.session.add(user)
+            db.session.flush()
+            index_user(user)
+        db.session.commit()
+        self.app.config["SEARCH_MAX_RESULTS"] = 2
+
+        self.assertEqual(self._usernames("james"), ["james_bro", "bro_james"])
+        self.assertEqual(self._usernames("jam"), ["jam", "james_bro"])
+        self.assertEqual(self._usernames("fan of"), ["fan9", "fan8"])
+
+    # Test case 7: Cursor mode seek sau (rank, created_at, id), không phụ thuộc SEARCH_MAX_RESULTS
+    def test_find_users_after(self):
+        self.app.config["SEARCH_MAX_RESULTS"] = 1
+        for term, expected in (("JAMES", ["james_bro", "bro_james", "anna"]), ("ja", ["jam", "james_bro"]),
+                               ("test_", ["test_user_1"])):
+            seen, position = [], None
+            while True:
+                matches = find_users_after(term, position, 2)
+                seen.extend(user.username for _, user in matches)
+                if len(matches) < 2:
+                    break
+                rank, last = matches[-1]
+                position = (rank, last.created_at, last.id)
+            self.assertEqual(seen, expected, term)
+            self.assertEqual(count_users(term), len(expected), term)
+
+        # Một user mới có rank tốt hơn không làm cursor cũ mất hiệu lực
+        rank, last = find_users_after("james", None, 1)[0]
+        user = User(username="james_new", email="james_new@sydexa.com", password_hash="x", created_at=700)
+        db.session.add(user)
+        db.session.flush()
+        index_user(user)
+        db.session.commit()
+        self.assertEqual([user.username for _, user in find_users_after("james", (rank, last.created_at, last.id), 5)],
+                         ["bro_james", "anna"])
+
+    # Test case 8: API tìm kiếm ở cursor mode
+    def test_search_cursor_mode(self):
+        client = self.app.test_client()
+        user = User.query.filter_by(username="anna").first()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+        seen, cursor = [], ""
+        while cursor is not None:
+            db.session.remove()
+            response = client.get(f"/api/users/search?username=james&per_page=2&total=exact&cursor={cursor}",
+                                  headers=headers)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()["data"]
+            self.assertEqual(data["pagination"]["total"], 3)
+            seen.extend(item["username"] for item in data["items"])
+            cursor = data["pagination"]["next_cursor"]
+        self.assertEqual(seen, ["james_bro", "bro_james", "anna"])
+
+        response = client.get("/api/users/search?username=james&cursor=bad", headers=headers)
+        self.assertEqual(response.status_code, 400)
+        response = client.get("/api/users/search?username=james&cursor=&total=none", headers=headers)
+        self.assertIsNone(response.get_json()["data"]["pagination"]["total"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.models.post import Post
+from app.utils import generate_signed_url, generate_signed_urls
+
+class FakeBlob:
+    signed = 0
+
+    def __init__(self, name):
+        self.name = name
+
+    def generate_signed_url(self, version, expiration, method):
+        FakeBlob.signed += 1
+        return f"https://storage.example.com/{self.name}?method={method}&sig={FakeBlob.signed}"
+
+class FakeBucket:
+    def blob(self, name):
+        return FakeBlob(name)
+
+class SignedUrlCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        FakeBlob.signed = 0
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "SIGNED_URL_CACHE_SIZE": 2,
+            "SIGNED_URL_SAFETY_MARGIN": 60,
+            "SIGNED_MEDIA_BUCKET": "private",
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        patcher = mock.patch("app.utils.gcs_clients.bucket", return_value=FakeBucket())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    # Test case 1: URL còn hạn được dùng lại, method khác thì ký riêng
+    def test_cached_until_margin(self):
+        url = generate_signed_url("a.jpg", "private")
+        self.assertEqual(generate_signed_url("a.jpg", "private"), url)
+        self.assertNotEqual(generate_signed_url("a.jpg", "private", method="PUT"), url)
+        self.assertEqual(FakeBlob.signed, 2)
+
+    # Test case 2: URL sắp hết hạn (trong safety margin) không được cache
+    def test_short_expiration_is_not_cached(self):
+        generate_signed_url("a.jpg", "private", expiration_minutes=1)
+        generate_signed_url("a.jpg", "private", expiration_minutes=1)
+        self.assertEqual(FakeBlob.signed, 2)
+
+    # Test case 3: Ký nhiều object một lần, mỗi object chỉ ký một lần
+    def test_bulk_sign(self):
+        urls = generate_signed_urls(["a.jpg", "b.jpg", "a.jpg"], "private")
+        self.assertEqual(set(urls), {"a.jpg", "b.jpg"})
+        self.assertEqual(FakeBlob.signed, 2)
+        self.assertEqual(generate_signed_urls(["b.jpg"], "private"), {"b.jpg": urls["b.jpg"]})
+        self.assertEqual(FakeBlob.signed, 2)
+
+    # Test case 4: Giới hạn kích thước, entry ít dùng nhất bị loại
+    def test_lru_eviction(self):
+        generate_signed_urls(["a.jpg", "b.jpg"], "private")
+        generate_signed_url("c.jpg", "private")
+        self.assertEqual(FakeBlob.signed, 3)
+        generate_signed_url("a.jpg", "private")
+        generate_signed_url("b.jpg", "private")
+        self.assertEqual(FakeBlob.signed, 5)
+
+    # Test case 5: Serializer chỉ ký image_url là tên object, mỗi trang gọi ký một lần
+    def test_post_serializer_signs_private_images(self):
+        posts = [
+            Post(id=1, user_id=1, image_url="posts/a.jpg"),
+            Post(id=2, user_id=1, image_url="https://example.com/b.jpg"),
+            Post(id=3, user_id=1, image_url="posts/a.jpg"),
+        ]
+        with mock.patch("app.models.post.generate_signed_urls", wraps=generate_signed_urls) as bulk:
+            items = Post.to_dict_many(posts, sign_images=True)
+        self.assertEqual(bulk.call_count, 1)
+        self.assertTrue(items[0]["image_url"].startswith("https://storage.example.com/posts/a.jpg"))
+        self.assertEqual(items[1]["image_url"], "https://example.com/b.jpg")
+        self.assertEqual(items[2]["image_url"], items[0]["image_url"])
+        self.assertEqual(posts[0].to_dict(sign_images=True)["image_url"], items[0]["image_url"])
+        self.assertEqual(Post.to_dict_many(posts)[0]["image_url"], "posts/a.jpg")
+
+if __name__ == "__main__":
+    unittest.main()
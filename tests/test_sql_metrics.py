@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from flask_jwt_extended import create_access_token
+from prometheus_client import REGISTRY
+from app import create_app, db
+from app.models.post import Post
+from app.models.user import User
+from app.sql_metrics import TimedQueuePool
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+class SqlMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{self.path}"})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Post(user_id=user.id, image_url="/uploads/a.jpg"))
+        db.session.commit()
+        self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        os.remove(self.path)
+
+    # Test case 1: Câu lệnh SQL được gắn với endpoint, số query của mỗi request được ghi lại
+    def test_queries_tagged_with_endpoint(self):
+        endpoint = "post.get_post"
+        queries = sample("kilogram_sql_queries_total", endpoint=endpoint)
+        selects = sample("kilogram_sql_query_duration_seconds_count", endpoint=endpoint, statement="SELECT")
+        requests = sample("kilogram_sql_queries_per_request_count", endpoint=endpoint)
+        per_request = sample("kilogram_sql_queries_per_request_sum", endpoint=endpoint)
+
+        response = self.app.test_client().get("/api/posts/1", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        executed = sample("kilogram_sql_queries_total", endpoint=endpoint) - queries
+        self.assertGreater(executed, 0)
+        self.assertEqual(sample("kilogram_sql_query_duration_seconds_count", endpoint=endpoint, statement="SELECT") - selects,
+                         executed)
+        self.assertEqual(sample("kilogram_sql_queries_per_request_count", endpoint=endpoint) - requests, 1)
+        self.assertEqual(sample("kilogram_sql_queries_per_request_sum", endpoint=endpoint) - per_request, executed)
+
+    # Test case 2: Query ngoài request (job, CLI) có label background, checkout của pool được đo
+    def test_background_queries_and_pool_wait(self):
+        self.assertIsInstance(db.engine.pool, TimedQueuePool)
+        queries = sample("kilogram_sql_queries_total", endpoint="background")
+        checkouts = sample("kilogram_db_pool_checkout_wait_seconds_count")
+
+        db.session.remove()
+        User.query.count()
+
+        self.assertEqual(sample("kilogram_sql_queries_total", endpoint="background") - queries, 1)
+        self.assertGreater(sample("kilogram_db_pool_checkout_wait_seconds_count") - checkouts, 0)
+
+if __name__ == "__main__":
+    unittest.main()
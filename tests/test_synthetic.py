@@ -0,0 +1,102 @@
+import unittest
+from sqlalchemy import inspect
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.models.like import Like
+from app.models.follow import Follow
+from app.models.timeline import Timeline
+from app.counters import reconcile_counters
+from app.search import find_users
+from app.synthetic import generate_dataset, secondary_indexes
+
+class SyntheticDatasetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "PASSWORD_HASH_WORKERS": 0})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+        db.session.add(self.alice)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _generate(self, **kwargs):
+        options = dict(posts_per_user=4, follows_per_user=8, likes_per_post=3, days=7, batch_size=50)
+        options.update(kwargs)
+        return generate_dataset(200, **options)
+
+    # Test case 1: Dữ liệu được thêm sau dữ liệu có sẵn, counter khớp với bảng likes/follows
+    def test_generate_consistent_dataset(self):
+        counts = self._generate()
+
+        self.assertEqual(counts["users"], 200)
+        self.assertEqual(User.query.count(), 201)
+        self.assertEqual(Follow.query.count(), counts["follows"])
+        self.assertEqual(Post.query.count(), counts["posts"])
+        self.assertEqual(Like.query.count(), counts["likes"])
+        self.assertEqual(db.session.get(User, 1).username, "alice")
+        self.assertEqual(db.session.get(User, 2).username, "user2")
+        self.assertEqual(Follow.query.filter(Follow.follower_id == Follow.following_id).count(), 0)
+        self.assertEqual(reconcile_counters(dry_run=True), {"posts.like_count": 0, "users.follower_count": 0, "users.following_count": 0})
+
+        # Đăng nhập và tìm kiếm được với user sinh ra
+        user = db.session.get(User, 2)
+        self.assertTrue(user.check_password("password123"))
+        self.assertIn(user.id, [found.id for found in find_users("user2")])
+
+    # Test case 2: Phân phối follower lệch (power-law), vài tài khoản có rất nhiều follower
+    def test_follower_distribution_is_skewed(self):
+        self._generate()
+        counts = sorted((count for (count,) in db.session.query(User.follower_count).filter(User.id > 1)), reverse=True)
+        self.assertGreater(counts[0], 10 * (sum(counts) / len(counts)))
+        self.assertGreater(counts[0], counts[len(counts) // 2] * 10)
+
+    # Test case 3: Timeline gồm bài của chính mình và của người mình follow
+    def test_timelines(self):
+        counts = self._generate()
+        self.assertEqual(Timeline.query.count(), counts["timelines"])
+
+        user_id = db.session.query(Follow.follower_id).first()[0]
+        following = {row.following_id for row in Follow.query.filter_by(follower_id=user_id)}
+        expected = {post.id for post in Post.query.filter(Post.user_id.in_(following | {user_id}))}
+        actual = {entry.post_id for entry in Timeline.query.filter_by(user_id=user_id)}
+        self.assertEqual(actual, expected)
+
+    # Test case 4: Cùng seed sinh ra cùng dataset
+    def test_deterministic(self):
+        first = self._generate(timelines=False)
+        follows = sorted((row.follower_id, row.following_id) for row in Follow.query)
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(username="alice", email="alice@sydexa.com", password_hash="x"))
+        db.session.commit()
+
+        self.assertEqual(self._generate(timelines=False), first)
+        self.assertEqual(sorted((row.follower_id, row.following_id) for row in Follow.query), follows)
+
+    # Test case 5: Index phụ bị drop trong lúc nạp và được tạo lại sau đó
+    def test_drop_indexes(self):
+        self._generate(drop_indexes=True, timelines=False)
+        inspector = inspect(db.engine)
+        names = {index["name"] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+        for index in secondary_indexes():
+            self.assertIn(index.name, names)
+
+    # Test case 6: CLI generate-dataset
+    def test_command(self):
+        result = self.app.test_cli_runner().invoke(args=[
+            "generate-dataset", "--users", "50", "--posts-per-user", "2", "--follows-per-user", "5", "--batch-size", "20"
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("users: 50 rows", result.output)
+        self.assertEqual(User.query.count(), 51)
+
+if __name__ == "__main__":
+    unittest.main()
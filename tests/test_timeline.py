@@ -0,0 +1,127 @@
+import unittest
+from app import create_app, db
+from app.models.user import User
+from app.models.post import Post
+from app.models.follow import Follow
+from app.models.timeline import Timeline
+from app.counters import adjust_follow_counts
+from app.timeline import fan_out_post, backfill_timeline, trim_author_from_timeline, read_timeline, rebuild_timelines
+
+class TimelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "TIMELINE_MAX_LENGTH": 4,
+            "TIMELINE_BACKFILL_SIZE": 2,
+            "FANOUT_FOLLOWER_LIMIT": 2,
+        })
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.users = []
+        for i in range(4):
+            user = User(username=f"user{i}", email=f"user{i}@sydexa.com", password_hash="x")
+            db.session.add(user)
+            self.users.append(user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _post(self, author, created_at):
+        post = Post(user_id=author.id, image_url="image.jpg", created_at=created_at)
+        db.session.add(post)
+        db.session.flush()
+        fan_out_post(post)
+        db.session.commit()
+        return post
+
+    def _follow(self, follower, author):
+        db.session.add(Follow(follower_id=follower.id, following_id=author.id))
+        adjust_follow_counts(follower.id, author.id, 1)
+        backfill_timeline(follower.id, author.id)
+        db.session.commit()
+
+    # Test case 1: Bài viết mới được đẩy vào timeline của tác giả và follower
+    def test_fan_out_on_write(self):
+        alice, bob, carol, _ = self.users
+        self._follow(bob, alice)
+        post = self._post(alice, 100)
+
+        posts, total = read_timeline(bob.id, 1, 10)
+        self.assertEqual([p.id for p in posts], [post.id])
+        self.assertEqual(total, 1)
+
+        posts, _ = read_timeline(alice.id, 1, 10)
+        self.assertEqual([p.id for p in posts], [post.id])
+
+        posts, total = read_timeline(carol.id, 1, 10)
+        self.assertEqual((posts, total), ([], 0))
+
+    # Test case 2: Follow thì backfill, unfollow thì xóa bài của tác giả khỏi timeline
+    def test_backfill_and_trim_on_follow(self):
+        alice, bob, _, _ = self.users
+        older = self._post(alice, 100)
+        newer = self._post(alice, 200)
+        self._post(alice, 50)
+
+        self._follow(bob, alice)
+        posts, _ = read_timeline(bob.id, 1, 10)
+        self.assertEqual([p.id for p in posts], [newer.id, older.id])
+
+        trim_author_from_timeline(bob.id, alice.id)
+        db.session.commit()
+        posts, total = read_timeline(bob.id, 1, 10)
+        self.assertEqual((posts, total), ([], 0))
+
+    # Test case 3: Tài khoản nhiều follower được đọc khi xem feed (fan-out-on-read)
+    def test_fan_out_on_read_for_large_accounts(self):
+        alice, bob, carol, dave = self.users
+        for follower in (bob, carol, dave):
+            db.session.add(Follow(follower_id=follower.id, following_id=alice.id))
+            adjust_follow_counts(follower.id, alice.id, 1)
+        db.session.commit()
+
+        post = self._post(alice, 100)
+        self.assertIsNone(Timeline.query.filter_by(user_id=bob.id).first())
+
+        own = self._post(bob, 50)
+        posts, total = read_timeline(bob.id, 1, 10)
+        self.assertEqual([p.id for p in posts], [post.id, own.id])
+        self.assertEqual(total, 2)
+
+    # Test case 4: Timeline bị cắt bớt khi vượt quá giới hạn
+    def test_timeline_is_bounded(self):
+        alice = self.users[0]
+        for created_at in range(10):
+            self._post(alice, created_at)
+
+        self.assertLessEqual(Timeline.query.filter_by(user_id=alice.id).count(), 5)
+        posts, _ = read_timeline(alice.id, 1, 2)
+        self.assertEqual([p.created_at for p in posts], [9, 8])
+
+    # Test case 5: Dựng lại timeline từ follows và posts (database có sẵn trước khi có timeline)
+    def test_rebuild_timelines(self):
+        alice, bob, carol, dave = self.users
+        self._follow(bob, alice)
+        self._follow(carol, alice)
+        self._follow(dave, bob)
+        old = self._post(alice, 100)
+        new = self._post(alice, 200)
+        own = self._post(bob, 150)
+        deleted = self._post(bob, 300)
+        deleted.deleted = True
+        db.session.commit()
+        expected = {user.id: [p.id for p in read_timeline(user.id, 1, 10)[0]] for user in self.users}
+
+        Timeline.query.delete()
+        db.session.commit()
+        self.assertEqual(rebuild_timelines(batch_size=3), 8)
+        self.assertEqual({user.id: [p.id for p in read_timeline(user.id, 1, 10)[0]] for user in self.users}, expected)
+        self.assertEqual(expected[bob.id], [new.id, own.id, old.id])
+
+if __name__ == "__main__":
+    unittest.main()
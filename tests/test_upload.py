@@ -0,0 +1,177 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.media import MediaUpload
+from app.models.upload import UploadSession
+from app.models.user import User
+from app.uploads import purge_upload_sessions
+
+class UploadApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "STORAGE_BACKEND": "local",
+            "LOCAL_UPLOAD_FOLDER": self.folder,
+            "UPLOAD_CHUNK_SIZE": 4,
+            "UPLOAD_MAX_BYTES": 1024,
+            "MEDIA_VARIANTS_ENABLED": False,
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            alice = User(username="alice", email="alice@sydexa.com", password_hash="x")
+            bob = User(username="bob", email="bob@sydexa.com", password_hash="x")
+            db.session.add_all([alice, bob])
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity=str(alice.id))}"}
+            self.bob_headers = {"Authorization": f"Bearer {create_access_token(identity=str(bob.id))}"}
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _read(self, filepath):
+        with open(os.path.join(self.folder, os.path.basename(filepath)), "rb") as f:
+            return f.read()
+
+    # Test case 1: Upload một lần vào local storage
+    def test_single_upload(self):
+        response = self.client.post("/api/upload", data={"file": (io.BytesIO(b"cat!"), "orange cat.jpg")},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+        filepath = response.json["data"]["filepath"]
+        self.assertTrue(filepath.startswith("/uploads/"))
+        self.assertTrue(filepath.endswith("_orange_cat.jpg"))
+        self.assertEqual(self._read(filepath), b"cat!")
+        with self.app.app_context():
+            self.assertEqual(db.session.get(MediaUpload, filepath).key, os.path.basename(filepath))
+
+        response = self.client.post("/api/upload", data={"file": (io.BytesIO(b"cat!"), "orange cat.jpg")})
+        self.assertEqual(response.status_code, 401)
+
+    # Test case 2: Resumable upload theo từng chunk, gửi lại chunk sai offset thì bị từ chối
+    def test_resumable_upload(self):
+        response = self.client.post("/api/upload/sessions", json={"filename": "cat.png"}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json["data"]["upload_id"]
+        url = f"/api/upload/sessions/{upload_id}"
+
+        response = self.client.put(url, data=b"abcd", headers={"Content-Range": "bytes 0-3/*", **self.headers})
+        self.assertEqual(response.json["data"]["offset"], 4)
+
+        # Chunk bị gửi lại sau khi mất kết nối
+        response = self.client.put(url, data=b"abcd", headers={"Content-Range": "bytes 0-3/*", **self.headers})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json["data"]["offset"], 4)
+
+        self.assertEqual(self.client.get(url, headers=self.headers).json["data"]["offset"], 4)
+
+        response = self.client.put(url, data=b"ef", headers={"Content-Range": "bytes 4-5/6", **self.headers})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json["data"]["completed"])
+        self.assertEqual(self._read(response.json["data"]["filepath"]), b"abcdef")
+
+    # Test case 3: Giới hạn kích thước chunk và file
+    def test_size_limits(self):
+        upload_id = self.client.post("/api/upload/sessions", json={"filename": "cat.png"}, headers=self.headers).json["data"]["upload_id"]
+        url = f"/api/upload/sessions/{upload_id}"
+
+        response = self.client.put(url, data=b"abcdef", headers={"Content-Range": "bytes 0-5/*", **self.headers})
+        self.assertEqual(response.status_code, 413)
+
+        response = self.client.post("/api/upload/sessions", json={"filename": "big.png", "total_size": 1025}, headers=self.headers)
+        self.assertEqual(response.status_code, 413)
+
+        response = self.client.post("/api/upload/sessions", json={"filename": "script.py"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    # Test case 4: ETag theo tên, kích thước và mtime của file, 304 và Range
+    def test_conditional_and_range_get(self):
+        filepath = self.client.post(
+            "/api/upload", data={"file": (io.BytesIO(b"0123456789"), "cat.jpg")}, headers=self.headers
+        ).json["data"]["filepath"]
+
+        response = self.client.get(filepath)
+        self.assertEqual(response.status_code, 200)
+        stat = os.stat(os.path.join(self.folder, os.path.basename(filepath)))
+        raw = f"{os.path.basename(filepath)}:10:{stat.st_mtime_ns}".encode()
+        self.assertEqual(response.get_etag(), (hashlib.sha256(raw).hexdigest()[:32], False))
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, 365 * 24 * 60 * 60)
+        response.close()
+
+        response = self.client.get(filepath, headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        response = self.client.get(filepath, headers={"Range": "bytes=2-5"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, b"2345")
+        response.close()
+
+    # Test case 5: File không có prefix timestamp thì không immutable
+    def test_mutable_file_cache_headers(self):
+        with open(os.path.join(self.folder, "avatar.jpg"), "wb") as f:
+            f.write(b"avatar")
+
+        response = self.client.get("/uploads/avatar.jpg")
+        self.assertFalse(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, 60 * 60)
+        response.close()
+
+        self.assertEqual(self.client.get("/uploads/missing.jpg").status_code, 404)
+
+    # Test case 6: X-Accel-Redirect để nginx gửi file
+    def test_x_accel_offload(self):
+        with open(os.path.join(self.folder, "1747162696_cat.jpg"), "wb") as f:
+            f.write(b"cat")
+        self.app.config["UPLOADS_OFFLOAD"] = "x-accel"
+
+        response = self.client.get("/uploads/1747162696_cat.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Accel-Redirect"], "/protected-uploads/1747162696_cat.jpg")
+        self.assertEqual(response.data, b"")
+
+        response = self.client.get("/uploads/1747162696_cat.jpg", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Accel-Redirect", response.headers)
+
+    # Test case 7: Chỉ chủ sở hữu dùng được upload session, session hết hạn bị từ chối rồi bị purge
+    def test_session_owner_and_expiry(self):
+        self.assertEqual(self.client.post("/api/upload/sessions", json={"filename": "cat.png"}).status_code, 401)
+
+        upload_id = self.client.post(
+            "/api/upload/sessions", json={"filename": "cat.png"}, headers=self.headers
+        ).json["data"]["upload_id"]
+        url = f"/api/upload/sessions/{upload_id}"
+        self.assertEqual(self.client.get(url, headers=self.bob_headers).status_code, 404)
+        response = self.client.put(url, data=b"abcd", headers={"Content-Range": "bytes 0-3/*", **self.bob_headers})
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.put(url, data=b"abcd", headers={"Content-Range": "bytes 0-3/*", **self.headers})
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            upload = db.session.get(UploadSession, upload_id)
+            partial = upload.backend_ref
+            upload.expires_at = int(time.time()) - 1
+            db.session.commit()
+        self.assertTrue(os.path.exists(partial))
+        self.assertEqual(self.client.get(url, headers=self.headers).status_code, 410)
+
+        result = self.app.test_cli_runner().invoke(args=["purge-upload-sessions"])
+        self.assertIn("1 upload sessions deleted", result.output)
+        self.assertFalse(os.path.exists(partial))
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(UploadSession, upload_id))
+            self.assertEqual(purge_upload_sessions(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
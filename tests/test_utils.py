@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import unittest
 
 # Importing allowed_file function from our utils module
@@ -56,6 +58,19 @@ class TestUtils(unittest.TestCase):
         self.assertFalse(allowed_file(""), "Test failed for empty string")
         self.assertFalse(allowed_file("."), "Test failed for '.'")
 
+# Import app không được load google.cloud (client GCS chỉ được tạo khi dùng tới)
+class TestLazyStorageImport(unittest.TestCase):
+
+    def test_import_app_does_not_load_gcs(self):
+        code = (
+            "import sys\n"
+            "from app import create_app\n"
+            "create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})\n"
+            "print('google.cloud' in sys.modules)\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code], text=True, stderr=subprocess.DEVNULL)
+        self.assertEqual(output.strip(), "False")
+
 # Cho phép chạy file test trực tiếp
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file